@@ -2,6 +2,8 @@
 ASGI config for football project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The Server-Sent Events stream (/events/) is an async view and should be
+served through this entry point rather than the WSGI workers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -53,7 +53,8 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
-    'django.contrib.gis'
+    'django.contrib.gis',
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
@@ -117,6 +118,30 @@ else:
         }
     }
 
+# Cache
+# Lokalno je dovoljan LocMemCache; sa više gunicorn workera keš mora biti
+# zajednički (REDIS_URL), inače invalidacija važi samo za jedan proces
+
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Server-Sent Events fan-out (/events/)
+# InProcessBroker radi unutar jednog procesa; sa više workera ili odvojenim
+# ASGI servisom koristi se football_time_ns.events.PostgresBroker (LISTEN/NOTIFY)
+
+EVENTS_BROKER = os.environ.get('EVENTS_BROKER', 'football_time_ns.events.InProcessBroker')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -164,17 +189,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'football_time_ns.authentication.LazyJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [  
         'rest_framework.permissions.AllowAny',
-    ]
+    ],
+    # Broj proksija ispred Django-a (npr. 1 za nginx): IP klijenta se tada čita iz
+    # X-Forwarded-For. 0 - samo REMOTE_ADDR, zaglavlje od klijenta se ne veruje
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
 }
 
 
 
+# Uloga u access tokenu može da kasni najviše ACCESS_TOKEN_LIFETIME (vidi LazyJWTAuthentication)
 SIMPLE_JWT={
-    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
@@ -213,6 +242,9 @@ if 'RENDER' in os.environ:
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Interna nginx lokacija (npr. /protected-media/) za MEDIA_ROOT: blobove tada
+# šalje web server preko X-Accel-Redirect. Prazno - Django ih služi samo u DEBUG-u.
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
 
  
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend' 
@@ -15,13 +15,17 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path,include
+from django.urls import path,include,re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from football_time_ns.storage import BLOBS_DIR
+from football_time_ns.views import media_blob
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('',include('football_time_ns.urls')),
+    # Slike po hashu sadržaja sa immutable Cache-Control (u produkciji preko X-Accel-Redirect)
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{BLOBS_DIR}/(?P<path>.+)$', media_blob),
 ]
 
 if settings.DEBUG:
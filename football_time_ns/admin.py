@@ -1,6 +1,17 @@
 from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Hall, HallImage, Profile, Availability, Appointment
+from .serializer import image_renditions
+from .models import (
+    APPOINTMENT_NO_OVERLAP, Hall, HallImage, Profile, Availability, Appointment, EmailOutbox, ReportJob,
+    violates_constraint
+)
+
+def preview_url(obj):
+    # Thumb verzija ako je process_images već napravio, inače original
+    return image_renditions(obj, None)['thumbnail']
+
 
 class HallImageInline(admin.TabularInline):
     model = HallImage
@@ -12,7 +23,7 @@ class HallImageInline(admin.TabularInline):
         if obj and getattr(obj, 'image', None):
             return format_html(
                 '<img src="{}" style="max-height:100px; max-width:200px; object-fit:cover; border-radius:4px;" />',
-                obj.image.url
+                preview_url(obj)
             )
         return ""
     preview.short_description = "Preview"
@@ -31,9 +42,9 @@ class HallAdmin(admin.ModelAdmin):
         if hasattr(obj, 'images'):
             first = obj.images.first()
         if first and getattr(first, 'image', None):
-            return format_html('<img src="{}" style="height:50px; border-radius:4px;" />', first.image.url)
+            return format_html('<img src="{}" style="height:50px; border-radius:4px;" />', preview_url(first))
         if getattr(obj, 'image', None):
-            return format_html('<img src="{}" style="height:50px; border-radius:4px;" />', obj.image.url)
+            return format_html('<img src="{}" style="height:50px; border-radius:4px;" />', preview_url(obj))
         return "-"
     image_preview.short_description = "Image"
 
@@ -45,7 +56,7 @@ class HallImageAdmin(admin.ModelAdmin):
 
     def image_preview(self, obj):
         if getattr(obj, 'image', None):
-            return format_html('<img src="{}" style="height:50px; border-radius:4px;" />', obj.image.url)
+            return format_html('<img src="{}" style="height:50px; border-radius:4px;" />', preview_url(obj))
         return ""
     image_preview.short_description = "Preview"
 
@@ -72,12 +83,51 @@ class AppointmentAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'hall__name')
     actions = ['mark_approved', 'mark_rejected']
 
+    def set_status(self, queryset, status):
+        # save() po objektu (a ne queryset.update) da bi signali ažurirali
+        # dnevnu statistiku, poslali email i događaje
+        updated = 0
+        for appointment in queryset.select_related('hall', 'user'):
+            if appointment.status == status:
+                continue
+            appointment.status = status
+            try:
+                with transaction.atomic():
+                    appointment.save()
+                updated += 1
+            except IntegrityError as e:
+                # Preklapa se sa već odobrenim terminom; ostale greške se ne kriju
+                if not violates_constraint(e, APPOINTMENT_NO_OVERLAP):
+                    raise
+        return updated
+
     def mark_approved(self, request, queryset):
-        updated = queryset.update(status='approved')
+        updated = self.set_status(queryset, 'approved')
         self.message_user(request, f"{updated} appointment(s) marked as approved.")
     mark_approved.short_description = "Mark selected appointments as approved"
 
     def mark_rejected(self, request, queryset):
-        updated = queryset.update(status='rejected')
+        updated = self.set_status(queryset, 'rejected')
         self.message_user(request, f"{updated} appointment(s) marked as rejected.")
     mark_rejected.short_description = "Mark selected appointments as rejected"
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
+    actions = ['retry']
+
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} email(s) queued for retry.")
+    retry.short_description = "Retry selected emails"
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'kind', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('owner__username',)
+    readonly_fields = ('params_key', 'data_version', 'started_at', 'finished_at')
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+# Atributi koji se čitaju iz tokena, bez upita u bazu
+TOKEN_USER_ATTRIBUTES = ('id', 'pk', 'role', 'email_verified', 'is_authenticated', 'is_anonymous')
+
+
+class LazyTokenUser(SimpleLazyObject):
+    """
+    request.user za JWT zahteve: id, role i email_verified dolaze iz claim-ova,
+    a User (sa profilom) se učitava tek kada view zatraži nešto drugo.
+    role je None za tokene izdate pre uvođenja claim-a.
+    """
+
+    def __init__(self, user_id, token):
+        def load_user():
+            try:
+                return User.objects.select_related('profile').get(pk=user_id)
+            except User.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+
+        super().__init__(load_user)
+        # simplejwt upisuje claim kao str(user.pk) - poređenja sa owner_id/user_id traže int
+        user_id = User._meta.pk.to_python(user_id)
+        # Direktno u __dict__ - LazyObject.__setattr__ bi učitao korisnika
+        self.__dict__.update(
+            id=user_id,
+            pk=user_id,
+            role=token.get('role'),
+            email_verified=token.get('email_verified'),
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
+    def __bool__(self):
+        # IsAuthenticated radi bool(request.user) - ne sme da učita korisnika
+        return True
+
+    def __repr__(self):
+        return f"<LazyTokenUser {self.__dict__['id']}>"
+
+
+class LazyJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication bez učitavanja korisnika: potpis i rok važenja se proveravaju
+    kao i ranije, a umesto User-a sa profilom ide samo exists() po primarnom ključu,
+    pa obrisan ili deaktiviran nalog odmah gubi pristup.
+    role i email_verified iz tokena mogu da kasne najviše ACCESS_TOKEN_LIFETIME -
+    refresh izdaje access token sa vrednostima iz baze.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        if not User.objects.filter(pk=user_id, is_active=True).exists():
+            raise AuthenticationFailed('User is inactive or deleted', code='user_inactive')
+        return LazyTokenUser(user_id, validated_token)
+
+
+def user_role(user):
+    # Uloga iz tokena kada postoji, inače iz profila (force_authenticate, stari tokeni)
+    role = getattr(user, 'role', None) if isinstance(user, LazyTokenUser) else None
+    if role is None and hasattr(user, 'profile'):
+        role = user.profile.role
+    return role
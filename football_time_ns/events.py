@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+EVENTS_CHANNEL = 'football_events'
+
+
+class InProcessBroker:
+    """
+    Pub/sub unutar jednog procesa. Dovoljan za runserver ili jedan ASGI worker;
+    za više procesa koristi se PostgresBroker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, user_ids, event, data):
+        self.dispatch({'users': [str(uid) for uid in user_ids], 'event': event, 'data': data})
+
+    def dispatch(self, message):
+        with self._lock:
+            targets = [
+                sub for uid in message['users'] for sub in self._subscribers.get(uid, ())
+            ]
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # Petlja pretplatnika je već zatvorena
+                pass
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(str(user_id), set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subs = self._subscribers.get(str(user_id))
+            if subs:
+                subs.discard(subscriber)
+                if not subs:
+                    del self._subscribers[str(user_id)]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fan-out preko Postgres LISTEN/NOTIFY: svaki proces šalje NOTIFY, a jedna
+    pozadinska nit po procesu sluša kanal i prosleđuje poruke lokalnim pretplatnicima.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, user_ids, event, data):
+        message = {'users': [str(uid) for uid in user_ids], 'event': event, 'data': data}
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [EVENTS_CHANNEL, json.dumps(message)])
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def _listen(self):
+        while True:
+            conn = connections.create_connection('default')
+            try:
+                conn.ensure_connection()
+                raw = conn.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {EVENTS_CHANNEL}")
+                while True:
+                    if select.select([raw], [], [], 30) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        notify = raw.notifies.pop(0)
+                        self.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception("Events listener error")
+                time.sleep(5)
+            finally:
+                conn.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+
+def publish(user_ids, event, data):
+    user_ids = [uid for uid in user_ids if uid is not None]
+    if not user_ids:
+        return
+    try:
+        get_broker().publish(user_ids, event, data)
+    except Exception:
+        logger.exception("Error publishing event %s", event)
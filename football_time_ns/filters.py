@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from .free_slots import local_day_bounds
+from .models import Appointment
+
+
+def parse_day(params, name):
+    # YYYY-MM-DD iz query parametra ili None
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError('from/to must be YYYY-MM-DD')
+
+
+def parse_hall(params):
+    value = params.get('hall')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('hall must be a hall id')
+
+
+def filter_appointments(qs, params):
+    """
+    Zajednički filteri za feed-ove i izvoze rezervacija:
+    status=pending,approved  from=YYYY-MM-DD  to=YYYY-MM-DD (po početku termina, Belgrade vreme)
+    hall=<id>
+    """
+    status_q = params.get('status')
+    if status_q:
+        statuses = [s for s in status_q.split(',') if s]
+        valid = {choice for choice, _ in Appointment.STATUS_CHOICES}
+        if not set(statuses) <= valid:
+            raise ValueError(f'status must be one of {sorted(valid)}')
+        qs = qs.filter(status__in=statuses)
+
+    first_day = parse_day(params, 'from')
+    last_day = parse_day(params, 'to')
+    if first_day:
+        qs = qs.filter(start__gte=local_day_bounds(first_day, first_day)[0])
+    if last_day:
+        qs = qs.filter(start__lt=local_day_bounds(last_day, last_day)[1])
+
+    hall_id = parse_hall(params)
+    if hall_id:
+        qs = qs.filter(hall_id=hall_id)
+
+    return qs
+
+
+def filter_daily_stats(qs, params):
+    # Isti from/to/hall filteri nad HallDailyStats (date je već lokalni dan)
+    first_day = parse_day(params, 'from')
+    last_day = parse_day(params, 'to')
+    if first_day:
+        qs = qs.filter(date__gte=first_day)
+    if last_day:
+        qs = qs.filter(date__lte=last_day)
+
+    hall_id = parse_hall(params)
+    if hall_id:
+        qs = qs.filter(hall_id=hall_id)
+
+    return qs
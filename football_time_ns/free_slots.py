@@ -0,0 +1,234 @@
+import time as time_module
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.core.cache import cache
+
+from .models import Appointment, Availability
+
+
+BELGRADE_TZ = pytz.timezone("Europe/Belgrade")
+
+# Dozvoljene dužine slotova u minutima
+SLOT_LENGTHS = (30, 60, 90)
+DEFAULT_SLOT_LENGTH = 60
+
+# Najduži opseg (u danima) koji HallFreeSlots prima u jednom zahtevu
+MAX_RANGE_DAYS = 60
+
+BUSY_STATUSES = ['approved', 'pending']
+
+# Keš slobodnih termina po (hala, verzija, dan, dužina slota). Signali povećavaju
+# verziju hale, a TTL je samo zaštita za izmene koje zaobiđu signale (queryset.update)
+CACHE_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+def local_day_bounds(first_day, last_day):
+    """
+    Vraća [početak first_day, početak dana posle last_day) u Belgrade vremenu
+    """
+    start = BELGRADE_TZ.localize(datetime.combine(first_day, time(0, 0)))
+    end = BELGRADE_TZ.localize(datetime.combine(last_day + timedelta(days=1), time(0, 0)))
+    return start, end
+
+
+def merge_intervals(intervals):
+    # Spaja intervale koji se preklapaju; ulaz mora biti sortiran po početku
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def compute_free_intervals(availabilities, busy_intervals):
+    """
+    Sweep-line oduzimanje zauzetih intervala od dostupnosti.
+    Oba ulaza moraju biti sortirana po početku; složenost je O(A + B).
+    """
+    busy = merge_intervals(busy_intervals)
+    free = []
+    first_busy = 0
+
+    for a_start, a_end in availabilities:
+        # Zauzeti intervali koji su se završili pre ove dostupnosti ne trebaju ni sledećim
+        while first_busy < len(busy) and busy[first_busy][1] <= a_start:
+            first_busy += 1
+
+        cur = a_start
+        i = first_busy
+        while i < len(busy) and busy[i][0] < a_end:
+            b_start, b_end = busy[i]
+            if b_start > cur:
+                free.append((cur, b_start))
+            if b_end > cur:
+                cur = b_end
+            i += 1
+
+        if cur < a_end:
+            free.append((cur, a_end))
+
+    return free
+
+
+def split_into_slots(free_intervals, slot_minutes):
+    # Deli slobodne intervale na slotove zadate dužine
+    step = timedelta(minutes=slot_minutes)
+    slots = []
+    for s, e in free_intervals:
+        cur = s
+        while cur + step <= e:
+            slots.append((cur, cur + step))
+            cur += step
+    return slots
+
+
+def mark_slots(slots, current_time):
+    # Slotovi koji su se već završili nisu dostupni
+    marked = []
+    for s, e in slots:
+        if e > current_time:
+            marked.append({
+                'start': s.isoformat(),
+                'end': e.isoformat(),
+                'available': True
+            })
+        else:
+            marked.append({
+                'start': s.isoformat(),
+                'end': e.isoformat(),
+                'available': False,
+                'reason': 'Termin je u prošlosti'
+            })
+    return marked
+
+
+def free_intervals_by_day(hall_id, first_day, last_day):
+    """
+    Slobodni intervali hale za svaki dan u opsegu [first_day, last_day].
+    Radi sa jednim upitom za dostupnosti i jednim za zauzete termine.
+    Interval koji prelazi ponoć pripada svakom danu koji dodiruje.
+    """
+    range_start, range_end = local_day_bounds(first_day, last_day)
+
+    avails = Availability.objects.filter(
+        hall_id=hall_id, start__lt=range_end, end__gt=range_start
+    ).order_by('start').values_list('start', 'end')
+    avail_list = [(s.astimezone(BELGRADE_TZ), e.astimezone(BELGRADE_TZ)) for s, e in avails]
+
+    busy = Appointment.objects.filter(
+        hall_id=hall_id, status__in=BUSY_STATUSES,
+        start__lt=range_end, end__gt=range_start
+    ).order_by('start').values_list('start', 'end')
+    busy_list = [(s.astimezone(BELGRADE_TZ), e.astimezone(BELGRADE_TZ)) for s, e in busy]
+
+    days = {}
+    day = first_day
+    while day <= last_day:
+        days[day] = []
+        day += timedelta(days=1)
+
+    for s, e in compute_free_intervals(avail_list, busy_list):
+        day = max(s.date(), first_day)
+        last = min((e - timedelta(microseconds=1)).date(), last_day)
+        while day <= last:
+            days[day].append((s, e))
+            day += timedelta(days=1)
+
+    return days
+
+
+def hall_version_key(hall_id):
+    return f"free_slots:version:{hall_id}"
+
+
+def hall_version(hall_id):
+    # Početna vrednost je vreme, da posle praznog keša verzija ne bi ponovo bila ista
+    key = hall_version_key(hall_id)
+    cache.add(key, int(time_module.time() * 1000), timeout=None)
+    return cache.get(key)
+
+
+def cache_key(hall_id, version, day, slot_minutes):
+    return f"free_slots:{hall_id}:{version}:{day.isoformat()}:{slot_minutes}"
+
+
+def _compute_days(hall_id, version, first_day, last_day, slot_minutes):
+    computed = {}
+    for day, free in free_intervals_by_day(hall_id, first_day, last_day).items():
+        computed[day] = {
+            'free_intervals': free,
+            'slots': split_into_slots(free, slot_minutes),
+        }
+    # Ako je izmena stigla dok se računalo, rezultat je možda zastareo - ne upisuje se.
+    # Čak i da se upiše, ide pod staru verziju koju više niko ne čita.
+    if hall_version(hall_id) == version:
+        cache.set_many(
+            {cache_key(hall_id, version, day, slot_minutes): value for day, value in computed.items()},
+            CACHE_TIMEOUT
+        )
+    return computed
+
+
+def cached_free_slots(hall_id, first_day, last_day, slot_minutes):
+    """
+    Slobodni intervali i slotovi po danu, iz keša gde je moguće.
+    Dani kojih nema u kešu računaju se jednim prolazom; samo jedan worker
+    računa isti opseg, ostali kratko čekaju da se keš popuni.
+    Označavanje prošlih slotova radi se pri čitanju (mark_slots).
+    """
+    days = []
+    day = first_day
+    while day <= last_day:
+        days.append(day)
+        day += timedelta(days=1)
+
+    # Verzija se čita pre upita, pa izmena posle ovog trenutka poništava rezultat
+    version = hall_version(hall_id)
+    keys = {cache_key(hall_id, version, day, slot_minutes): day for day in days}
+    found = cache.get_many(keys.keys())
+    result = {keys[key]: value for key, value in found.items()}
+
+    missing = [day for day in days if day not in result]
+    if not missing:
+        return {day: result[day] for day in days}
+
+    missing_first, missing_last = missing[0], missing[-1]
+    lock_key = f"free_slots:lock:{hall_id}:{version}:{missing_first.isoformat()}:{missing_last.isoformat()}:{slot_minutes}"
+
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            result.update(_compute_days(hall_id, version, missing_first, missing_last, slot_minutes))
+        finally:
+            cache.delete(lock_key)
+    else:
+        # Neko drugi već računa - sačekaj njegov rezultat
+        missing_keys = {cache_key(hall_id, version, day, slot_minutes): day for day in missing}
+        deadline = time_module.monotonic() + LOCK_WAIT
+        while missing_keys and time_module.monotonic() < deadline:
+            time_module.sleep(LOCK_POLL_INTERVAL)
+            for key, value in cache.get_many(missing_keys.keys()).items():
+                result[missing_keys.pop(key)] = value
+        if missing_keys:
+            still_missing = sorted(missing_keys.values())
+            result.update(_compute_days(hall_id, version, still_missing[0], still_missing[-1], slot_minutes))
+
+    return {day: result[day] for day in days}
+
+
+def invalidate_free_slots(hall_id):
+    """
+    Povećava verziju keša hale: svi keširani dani postaju nevažeći odjednom,
+    uključujući i dan sa kog je termin pomeren, a upis koji je krenuo pre
+    izmene (stari rezultat) završava pod starom verzijom.
+    """
+    try:
+        cache.incr(hall_version_key(hall_id))
+    except ValueError:
+        hall_version(hall_id)
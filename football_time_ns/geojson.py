@@ -0,0 +1,95 @@
+from django.core.files.storage import default_storage
+from django.db.models import Case, F, FloatField, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce, NullIf
+from rest_framework.renderers import JSONRenderer
+
+from .models import HallImage
+
+
+# Polja koja ?fields= može da traži; geometry ide uvek
+GEOJSON_FIELDS = ('id', 'name', 'price', 'address', 'thumbnail', 'rating', 'distance_km')
+DEFAULT_GEOJSON_FIELDS = ('id', 'name', 'price')
+
+
+class GeoJSONRenderer(JSONRenderer):
+    # Da ?format=geojson ne bi završio kao 404 u DRF content negotiation-u
+    media_type = 'application/geo+json'
+    format = 'geojson'
+
+
+class Longitude(Func):
+    template = 'ST_X(%(expressions)s::geometry)'
+    output_field = FloatField()
+
+
+class Latitude(Func):
+    template = 'ST_Y(%(expressions)s::geometry)'
+    output_field = FloatField()
+
+
+def parse_fields(param, allowed=GEOJSON_FIELDS):
+    if not param:
+        return list(DEFAULT_GEOJSON_FIELDS)
+    fields = [name for name in param.split(',') if name]
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValueError(f"fields must be a subset of {', '.join(allowed)}")
+    return fields
+
+
+def thumbnail_path(prefix=''):
+    # Thumb verzija (process_images) ako odgovara trenutnoj slici, inače original
+    image = F(f'{prefix}image')
+    return Case(
+        When(
+            Q(**{f'{prefix}renditions_source': image, f'{prefix}renditions__has_key': 'thumb'}),
+            then=KT(f'{prefix}renditions__thumb__webp'),
+        ),
+        default=NullIf(image, Value('')),
+    )
+
+
+def hall_feature_collection(queryset, fields, request, limit=None):
+    """
+    FeatureCollection za mapu iz jednog values() upita - bez serializera po hali.
+    thumbnail: glavna slika hale, ili prva iz galerije (thumb verzija kada postoji).
+    rating: prosečna ocena iz Hall.rating_avg (null bez recenzija).
+    """
+    queryset = queryset.annotate(lng=Longitude('location'), lat=Latitude('location'))
+    columns = ['lng', 'lat'] + [name for name in fields if name in ('id', 'name', 'price', 'address')]
+
+    if 'thumbnail' in fields:
+        first_image = HallImage.objects.filter(hall=OuterRef('pk')).order_by('id').annotate(
+            path=thumbnail_path()
+        ).values('path')[:1]
+        queryset = queryset.annotate(thumbnail_path=Coalesce(thumbnail_path(), Subquery(first_image)))
+        columns.append('thumbnail_path')
+    if 'rating' in fields:
+        queryset = queryset.annotate(rating=Case(When(rating_count=0, then=None), default=F('rating_avg')))
+        columns.append('rating')
+    if 'distance_km' in fields:
+        columns.append('distance')
+
+    rows = queryset.values(*columns)
+    if limit is not None:
+        rows = rows[:limit]
+
+    features = []
+    for row in rows:
+        properties = {name: row[name] for name in fields if name in ('id', 'name', 'address')}
+        if 'price' in fields:
+            properties['price'] = float(row['price'])
+        if 'thumbnail' in fields:
+            path = row['thumbnail_path']
+            properties['thumbnail'] = request.build_absolute_uri(default_storage.url(path)) if path else None
+        if 'rating' in fields:
+            properties['rating'] = round(row['rating'], 1) if row['rating'] is not None else None
+        if 'distance_km' in fields:
+            properties['distance_km'] = round(row['distance'].km, 2) if row['distance'] is not None else None
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [row['lng'], row['lat']]},
+            'properties': properties,
+        })
+    return {'type': 'FeatureCollection', 'features': features}
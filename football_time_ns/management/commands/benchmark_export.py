@@ -0,0 +1,88 @@
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from football_time_ns.free_slots import BELGRADE_TZ
+from football_time_ns.models import Appointment, Hall
+from football_time_ns.reports import EXPORT_FORMATS, export_chunks, export_rows
+
+
+SEED_BATCH_SIZE = 5000
+SEED_PLAYERS = 100
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Meri vreme i najveću potrošnju memorije CSV/NDJSON izvoza rezervacija "
+        "kroz export_rows (server-side kursor) nad privremeno ubačenim rezervacijama"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', default='csv', choices=sorted(EXPORT_FORMATS))
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Broj privremenih rezervacija (vraća se rollback-om)")
+        parser.add_argument('--owner', help="Username vlasnika - izvoz njegovih postojećih rezervacija, bez ubacivanja")
+
+    def handle(self, *args, **options):
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"Nema korisnika {options['owner']}")
+            self.measure(owner, options['format'])
+            return
+
+        try:
+            with transaction.atomic():
+                owner = self.seed(options['rows'])
+                self.measure(owner, options['format'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        owner = User.objects.create(username='benchmark_export_owner')
+        hall = Hall.objects.create(name='Benchmark hala', address='-', price=Decimal('3000.00'), owner=owner)
+        players = User.objects.bulk_create([User(username=f'benchmark_igrac{i}') for i in range(SEED_PLAYERS)])
+
+        # bulk_create bez signala: rollup i keš se ne diraju, a sve se ionako vraća
+        start = BELGRADE_TZ.localize(datetime(2020, 1, 1, 8))
+        for offset in range(0, count, SEED_BATCH_SIZE):
+            Appointment.objects.bulk_create([
+                Appointment(
+                    user=players[i % SEED_PLAYERS], hall=hall,
+                    start=start + timedelta(hours=i), end=start + timedelta(hours=i + 1),
+                    status='approved', checked_in=i % 2 == 0, price=hall.price,
+                )
+                for i in range(offset, min(offset + SEED_BATCH_SIZE, count))
+            ])
+        self.stdout.write(f"Ubačeno rezervacija: {count}")
+        return owner
+
+    def measure(self, owner, export_format):
+        rows = export_rows(Appointment.objects.filter(hall__owner=owner))
+
+        tracemalloc.start()
+        started = time.monotonic()
+        size = 0
+        checkpoints = []
+        for i, chunk in enumerate(export_chunks(rows, export_format), start=1):
+            size += len(chunk.encode())
+            if i % 200 == 0:
+                checkpoints.append(tracemalloc.get_traced_memory()[1])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(f"Format: {export_format}, izlaz: {size / 1_000_000:.1f} MB, vreme: {time.monotonic() - started:.1f}s")
+        self.stdout.write(f"Najveća memorija: {peak / 1_000_000:.2f} MB")
+        if checkpoints:
+            # Ako izvoz ne drži redove u memoriji, vrh ostaje isti od početka do kraja
+            self.stdout.write(f"Vrh posle prve i poslednje kontrolne tačke: {checkpoints[0] / 1_000_000:.2f} / {checkpoints[-1] / 1_000_000:.2f} MB")
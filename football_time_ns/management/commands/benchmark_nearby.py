@@ -0,0 +1,60 @@
+import random
+import re
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from football_time_ns.models import Hall
+from football_time_ns.views import NEARBY_DEFAULT_LIMIT, nearby_halls_queryset
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Meri halls_nearby upit nad privremeno ubačenim halama (sve se vraća rollback-om)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--halls', type=int, default=10_000)
+        parser.add_argument('--radius', type=float, default=10.0, help="km")
+        parser.add_argument('--limit', type=int, default=NEARBY_DEFAULT_LIMIT)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        # Nasumične hale oko Beograda (oko 100 x 100 km)
+        rng = random.Random(42)
+        Hall.objects.bulk_create([
+            Hall(
+                name=f"Benchmark {i}", address="-", price=2000,
+                location=Point(20.46 + rng.uniform(-0.6, 0.6), 44.81 + rng.uniform(-0.45, 0.45), srid=4326)
+            )
+            for i in range(options['halls'])
+        ], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Hall._meta.db_table}")
+
+        center = Point(20.46, 44.81, srid=4326)
+        queryset = nearby_halls_queryset(center, options['radius'])[:options['limit']]
+
+        with CaptureQueriesContext(connection) as queries:
+            halls = list(queryset)
+        self.stdout.write(f"Hala u bazi: {Hall.objects.count()}, vraćeno: {len(halls)}, upita: {len(queries)}")
+
+        timings = []
+        for _ in range(options['runs']):
+            plan = queryset.explain(analyze=True)
+            timings.append(float(re.search(r"Execution Time: ([\d.]+) ms", plan).group(1)))
+        timings.sort()
+        self.stdout.write(f"DB vreme (EXPLAIN ANALYZE): median {timings[len(timings) // 2]:.2f} ms, max {timings[-1]:.2f} ms")
+        self.stdout.write(plan)
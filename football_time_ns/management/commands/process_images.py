@@ -0,0 +1,46 @@
+import logging
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+
+from football_time_ns.renditions import create_executor, process_pending
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Pravi thumb/card/full verzije slika hala (jednom ili kao worker sa --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Broj procesa (podrazumevano broj CPU-a)")
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true', help="Radi neprekidno kao worker")
+        parser.add_argument('--interval', type=float, default=2.0, help="Pauza u sekundama kada nema novih slika")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if not options['loop']:
+            with create_executor(options['workers']) as executor:
+                total = 0
+                while True:
+                    processed = process_pending(executor, batch_size)
+                    total += processed
+                    if processed < batch_size:
+                        break
+            self.stdout.write(f"Obrađeno slika: {total}")
+            return
+
+        self.stdout.write("🖼️ Image worker started")
+        while True:
+            # Pool se pravi ponovo ako neki proces umre (OOM killer i sl.)
+            with create_executor(options['workers']) as executor:
+                try:
+                    while True:
+                        if process_pending(executor, batch_size) < batch_size:
+                            time.sleep(options['interval'])
+                except BrokenProcessPool:
+                    logger.exception("Image process pool broke, restarting")
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_time_ns.verification import PURGE_BATCH_SIZE, purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Briše istekle verifikacione tokene (jednom ili periodično sa --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Radi neprekidno kao worker")
+        parser.add_argument('--interval', type=float, default=3600.0, help="Pauza u sekundama između čišćenja")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        while True:
+            total = 0
+            while True:
+                deleted = purge_expired_tokens(batch_size)
+                total += deleted
+                if deleted < batch_size:
+                    break
+            self.stdout.write(f"Obrisano isteklih tokena: {total}")
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
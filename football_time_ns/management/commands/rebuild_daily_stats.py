@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from football_time_ns.rollup import diff_daily_stats, rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Ponovo računa HallDailyStats iz Appointment tabele (ili samo proverava sa --verify)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Samo uporedi sačuvani zbir sa izračunatim")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = diff_daily_stats()
+            for hall_id, day, stored, expected in differences:
+                self.stdout.write(f"Hala {hall_id}, {day}: sačuvano {stored}, očekivano {expected}")
+            if differences:
+                raise CommandError(f"HallDailyStats se razlikuje u {len(differences)} dana")
+            self.stdout.write(self.style.SUCCESS("HallDailyStats je ispravan"))
+            return
+
+        count = rebuild_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f"HallDailyStats ponovo izračunat: {count} dana"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from football_time_ns.ratings import diff_hall_ratings, recompute_hall_ratings
+
+
+class Command(BaseCommand):
+    help = "Ponovo računa ocene hala (rating_count, rating_sum, histogram) iz Review tabele"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Samo uporedi sačuvane ocene sa izračunatim")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = diff_hall_ratings()
+            for hall_id, stored, expected in differences:
+                self.stdout.write(f"Hala {hall_id}: sačuvano {stored}, očekivano {expected}")
+            if differences:
+                raise CommandError(f"Ocene se razlikuju za {len(differences)} hala")
+            self.stdout.write(self.style.SUCCESS("Ocene hala su ispravne"))
+            return
+
+        count = recompute_hall_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Ocene ponovo izračunate, izmenjeno hala: {count}"))
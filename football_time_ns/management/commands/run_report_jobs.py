@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_time_ns.report_jobs import purge_old_reports, run_pending
+
+
+class Command(BaseCommand):
+    help = "Pravi izveštaje iz ReportJob reda (jednom ili kao worker sa --loop) i briše stare izveštaje"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Radi neprekidno kao worker")
+        parser.add_argument('--interval', type=float, default=2.0, help="Pauza u sekundama kada nema poslova")
+        parser.add_argument('--purge-interval', type=float, default=3600.0, help="Pauza u sekundama između brisanja starih izveštaja")
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            total = 0
+            while True:
+                processed = run_pending()
+                total += processed
+                if not processed:
+                    break
+            self.stdout.write(f"Obrađeno izveštaja: {total}")
+            self.stdout.write(f"Obrisano starih izveštaja: {purge_old_reports()}")
+            return
+
+        self.stdout.write("📄 Report worker started")
+        last_purge = 0
+        while True:
+            if time.monotonic() - last_purge >= options['purge_interval']:
+                purge_old_reports()
+                last_purge = time.monotonic()
+            if not run_pending():
+                time.sleep(options['interval'])
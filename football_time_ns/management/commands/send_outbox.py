@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from football_time_ns.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Šalje email poruke iz EmailOutbox tabele (jednom ili kao worker sa --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Radi neprekidno kao worker")
+        parser.add_argument('--interval', type=float, default=5.0, help="Pauza u sekundama kada je outbox prazan")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if not options['loop']:
+            total = 0
+            while True:
+                sent = send_pending(batch_size)
+                total += sent
+                if sent < batch_size:
+                    break
+            self.stdout.write(f"Obrađeno poruka: {total}")
+            return
+
+        self.stdout.write("📧 Outbox worker started")
+        while True:
+            sent = send_pending(batch_size)
+            if sent < batch_size:
+                time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:24
+
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+import django.contrib.postgres.fields.ranges
+import football_time_ns.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0018_alter_hall_image_alter_hallimage_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='appointment',
+            name='period',
+            field=models.GeneratedField(db_persist=True, expression=football_time_ns.models.TsTzRange('start', 'end'), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()),
+        ),
+        migrations.AddField(
+            model_name='availability',
+            name='period',
+            field=models.GeneratedField(db_persist=True, expression=football_time_ns.models.TsTzRange('start', 'end'), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status', 'approved')), expressions=[('hall', '='), ('period', '&&')], name='appointment_approved_no_overlap'),
+        ),
+        migrations.AddConstraint(
+            model_name='availability',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('hall', '='), ('period', '&&')], name='availability_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0021_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HallDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('checked_in', models.PositiveIntegerField(default=0)),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='football_time_ns.hall')),
+            ],
+            options={
+                'ordering': ['hall', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('hall', 'date'), name='hall_daily_stats_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0023_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hall',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='renditions_source',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='hallimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='hallimage',
+            name='renditions_source',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:54
+
+import football_time_ns.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0024_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='hall',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=football_time_ns.storage.ContentAddressedStorage(), upload_to='halls/'),
+        ),
+        migrations.AlterField(
+            model_name='hallimage',
+            name='image',
+            field=models.ImageField(storage=football_time_ns.storage.ContentAddressedStorage(), upload_to='halls/'),
+        ),
+    ]
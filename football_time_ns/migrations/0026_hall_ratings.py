@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:57
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_ratings(apps, schema_editor):
+    # Početne vrednosti iz postojećih recenzija
+    Hall = apps.get_model('football_time_ns', 'Hall')
+    Review = apps.get_model('football_time_ns', 'Review')
+    rows = Review.objects.values('hall_id').annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{value}': Count('id', filter=Q(rating=value)) for value in range(1, 6)},
+    ).order_by()
+    for row in rows:
+        Hall.objects.filter(pk=row.pop('hall_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0025_mediablob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hall',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hall',
+            name='rating_avg',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(rating_count=0, then=models.Value(0.0)), default=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('rating_sum', models.FloatField()), '/', django.db.models.functions.comparison.Cast('rating_count', models.FloatField()))), output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='hall',
+            index=models.Index(fields=['-rating_avg', '-rating_count', 'id'], name='hall_rating_idx'),
+        ),
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+    ]
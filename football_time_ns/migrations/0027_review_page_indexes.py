@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0026_hall_ratings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['hall', '-created_at', '-id'], name='review_hall_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='review_user_page_idx'),
+        ),
+    ]
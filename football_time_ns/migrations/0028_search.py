@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.lookups import Unaccent
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_search_vectors(apps, schema_editor):
+    # Isti vektori kao search.hall_search_vector / review_search_vector
+    Hall = apps.get_model('football_time_ns', 'Hall')
+    Review = apps.get_model('football_time_ns', 'Review')
+    Hall.objects.update(search_vector=(
+        SearchVector(Unaccent(F('name')), weight='A', config='simple')
+        + SearchVector(Unaccent(F('address')), weight='B', config='simple')
+        + SearchVector(Unaccent(F('description')), weight='C', config='simple')
+    ))
+    Review.objects.update(search_vector=SearchVector(Unaccent(Coalesce(F('comment'), Value(''))), config='simple'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0027_review_page_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.AddField(
+            model_name='hall',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='hall',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='hall_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hall',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='hall_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='review_search_idx'),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:05
+
+import hashlib
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_verification_tokens(apps, schema_editor):
+    # Postojeći linkovi i dalje važe do date_joined + 1 dan (stari rok)
+    Profile = apps.get_model('football_time_ns', 'Profile')
+    EmailVerificationToken = apps.get_model('football_time_ns', 'EmailVerificationToken')
+    profiles = Profile.objects.exclude(verification_token__isnull=True).exclude(verification_token='')
+    EmailVerificationToken.objects.bulk_create([
+        EmailVerificationToken(
+            user_id=profile.user_id,
+            token_hash=hashlib.sha256(profile.verification_token.encode()).hexdigest(),
+            expires_at=profile.user.date_joined + timedelta(days=1),
+        )
+        for profile in profiles.select_related('user').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0028_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailVerificationToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(move_verification_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='profile',
+            name='verification_token',
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0029_email_verification_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='halldailystats',
+            name='realized_revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='halldailystats',
+            name='revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytz
+from django.db import migrations
+from django.db.models import Count, F, Func, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+BELGRADE_TZ = pytz.timezone("Europe/Belgrade")
+
+
+class DurationMinutes(Func):
+    # Kopija iz rollup.py u trenutku migracije - migracija ne sme da zavisi od živog koda
+    template = "FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / 60)::integer"
+    output_field = IntegerField()
+
+
+def fill_appointment_prices(apps, schema_editor):
+    # Za postojeće rezervacije jedina poznata cena je trenutna cena hale
+    Appointment = apps.get_model('football_time_ns', 'Appointment')
+    Hall = apps.get_model('football_time_ns', 'Hall')
+    Appointment.objects.filter(price__isnull=True).update(
+        price=Subquery(Hall.objects.filter(pk=OuterRef('hall_id')).values('price')[:1])
+    )
+
+
+def backfill_daily_stats(apps, schema_editor):
+    # 0022 je napravio praznu tabelu: signali bi umanjivali nepostojeće redove
+    # (CHECK >= 0), a mesečna statistika bi krenula od nule za stare rezervacije
+    Appointment = apps.get_model('football_time_ns', 'Appointment')
+    HallDailyStats = apps.get_model('football_time_ns', 'HallDailyStats')
+
+    approved = Q(status='approved')
+    rows = Appointment.objects.annotate(
+        date=TruncDate('start', tzinfo=BELGRADE_TZ)
+    ).values('hall_id', 'date').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=approved),
+        rejected=Count('id', filter=Q(status='rejected')),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        checked_in=Count('id', filter=Q(status='approved', checked_in=True)),
+        booked_minutes=Sum(DurationMinutes(F('end') - F('start')), filter=approved, default=0),
+        revenue=Sum('price', filter=approved, default=Decimal('0')),
+        realized_revenue=Sum('price', filter=Q(status='approved', checked_in=True), default=Decimal('0')),
+    ).order_by()
+
+    HallDailyStats.objects.all().delete()
+    HallDailyStats.objects.bulk_create((HallDailyStats(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0030_appointment_price_daily_revenue'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_appointment_prices, migrations.RunPython.noop),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0031_backfill_daily_stats'),
+    ]
+
+    operations = [
+        # Pločice i klasteri filtriraju po location::geometry - indeks na geography se tu ne koristi
+        migrations.RunSQL(
+            'CREATE INDEX hall_location_geometry_idx ON football_time_ns_hall USING GIST ((location::geometry))',
+            'DROP INDEX hall_location_geometry_idx',
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def fail_duplicate_jobs(apps, schema_editor):
+    # Pre report_job_active_unique: od duplikata na čekanju / u radu ostaje najstariji
+    ReportJob = apps.get_model('football_time_ns', 'ReportJob')
+    seen = set()
+    duplicates = []
+    active = ReportJob.objects.filter(status__in=['pending', 'running']).order_by('created_at', 'id')
+    for job_id, owner_id, key, version in active.values_list('id', 'owner_id', 'params_key', 'data_version'):
+        if (owner_id, key, version) in seen:
+            duplicates.append(job_id)
+        seen.add((owner_id, key, version))
+    ReportJob.objects.filter(pk__in=duplicates).update(status='failed', error='Duplikat')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0032_hall_location_geometry_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+    ]
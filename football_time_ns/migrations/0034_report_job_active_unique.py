@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football_time_ns', '0033_fail_duplicate_report_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('owner', 'params_key', 'data_version'), name='report_job_active_unique'),
+        ),
+    ]
@@ -1,10 +1,24 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.db.models.functions import Cast
 from PIL import Image
 import io
 
+from .storage import image_storage
+
+
+class TsTzRange(models.Func):
+    # tstzrange(start, end) - poluotvoren interval [start, end)
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
 
 class Hall(models.Model):
     name = models.CharField(max_length=100)
@@ -14,6 +28,7 @@ class Hall(models.Model):
     owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='halls')
     image = models.ImageField(
         upload_to="halls/", 
+        storage=image_storage,
         null=True, 
         blank=True,
         
@@ -21,9 +36,48 @@ class Hall(models.Model):
         height_field=None
     ) 
     location = gis_models.PointField(geography=True, null=True, blank=True)
+    # Umanjene verzije slike (thumb/card/full, WebP+JPEG) koje pravi process_images worker;
+    # važe samo dok je renditions_source jednak imenu trenutne slike
+    renditions = models.JSONField(default=dict, blank=True)
+    renditions_source = models.CharField(max_length=255, blank=True, default='')
+    # Zbir ocena iz Review koji održava ratings.apply_rating_change; rating_1..rating_5 su histogram
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    # Prosek računa baza (0 bez recenzija), da bi ?ordering=-rating i ?min_rating= išli preko indeksa
+    rating_avg = models.GeneratedField(
+        expression=models.Case(
+            models.When(rating_count=0, then=models.Value(0.0)),
+            default=Cast('rating_sum', models.FloatField()) / Cast('rating_count', models.FloatField()),
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
+
+    # Ime (A), adresa (B) i opis (C) bez dijakritika; osvežava se posle save (search.update_search_vector)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    RATING_FIELDS = ('rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating_avg', '-rating_count', 'id'], name='hall_rating_idx'),
+            GinIndex(fields=['search_vector'], name='hall_search_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='hall_name_trgm_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        
+        # Izmena hale ne sme da prepiše ocene starim vrednostima sa instance
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name not in self.RATING_FIELDS
+            ]
+
         if self.image and hasattr(self.image, 'file'):
             
             super().save(*args, **kwargs)
@@ -39,9 +93,12 @@ class HallImage(models.Model):
     hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(
         upload_to="halls/",
+        storage=image_storage,
         width_field=None,
         height_field=None
     )
+    renditions = models.JSONField(default=dict, blank=True)
+    renditions_source = models.CharField(max_length=255, blank=True, default='')
 
     def save(self, *args, **kwargs):
         # Preskoči procesiranje slika
@@ -60,22 +117,64 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='player')
     email_verified = models.BooleanField(default=False)  
-    verification_token = models.CharField(max_length=100, blank=True, null=True)  
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
 
+# Exclusion constraint-i za preklapanje (views/admin ih prepoznaju po imenu)
+AVAILABILITY_NO_OVERLAP = 'availability_no_overlap'
+APPOINTMENT_NO_OVERLAP = 'appointment_approved_no_overlap'
+
+
+def violates_constraint(error, name):
+    # IntegrityError od psycopg-a: ime prekršenog constraint-a je u diag
+    diag = getattr(error.__cause__, 'diag', None)
+    return getattr(diag, 'constraint_name', None) == name
+
+
 class Availability(models.Model):
     hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='availabilities')
     start = models.DateTimeField()
     end = models.DateTimeField()
+    period = models.GeneratedField(
+        expression=TsTzRange('start', 'end'),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+    )
 
     class Meta:
         ordering = ['hall', 'start']
+        constraints = [
+            # Baza sama odbija preklapanje dostupnosti iste hale
+            ExclusionConstraint(
+                name=AVAILABILITY_NO_OVERLAP,
+                index_type='GIST',
+                expressions=[
+                    ('hall', RangeOperators.EQUAL),
+                    ('period', RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.hall.name}: {self.start} - {self.end}"
 
+
+def snapshot(appointment):
+    # Stanje rezervacije koje utiče na HallDailyStats (bez upita za deferred polja)
+    values = appointment.__dict__
+    if values.get('start') is None or values.get('hall_id') is None:
+        return None
+    return {
+        'hall_id': values['hall_id'],
+        'start': values['start'],
+        'end': values.get('end'),
+        'status': values.get('status'),
+        'checked_in': values.get('checked_in'),
+        'price': values.get('price'),
+    }
+
+
 class Appointment(models.Model):
     STATUS_CHOICES = (
         ('pending','Pending'),
@@ -89,9 +188,41 @@ class Appointment(models.Model):
     end = models.DateTimeField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     checked_in = models.BooleanField(default=False)
+    # Cena hale u trenutku rezervacije - kasnija promena cene ne menja prihod
+    price = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    period = models.GeneratedField(
+        expression=TsTzRange('start', 'end'),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+    )
 
     class Meta:
         ordering = ['-start']   
+        constraints = [
+            # Dva odobrena termina iste hale ne smeju da se preklapaju
+            ExclusionConstraint(
+                name=APPOINTMENT_NO_OVERLAP,
+                index_type='GIST',
+                expressions=[
+                    ('hall', RangeOperators.EQUAL),
+                    ('period', RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status='approved'),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.price is None and self.hall_id is not None:
+            self.price = self.hall.price
+        super().save(*args, **kwargs)
+        # post_save handleri su poredili sa starim stanjem, sledeći save poredi sa ovim
+        self.remember_state()
+
+    def remember_state(self):
+        # __dict__ umesto self.status da deferred polje ne okine dodatni upit
+        self._original_status = self.__dict__.get('status')
+        self._original_state = snapshot(self)
 
     def __str__(self):
         return f"{self.hall.name} | {self.user.username} | {self.start} - {self.end} ({self.status})"
@@ -112,11 +243,154 @@ class Review(models.Model):
     rating = models.IntegerField(choices=RATING_CHOICES)
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     owner_seen = models.BooleanField(default=False) 
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'appointment']  
+        # Keyset paginacija recenzija hale / korisnika po (created_at, id)
+        indexes = [
+            models.Index(fields=['hall', '-created_at', '-id'], name='review_hall_page_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='review_user_page_idx'),
+            GinIndex(fields=['search_vector'], name='review_search_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.hall.name} - {self.rating}★"
\ No newline at end of file
+        return f"{self.user.username} - {self.hall.name} - {self.rating}★"
+
+
+class HallDailyStats(models.Model):
+    """
+    Dnevni zbir rezervacija po hali (dan po Europe/Belgrade, po početku termina).
+    Održava se inkrementalno iz signala; rebuild_daily_stats ga računa iz početka.
+    Prihod (odobrene / realizovane) se sabira po ceni iz rezervacije, pa promena
+    cene hale ne menja prošle mesece.
+    """
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    checked_in = models.PositiveIntegerField(default=0)
+    booked_minutes = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    realized_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['hall', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['hall', 'date'], name='hall_daily_stats_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.hall.name} | {self.date}: {self.total}"
+
+
+class EmailOutbox(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    )
+
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} | {self.subject} ({self.status})"
+
+
+
+class ReportJob(models.Model):
+    """
+    Izvoz (PDF/CSV/NDJSON) koji renderuje run_report_jobs worker u MEDIA_ROOT/reports/.
+    params_key + data_version određuju da li se gotov fajl može ponovo iskoristiti.
+    """
+    KIND_CHOICES = (
+        ('pdf', 'PDF'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    params_key = models.CharField(max_length=64)
+    data_version = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)
+    file = models.FileField(upload_to='reports/', blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'params_key', 'data_version'], name='report_job_cache_idx'),
+            models.Index(fields=['status', 'created_at'], name='report_job_status_idx'),
+        ]
+        constraints = [
+            # Najviše jedan posao na čekanju / u radu za isti izvoz i istu verziju podataka
+            models.UniqueConstraint(
+                fields=['owner', 'params_key', 'data_version'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='report_job_active_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.owner.username} | {self.kind} ({self.status}, {self.progress}%)"
+
+
+class EmailVerificationToken(models.Model):
+    """
+    Verifikacioni link: čuva se samo SHA-256 tokena (unique indeks), pa se
+    link pronalazi bez skeniranja tabele, a iz baze se ne može rekonstruisati.
+    Istekli redovi se brišu komandom purge_verification_tokens.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='verification_tokens')
+    token_hash = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} (do {self.expires_at})"
+
+
+class MediaBlob(models.Model):
+    """
+    Fajl u ContentAddressedStorage (blobs/ab/cd/<sha256>.<ext>).
+    refcount je broj slika (Hall.image, HallImage.image) koje ga koriste;
+    fajl se briše tek kada padne na nulu.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
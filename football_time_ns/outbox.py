@@ -0,0 +1,87 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+# Posle MAX_ATTEMPTS neuspelih slanja poruka ide u 'dead' (dead-letter)
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = timedelta(minutes=1)
+MAX_BACKOFF = timedelta(hours=1)
+
+
+def enqueue_email(subject, message, recipient):
+    """
+    Upisuje email u outbox u tekućoj transakciji. Slanje radi send_outbox
+    komanda, pa zahtev (odobravanje, registracija) ne čeka SMTP.
+    """
+    return EmailOutbox.objects.create(recipient=recipient, subject=subject, body=message)
+
+
+def backoff(attempts):
+    return min(BASE_BACKOFF * (2 ** (attempts - 1)), MAX_BACKOFF)
+
+
+def mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'dead'
+        logger.error("Email %s to %s moved to dead-letter: %s", email.id, email.recipient, error)
+    else:
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+
+
+def send_pending(batch_size=50):
+    """
+    Šalje jednu seriju poruka preko jedne SMTP konekcije.
+    select_for_update(skip_locked) dozvoljava više paralelnih workera.
+    Vraća broj obrađenih poruka.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        connection = get_connection()
+        try:
+            connection.open()
+            for email in batch:
+                try:
+                    EmailMessage(
+                        subject=email.subject,
+                        body=email.body,
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        to=[email.recipient],
+                        connection=connection,
+                    ).send()
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                except Exception as e:
+                    mark_failed(email, e)
+        except Exception as e:
+            # Konekcija nije ni otvorena - cela serija ide na ponovni pokušaj
+            logger.warning("SMTP connection error: %s", e)
+            for email in batch:
+                if email.status == 'pending':
+                    mark_failed(email, e)
+        finally:
+            connection.close()
+
+        EmailOutbox.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return len(batch)
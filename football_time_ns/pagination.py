@@ -0,0 +1,109 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) paginacija po uređenom skupu polja, npr. ('-start', '-id').
+    Svaka strana nastavlja od vrednosti poslednjeg reda prethodne strane
+    (WHERE (start, id) < (...)), pa je cena strane ista koliko god da je tabela velika.
+    Poslednje polje u ordering-u mora biti jedinstveno (id).
+    """
+    ordering = ('-id',)
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = [(f.lstrip('-'), f.startswith('-')) for f in self.ordering]
+        self.model = queryset.model
+
+        limit = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(cursor))
+
+        rows = list(queryset.order_by(*self.ordering)[:limit + 1])
+        self.has_next = len(rows) > limit
+        self.page = rows[:limit]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def keyset_filter(self, values):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), uz smer svakog polja
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, obj):
+        values = []
+        for name, _ in self.fields:
+            value = getattr(obj, name)
+            if isinstance(value, Decimal):
+                # Decimal (cena) kao string - field.to_python ga vraća bez gubitka
+                value = str(value)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            values = json.loads(raw)
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [self.to_python(name, value) for (name, _), value in zip(self.fields, values)]
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+    def to_python(self, name, value):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Anotacija (npr. score pretrage) - broj iz JSON-a se koristi kakav jeste
+            if not isinstance(value, (int, float)):
+                raise ValueError(name)
+            return value
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data, **extra):
+        return Response({
+            **extra,
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Hall, Review
+
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+RATING_FIELDS = Hall.RATING_FIELDS
+
+
+def apply_rating_change(hall_id, old_rating=None, new_rating=None):
+    """
+    Menja brojače hale jednim UPDATE-om sa F izrazima, bez čitanja i bez
+    trke sa drugim recenzijama. old_rating/new_rating su None za novu/obrisanu recenziju.
+    """
+    deltas = defaultdict(int)
+    for rating, sign in ((old_rating, -1), (new_rating, 1)):
+        if rating is None:
+            continue
+        deltas['rating_count'] += sign
+        deltas['rating_sum'] += sign * rating
+        deltas[f'rating_{rating}'] += sign
+
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes:
+        Hall.objects.filter(pk=hall_id).update(**changes)
+
+
+def compute_hall_ratings():
+    # {hall_id: {polje: vrednost}} izračunato iz Review tabele
+    rows = Review.objects.values('hall_id').annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{value}': Count('id', filter=Q(rating=value)) for value in RATING_VALUES},
+    ).order_by()
+    return {row.pop('hall_id'): row for row in rows}
+
+
+def diff_hall_ratings():
+    """
+    Razlike između sačuvanih i izračunatih ocena: [(hall_id, sačuvano, očekivano)].
+    """
+    expected = compute_hall_ratings()
+    empty = dict.fromkeys(RATING_FIELDS, 0)
+    differences = []
+    for row in Hall.objects.order_by('id').values('id', *RATING_FIELDS):
+        hall_id = row.pop('id')
+        if row != expected.get(hall_id, empty):
+            differences.append((hall_id, row, expected.get(hall_id, empty)))
+    return differences
+
+
+@transaction.atomic
+def recompute_hall_ratings():
+    # Zaključava hale, da recenzija koja stigne u međuvremenu ne bude izgubljena
+    halls = list(Hall.objects.select_for_update().order_by('id').only('id', *RATING_FIELDS))
+    expected = compute_hall_ratings()
+    empty = dict.fromkeys(RATING_FIELDS, 0)
+    changed = []
+    for hall in halls:
+        values = expected.get(hall.id, empty)
+        if any(getattr(hall, field) != values[field] for field in RATING_FIELDS):
+            for field in RATING_FIELDS:
+                setattr(hall, field, values[field])
+            changed.append(hall)
+    Hall.objects.bulk_update(changed, RATING_FIELDS, batch_size=500)
+    return len(changed)
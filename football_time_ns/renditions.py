@@ -0,0 +1,145 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.db.models import F
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Hall, HallImage
+
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+# Naziv -> najduža ivica u pikselima (manje slike se ne uvećavaju)
+RENDITION_SIZES = (
+    ('thumb', 320),
+    ('card', 800),
+    ('full', 1600),
+)
+RENDITION_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+# Modeli čija se polja image obrađuju
+RENDITION_MODELS = (Hall, HallImage)
+
+
+class BadImage(Exception):
+    """
+    Slika ne može da se dekodira (ili je nema) - obrada se ne ponavlja.
+    Ostale greške (pun disk, ubijen proces) ostavljaju sliku na čekanju.
+    """
+
+
+def rendition_name(source_name, label, extension):
+    # renditions/halls/slika1.jpeg/thumb.webp - nova slika (novo ime) dobija nov direktorijum
+    return f"{RENDITIONS_DIR}/{source_name}/{label}.{extension}"
+
+
+def flatten_alpha(image):
+    # JPEG nema providnost - providni delovi postaju beli
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_renditions(media_root, source_name):
+    """
+    Pravi thumb/card/full u WebP i JPEG formatu za jednu sliku.
+    Izvršava se u procesu iz ProcessPoolExecutor-a, pa radi samo sa putanjama.
+    Orijentacija iz EXIF-a se primeni na piksele, a metapodaci (EXIF, GPS, ICC) se ne upisuju.
+    Vraća {label: {'width', 'height', 'webp', 'jpeg'}}.
+    """
+    try:
+        with Image.open(os.path.join(media_root, source_name)) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError) as e:
+        raise BadImage(str(e)) from e
+    except OSError as e:
+        # PIL greške dekodiranja (npr. "image file is truncated") nemaju errno;
+        # sa errno je greška sistema (EIO, EMFILE...) i pokušava se ponovo
+        if e.errno is None or isinstance(e, FileNotFoundError):
+            raise BadImage(str(e)) from e
+        raise
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    image.info = {}
+
+    renditions = {}
+    for label, size in RENDITION_SIZES:
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+
+        for extension, pil_format, options in RENDITION_FORMATS:
+            output = resized if extension == 'webp' or not has_alpha else flatten_alpha(resized)
+            name = rendition_name(source_name, label, extension)
+            path = os.path.join(media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Upis u privremeni fajl pa rename, da se nikad ne servira pola slike
+            partial = f"{path}.part"
+            output.save(partial, pil_format, **options)
+            os.replace(partial, path)
+            entry[extension] = name
+
+        renditions[label] = entry
+    return renditions
+
+
+def pending_images(limit):
+    """
+    Imena slika čiji renditions ne odgovaraju trenutnoj slici. Isti sadržaj
+    ima isto ime (ContentAddressedStorage), pa se obrađuje jednom za sve redove.
+    """
+    names = []
+    for model in RENDITION_MODELS:
+        rows = model.objects.exclude(image='').exclude(image=F('renditions_source'))
+        for name in rows.order_by('image').values_list('image', flat=True).distinct()[:limit]:
+            if name not in names:
+                names.append(name)
+    return names[:limit]
+
+
+def process_pending(executor, limit=20):
+    """
+    Šalje do limit slika u process pool i upisuje rezultate u sve redove sa tom slikom.
+    Update je uslovljen imenom slike, pa se rezultat za staru sliku odbacuje
+    ako je u međuvremenu zamenjena. Vraća broj obrađenih slika (i neispravnih);
+    slike sa prolaznom greškom ostaju na čekanju. BrokenProcessPool se prosleđuje
+    posle ostalih rezultata - pool tada mora da se napravi ponovo.
+    """
+    pending = pending_images(limit)
+    futures = {executor.submit(render_renditions, settings.MEDIA_ROOT, name): name for name in pending}
+    processed = 0
+    broken = None
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            renditions = future.result()
+        except BadImage as e:
+            # Neispravna slika: ostaje original, i ne pokušava se ponovo
+            logger.warning("Renditions skipped for %s: %s", name, e)
+            renditions = {}
+        except BrokenProcessPool as e:
+            broken = e
+            continue
+        except Exception:
+            logger.exception("Renditions failed for %s, will retry", name)
+            continue
+        for model in RENDITION_MODELS:
+            model.objects.filter(image=name).update(renditions=renditions, renditions_source=name)
+        processed += 1
+    if broken is not None:
+        raise broken
+    return processed
+
+
+def create_executor(workers=None):
+    # django.setup u svakom procesu, da radi i sa spawn/forkserver start metodom
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .events import publish
+from .filters import filter_appointments
+from .models import Appointment, Hall, ReportJob
+from .reports import REPORT_FILTERS, build_owner_pdf, export_chunks, export_rows, report_appointments
+
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = 'reports'
+
+# Koji query parametri ulaze u koji izvoz
+JOB_PARAMS = {
+    'pdf': REPORT_FILTERS,
+    'csv': REPORT_FILTERS + ('status',),
+    'ndjson': REPORT_FILTERS + ('status',),
+}
+
+# Posle koliko redova se upisuje napredak
+PROGRESS_STEP = 1000
+# Posao koji je 'running' duže od ovoga je ostao od palog workera i kreće ispočetka
+STALE_AFTER = timedelta(hours=1)
+# Koliko dugo se čuvaju gotovi i neuspeli poslovi (i njihovi fajlovi)
+REPORT_RETENTION = timedelta(days=7)
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def job_params(kind, params):
+    return {name: params.get(name) for name in JOB_PARAMS[kind] if params.get(name)}
+
+
+def params_key(kind, params):
+    raw = json.dumps([kind, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def data_version(owner):
+    """
+    Verzija podataka vlasnika: menja se kada se rezervacija doda, promeni ili
+    obriše (broj + poslednji updated_at) ili kada se promeni hala (ime, cena).
+    """
+    appointments = Appointment.objects.filter(hall__owner=owner).aggregate(
+        count=Count('id'), updated=Max('updated_at')
+    )
+    halls = list(Hall.objects.filter(owner=owner).order_by('id').values_list('id', 'name', 'price'))
+    halls_hash = hashlib.sha256(repr(halls).encode()).hexdigest()[:16]
+    updated = appointments['updated'].isoformat() if appointments['updated'] else '-'
+    return f"{appointments['count']}:{updated}:{halls_hash}"
+
+
+def enqueue_report(owner, kind, params):
+    """
+    Vraća (job, created). Ako isti izvoz sa istim parametrima i istom verzijom
+    podataka već postoji (na čekanju, u radu ili gotov), vraća se taj posao.
+    Neispravni filteri dižu ValueError.
+    """
+    params = job_params(kind, params)
+    filter_appointments(Appointment.objects.none(), params)
+
+    key = params_key(kind, params)
+    version = data_version(owner)
+    jobs = ReportJob.objects.filter(owner=owner, params_key=key, data_version=version)
+    existing = jobs.filter(status__in=[*ACTIVE_STATUSES, 'done']).first()
+    if existing and (existing.status != 'done' or os.path.exists(existing.file.path)):
+        return existing, False
+
+    # report_job_active_unique: od istovremenih zahteva samo jedan pravi posao
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                owner=owner, kind=kind, params=params, params_key=key, data_version=version
+            )
+    except IntegrityError:
+        job = jobs.filter(status__in=ACTIVE_STATUSES).first()
+        if job is None:
+            raise
+        return job, False
+    return job, True
+
+
+def claim_next_job():
+    # select_for_update(skip_locked) - više workera ne uzima isti posao
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | Q(status='running', started_at__lt=timezone.now() - STALE_AFTER)
+        ).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.progress = 0
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'progress', 'started_at'])
+    return job
+
+
+def track_progress(job, rows, total):
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if total and done % PROGRESS_STEP == 0:
+            ReportJob.objects.filter(pk=job.pk).update(progress=min(99, done * 100 // total))
+
+
+def render_job(job, path):
+    if job.kind == 'pdf':
+        appointments = report_appointments(job.owner, job.params)
+        total = appointments.count()
+        with open(path, 'wb') as output:
+            build_owner_pdf(job.owner, job.params, output, track=lambda rows: track_progress(job, rows, total))
+        return
+
+    appointments = filter_appointments(Appointment.objects.filter(hall__owner=job.owner), job.params)
+    total = appointments.count()
+    rows = track_progress(job, export_rows(appointments), total)
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        for chunk in export_chunks(rows, job.kind):
+            output.write(chunk)
+
+
+def run_job(job):
+    name = f"{REPORTS_DIR}/{job.owner_id}/{uuid.uuid4().hex}.{job.kind}"
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Renderuje se u .part fajl, pa se gotov fajl nikad ne vidi napola napisan
+    partial = path + '.part'
+    try:
+        render_job(job, partial)
+        os.replace(partial, path)
+    except Exception as e:
+        logger.exception("Report job %s failed", job.id)
+        if os.path.exists(partial):
+            os.remove(partial)
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        publish([job.owner_id], 'report_failed', {'id': job.id, 'kind': job.kind})
+        return
+
+    job.file.name = name
+    job.status = 'done'
+    job.progress = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'progress', 'finished_at'])
+    publish([job.owner_id], 'report_ready', {'id': job.id, 'kind': job.kind})
+
+    # Isti izvoz nad starijim podacima više niko ne traži
+    delete_jobs(ReportJob.objects.filter(
+        owner_id=job.owner_id, params_key=job.params_key, status__in=['done', 'failed']
+    ).exclude(pk=job.pk))
+
+
+def delete_jobs(jobs):
+    # Briše poslove zajedno sa fajlovima; vraća broj obrisanih
+    deleted = 0
+    for job in jobs.only('id', 'file'):
+        if job.file.name:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
+
+
+def purge_old_reports(now=None):
+    """
+    Briše gotove i neuspele poslove starije od REPORT_RETENTION i .part fajlove
+    koje su ostavili pali workeri. Vraća broj obrisanih poslova.
+    """
+    now = now or timezone.now()
+    deleted = delete_jobs(ReportJob.objects.filter(
+        status__in=['done', 'failed'], finished_at__lt=now - REPORT_RETENTION
+    ))
+
+    cutoff = now.timestamp() - STALE_AFTER.total_seconds()
+    for root, _, files in os.walk(os.path.join(settings.MEDIA_ROOT, REPORTS_DIR)):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if filename.endswith('.part') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    return deleted
+
+
+def run_pending(limit=10):
+    """
+    Obrađuje do limit poslova na čekanju. Vraća broj obrađenih.
+    """
+    processed = 0
+    while processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
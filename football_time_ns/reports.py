@@ -0,0 +1,274 @@
+import csv
+import io
+import json
+from xml.sax.saxutils import escape
+
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Frame, LayoutError, Paragraph, Spacer, Table, TableStyle
+
+from .filters import filter_appointments, filter_daily_stats
+from .free_slots import BELGRADE_TZ
+from .models import Appointment, Hall, HallDailyStats
+
+
+# Koliko redova se odjednom čita iz baze (server-side cursor)
+PDF_CHUNK_SIZE = 2000
+
+PAGE_MARGIN = 40
+HEADER_HEIGHT = 22
+ROW_HEIGHT = 14
+# 6pt padding okvira sa obe strane + jedan red rezerve
+ROWS_PER_PAGE = int((A4[1] - 2 * PAGE_MARGIN - 12 - HEADER_HEIGHT) // ROW_HEIGHT) - 1
+COLUMN_WIDTHS = [120, 85, 60, 80, 60, 45, 65]
+TABLE_HEADER = ['Hala', 'Korisnik', 'Datum', 'Vreme', 'Status', 'Check-in', 'Cena']
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6'))
+])
+
+REPORT_FILTERS = ('from', 'to', 'hall')
+
+# CSV/NDJSON izvoz: redovi iz baze po EXPORT_CHUNK_SIZE, a klijentu se šalje
+# po EXPORT_ROWS_PER_WRITE redova u jednom komadu
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_ROWS_PER_WRITE = 500
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+EXPORT_COLUMNS = ['id', 'hall_id', 'hall', 'user', 'start', 'end', 'status', 'checked_in', 'price']
+
+
+def report_appointments(owner, params):
+    # Rezervacije iz izveštaja: hale vlasnika + from/to/hall filteri (ValueError za loš unos)
+    params = {name: params.get(name) for name in REPORT_FILTERS}
+    return filter_appointments(Appointment.objects.filter(hall__owner=owner), params)
+
+
+def report_summary(owner, params):
+    """
+    Statistika i najčešća otkazivanja - sve u bazi, bez prolaska kroz rezervacije.
+    """
+    params = {name: params.get(name) for name in REPORT_FILTERS}
+    totals = filter_daily_stats(HallDailyStats.objects.filter(hall__owner=owner), params).aggregate(
+        approved=Sum('approved', default=0),
+        pending=Sum('pending', default=0),
+        rejected=Sum('rejected', default=0),
+        cancelled=Sum('cancelled', default=0),
+        checked_in=Sum('checked_in', default=0),
+        total_price=Sum('revenue', default=0),
+    )
+
+    top_cancellers = list(
+        report_appointments(owner, params).filter(status='cancelled')
+        .values('user__username')
+        .annotate(count=Count('id'), last_cancellation=Max('start'))
+        .order_by('-count', 'user__username')[:5]
+    )
+    return totals, top_cancellers
+
+
+def appointment_rows(appointments):
+    rows = appointments.order_by('-start', '-id').values_list(
+        'hall__name', 'user__username', 'start', 'end', 'status', 'checked_in', 'price'
+    )
+    for hall_name, username, start, end, status, checked_in, price in rows.iterator(chunk_size=PDF_CHUNK_SIZE):
+        start_local = start.astimezone(BELGRADE_TZ)
+        end_local = end.astimezone(BELGRADE_TZ)
+        yield [
+            hall_name,
+            username,
+            start_local.strftime('%d.%m.%Y.'),
+            f"{start_local.strftime('%H:%M')} - {end_local.strftime('%H:%M')}",
+            status,
+            "✓" if checked_in else "x",
+            f"{price} RSD",
+        ]
+
+
+def appointment_tables(rows, rows_per_page=ROWS_PER_PAGE):
+    # Jedna tabela po strani, napravljena tek kada se strana crta
+    page = []
+    for row in rows:
+        page.append(row)
+        if len(page) == rows_per_page:
+            yield page_table(page)
+            page = []
+    if page:
+        yield page_table(page)
+
+
+def page_table(rows):
+    table = Table(
+        [TABLE_HEADER] + rows,
+        colWidths=COLUMN_WIDTHS,
+        rowHeights=[HEADER_HEIGHT] + [ROW_HEIGHT] * len(rows),
+    )
+    table.setStyle(TABLE_STYLE)
+    return table
+
+
+def summary_flowables(owner, params, styles, current_time):
+    totals, top_cancellers = report_summary(owner, params)
+    halls_count = Hall.objects.filter(owner=owner).count()
+
+    story = [
+        Paragraph("Izveštaj o rezervacijama", styles['Title']),
+        Paragraph(f"Datum izveštaja: {current_time.strftime('%d.%m.%Y. %H:%M')}", styles['Normal']),
+        Paragraph(f"Vlasnik: {owner.username}", styles['Normal']),
+        Paragraph(f"Ukupno hala: {halls_count}", styles['Normal']),
+    ]
+    period = [f"od {params['from']}" if params.get('from') else '', f"do {params['to']}" if params.get('to') else '']
+    if any(period):
+        story.append(Paragraph(f"Period: {' '.join(p for p in period if p)}", styles['Normal']))
+    if params.get('hall'):
+        hall_name = Hall.objects.filter(owner=owner, pk=params['hall']).values_list('name', flat=True).first()
+        story.append(Paragraph(f"Hala: {escape(hall_name or '-')}", styles['Normal']))
+
+    story += [
+        Spacer(1, 16),
+        Paragraph("Statistika:", styles['Heading3']),
+        Paragraph(f"Odobrene: {totals['approved']}", styles['Normal']),
+        Paragraph(f"Check-in: {totals['checked_in']}/{totals['approved']}", styles['Normal']),
+        Paragraph(f"Na cekanju: {totals['pending']}", styles['Normal']),
+        Paragraph(f"Odbijene: {totals['rejected']}", styles['Normal']),
+        Paragraph(f"Otkazane: {totals['cancelled']}", styles['Normal']),
+        Paragraph(f"Ukupna vrednost (odobrene): {totals['total_price']} RSD", styles['Normal']),
+    ]
+
+    if top_cancellers:
+        rows = [['Korisnik', 'Broj otkazivanja', 'Poslednje otkazivanje', '']]
+        for item in top_cancellers:
+            rows.append([
+                item['user__username'],
+                str(item['count']),
+                item['last_cancellation'].astimezone(BELGRADE_TZ).strftime('%d.%m.%Y.'),
+                "Cesto otkazuje" if item['count'] >= 3 else '',
+            ])
+        cancellers = Table(rows, colWidths=[120, 100, 120, 100], hAlign='LEFT')
+        cancellers.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (3, 1), (3, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('LINEBELOW', (0, 0), (2, 0), 1, colors.black),
+        ]))
+        story += [
+            Spacer(1, 16),
+            Paragraph("Korisnici sa najviše otkazivanja:", styles['Heading3']),
+            cancellers,
+            Spacer(1, 8),
+            Paragraph("<i>Savet: Korisnici sa 3+ otkazivanja mogu biti neozbiljni.</i>", styles['Normal']),
+        ]
+    return story
+
+
+def draw_page_number(pdf):
+    pdf.saveState()
+    pdf.setFont("Helvetica", 8)
+    pdf.drawRightString(A4[0] - PAGE_MARGIN, PAGE_MARGIN / 2, f"Strana {pdf.getPageNumber()}")
+    pdf.restoreState()
+
+
+def draw_pages(pdf, flowables):
+    """
+    Crta flowable-e na nove strane (Frame po strani) dok ih ne potroši.
+    Flowable koji ne staje ni na praznu stranu diže LayoutError.
+    """
+    flowables = list(flowables)
+    while flowables:
+        remaining = len(flowables)
+        Frame(PAGE_MARGIN, PAGE_MARGIN, A4[0] - 2 * PAGE_MARGIN, A4[1] - 2 * PAGE_MARGIN).addFromList(flowables, pdf)
+        if len(flowables) == remaining:
+            raise LayoutError(f"{flowables[0].__class__.__name__} ne staje na stranu")
+        draw_page_number(pdf)
+        pdf.showPage()
+
+
+def build_owner_pdf(owner, params, output, track=None):
+    """
+    Piše PDF izveštaj vlasnika u output (fajl ili file-like objekat).
+    Prva strana je sažetak, zatim po jedna tabela rezervacija na svakoj strani.
+    Rezervacije se čitaju iteratorom, a tabela za stranu se pravi tek kada se
+    prethodna nacrta - u memoriji su redovi samo jedne strane. Canvas i dalje
+    čuva sadržaj nacrtanih strana do save() (reportlab ne piše PDF usput).
+    track (opciono) dobija iterator redova, npr. za praćenje napretka.
+    Vraća vreme izveštaja (Belgrade).
+    """
+    params = {name: params.get(name) for name in REPORT_FILTERS}
+    appointments = report_appointments(owner, params)
+    current_time = timezone.now().astimezone(BELGRADE_TZ)
+
+    pdf = canvas.Canvas(output, pagesize=A4)
+    pdf.setTitle("Izveštaj o rezervacijama")
+    pdf.setAuthor(owner.username)
+
+    draw_pages(pdf, summary_flowables(owner, params, getSampleStyleSheet(), current_time))
+
+    rows = appointment_rows(appointments)
+    if track is not None:
+        rows = track(rows)
+    for table in appointment_tables(rows):
+        draw_pages(pdf, [table])
+
+    pdf.save()
+    return current_time
+
+
+def export_rows(appointments):
+    """
+    Redovi za CSV/NDJSON izvoz kao tuple-ovi u redosledu EXPORT_COLUMNS.
+    Hala i korisnik dolaze iz istog upita (JOIN), a redovi preko server-side kursora.
+    """
+    rows = appointments.order_by('start', 'id').values_list(
+        'id', 'hall_id', 'hall__name', 'user__username', 'start', 'end', 'status', 'checked_in', 'price'
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        start, end = row[4].astimezone(BELGRADE_TZ), row[5].astimezone(BELGRADE_TZ)
+        yield row[:4] + (start.isoformat(), end.isoformat()) + row[6:]
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_ROWS_PER_WRITE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False))
+        if len(lines) == EXPORT_ROWS_PER_WRITE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_chunks(rows, export_format):
+    # Generator tekstualnih komada za StreamingHttpResponse
+    if export_format == 'csv':
+        return csv_chunks(rows)
+    return ndjson_chunks(rows)
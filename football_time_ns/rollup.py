@@ -0,0 +1,156 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import pytz
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Func, IntegerField, Q, Sum
+from django.db.models.functions import TruncDate
+
+from .models import Appointment, Hall, HallDailyStats, snapshot
+
+
+BELGRADE_TZ = pytz.timezone("Europe/Belgrade")
+
+COUNTER_FIELDS = [
+    'total', 'pending', 'approved', 'rejected', 'cancelled', 'checked_in', 'booked_minutes',
+    'revenue', 'realized_revenue',
+]
+
+
+class DurationMinutes(Func):
+    # Cele minute intervala, isto kao int(timedelta.total_seconds() // 60)
+    template = "FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / 60)::integer"
+    output_field = IntegerField()
+
+
+def owner_stats_cache_key(owner_id, year, month):
+    # Keš jednog meseca OwnerMonthlyStats; prošli meseci se čuvaju bez isteka
+    return f"owner_stats:{owner_id}:{year}:{month}"
+
+
+def contribution(state):
+    """
+    Doprinos jedne rezervacije dnevnom zbiru: ((hall_id, date), {polje: broj}).
+    """
+    if state is None:
+        return None
+    counts = {'total': 1, state['status']: 1}
+    if state['status'] == 'approved':
+        price = state.get('price') or 0
+        counts['revenue'] = price
+        if state['checked_in']:
+            counts['checked_in'] = 1
+            counts['realized_revenue'] = price
+        if state['end'] is not None:
+            counts['booked_minutes'] = int((state['end'] - state['start']).total_seconds() // 60)
+    return (state['hall_id'], state['start'].astimezone(BELGRADE_TZ).date()), counts
+
+
+def apply_change(old_state, new_state, owner_id=None):
+    """
+    Ažurira HallDailyStats za promenu rezervacije iz old_state u new_state
+    (None za kreiranje/brisanje). Menjaju se samo dani čiji se zbir promenio,
+    i briše se keš OwnerMonthlyStats za te mesece.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        item = contribution(state)
+        if item:
+            key, counts = item
+            for field, value in counts.items():
+                deltas[key][field] += sign * value
+
+    for (hall_id, day), counts in deltas.items():
+        counts = {field: value for field, value in counts.items() if value}
+        if not counts:
+            continue
+        # Samo povećanje može da zahteva novi red; umanjenje (npr. brisanje
+        # rezervacija kaskadno sa halom) ne sme ponovo da ga napravi
+        if any(value > 0 for value in counts.values()):
+            HallDailyStats.objects.bulk_create(
+                [HallDailyStats(hall_id=hall_id, date=day)], ignore_conflicts=True
+            )
+        HallDailyStats.objects.filter(hall_id=hall_id, date=day).update(
+            **{field: F(field) + value for field, value in counts.items()}
+        )
+
+        if owner_id is None:
+            owner_id = Hall.objects.filter(pk=hall_id).values_list('owner_id', flat=True).first()
+        if owner_id is not None:
+            forget_owner_month(owner_id, day)
+
+
+def forget_owner_month(owner_id, day):
+    key = owner_stats_cache_key(owner_id, day.year, day.month)
+    cache.delete(key)
+    # I posle commit-a, ako je neko u međuvremenu keširao staro stanje
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def compute_daily_stats(appointments=None):
+    """
+    HallDailyStats izračunat iz početka nad Appointment tabelom (ili datim querysetom).
+    Vraća {(hall_id, date): {polje: vrednost}}.
+    """
+    if appointments is None:
+        appointments = Appointment.objects.all()
+    approved = Q(status='approved')
+    rows = appointments.annotate(
+        date=TruncDate('start', tzinfo=BELGRADE_TZ)
+    ).values('hall_id', 'date').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=approved),
+        rejected=Count('id', filter=Q(status='rejected')),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        checked_in=Count('id', filter=Q(status='approved', checked_in=True)),
+        booked_minutes=Sum(DurationMinutes(F('end') - F('start')), filter=approved, default=0),
+        revenue=Sum('price', filter=approved, default=Decimal('0')),
+        realized_revenue=Sum('price', filter=Q(status='approved', checked_in=True), default=Decimal('0')),
+    ).order_by()
+
+    result = {}
+    for row in rows:
+        result[(row.pop('hall_id'), row.pop('date'))] = row
+    return result
+
+
+def stored_daily_stats():
+    return {
+        (row.pop('hall_id'), row.pop('date')): row
+        for row in HallDailyStats.objects.values('hall_id', 'date', *COUNTER_FIELDS)
+        if any(row[field] for field in COUNTER_FIELDS)
+    }
+
+
+def diff_daily_stats():
+    """
+    Razlike između sačuvanog i izračunatog zbira: [(hall_id, date, sačuvano, očekivano)].
+    """
+    expected = compute_daily_stats()
+    stored = stored_daily_stats()
+    differences = []
+    for key in sorted(set(expected) | set(stored)):
+        if expected.get(key) != stored.get(key):
+            differences.append((*key, stored.get(key), expected.get(key)))
+    return differences
+
+
+@transaction.atomic
+def rebuild_daily_stats():
+    expected = compute_daily_stats()
+    touched = set(expected) | set(stored_daily_stats())
+
+    HallDailyStats.objects.all().delete()
+    HallDailyStats.objects.bulk_create(
+        [HallDailyStats(hall_id=hall_id, date=day, **counts) for (hall_id, day), counts in expected.items()],
+        batch_size=1000
+    )
+
+    owners = dict(Hall.objects.values_list('id', 'owner_id'))
+    months = {(owners.get(hall_id), day.replace(day=1)) for hall_id, day in touched}
+    for owner_id, month in months:
+        if owner_id is not None:
+            forget_owner_month(owner_id, month)
+    return len(expected)
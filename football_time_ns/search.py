@@ -0,0 +1,108 @@
+import unicodedata
+
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.contrib.postgres.lookups import Unaccent
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Hall
+
+
+# 'simple' bez stemovanja (Postgres nema srpski rečnik); dijakritici se uklanjaju
+# i u vektoru (UNACCENT) i u upitu (normalize_query), pa "cair" nalazi "Čair"
+SEARCH_CONFIG = 'simple'
+MAX_SEARCH_RADIUS_KM = 200
+
+
+def hall_search_vector():
+    return (
+        SearchVector(Unaccent(F('name')), weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Unaccent(F('address')), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Unaccent(F('description')), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def review_search_vector():
+    return SearchVector(Unaccent(Coalesce(F('comment'), Value(''))), config=SEARCH_CONFIG)
+
+
+def update_search_vector(instance):
+    """
+    Osvežava sačuvani search_vector jednim UPDATE-om (poziva se posle save).
+    """
+    vector = hall_search_vector() if isinstance(instance, Hall) else review_search_vector()
+    type(instance).objects.filter(pk=instance.pk).update(search_vector=vector)
+
+
+def normalize_query(text):
+    # Isto kao UNACCENT u bazi: č/ć/š/ž -> c/s/z (NFKD), a đ -> d jer nema dekompoziciju
+    text = unicodedata.normalize('NFKD', text.replace('đ', 'd').replace('Đ', 'D'))
+    return ''.join(char for char in text if not unicodedata.combining(char)).strip()
+
+
+def search_query(text):
+    # websearch sintaksa: reči, "fraze", -isključi
+    return SearchQuery(normalize_query(text), search_type='websearch', config=SEARCH_CONFIG)
+
+
+def parse_search_params(params):
+    """
+    q, min_price, max_price, min_rating, lat/lon/radius iz query stringa.
+    Neispravne vrednosti dižu ValueError.
+    """
+    parsed = {'q': (params.get('q') or '').strip()}
+    for name in ('min_price', 'max_price', 'min_rating'):
+        if params.get(name):
+            parsed[name] = float(params[name])
+    if parsed.get('min_rating') is not None and not 1 <= parsed['min_rating'] <= 5:
+        raise ValueError('min_rating must be between 1 and 5')
+
+    if params.get('lat') or params.get('lon'):
+        lat, lon = float(params['lat']), float(params['lon'])
+        radius = float(params.get('radius', 10))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and 0 < radius <= MAX_SEARCH_RADIUS_KM):
+            raise ValueError(f'lat/lon out of range or radius not in (0, {MAX_SEARCH_RADIUS_KM}] km')
+        parsed['point'] = Point(lon, lat, srid=4326)
+        parsed['radius'] = radius
+    return parsed
+
+
+def search_halls(params):
+    """
+    Hale za /halls/search/ sa anotacijom score (full-text rang + trigram sličnost imena)
+    i distance kada je zadata lokacija. Bez q nema score (redosled po oceni).
+    """
+    halls = Hall.objects.all()
+    if 'min_price' in params:
+        halls = halls.filter(price__gte=params['min_price'])
+    if 'max_price' in params:
+        halls = halls.filter(price__lte=params['max_price'])
+    if 'min_rating' in params:
+        halls = halls.filter(rating_avg__gte=params['min_rating'])
+    if 'point' in params:
+        halls = halls.filter(
+            location__dwithin=(params['point'], D(km=params['radius']))
+        ).annotate(distance=Distance('location', params['point']))
+        # Metri kao float8 - za sortiranje po udaljenosti sa keyset kursorom
+        halls = halls.annotate(distance_m=Cast(F('distance'), FloatField()))
+
+    if not params['q']:
+        return halls
+
+    query = search_query(params['q'])
+    text = normalize_query(params['q'])
+    # GIN indeksi: search_vector (@@) i name gin_trgm_ops (<% - pg_trgm.word_similarity_threshold)
+    halls = halls.filter(Q(search_vector=query) | Q(name__trigram_word_similar=text))
+    # float8, da se vrednost u kursoru vrati bez gubitka (keyset poređenje)
+    return halls.annotate(score=Cast(
+        SearchRank(F('search_vector'), query) + TrigramWordSimilarity(text, 'name'),
+        FloatField()
+    ))
+
+
+def search_reviews(reviews, text):
+    # Ista mašinerija za komentare recenzija (vlasnik pretražuje svoje)
+    return reviews.filter(search_vector=search_query(text))
@@ -1,16 +1,43 @@
 from datetime import datetime
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Hall, Profile, Availability, Appointment, HallImage, Review
+from .models import Hall, Availability, Appointment, HallImage, ReportJob, Review
+from django.urls import reverse
 from django.utils.timezone import make_aware
 import pytz
-from django.utils.crypto import get_random_string
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
+from .verification import create_verification_token, send_verification_email
 from django.utils import timezone
 from datetime import timedelta
 
 
+def image_renditions(obj, request):
+    """
+    thumbnail/srcset/srcset_jpeg za obj.image iz verzija koje pravi process_images.
+    Dok verzije ne postoje (ili nisu uspele) sve tri vrednosti pokazuju na original.
+    """
+    if not obj.image:
+        return {'thumbnail': None, 'srcset': None, 'srcset_jpeg': None}
+
+    storage = obj.image.storage
+
+    def url(name):
+        return request.build_absolute_uri(storage.url(name)) if request is not None else storage.url(name)
+
+    renditions = obj.renditions if obj.renditions_source == obj.image.name else {}
+    if not renditions:
+        original = url(obj.image.name)
+        return {'thumbnail': original, 'srcset': original, 'srcset_jpeg': original}
+
+    # Mala slika daje iste širine za više verzija - u srcset ide svaka širina jednom
+    entries = sorted({entry['width']: entry for entry in renditions.values()}.values(), key=lambda e: e['width'])
+    return {
+        'thumbnail': url(renditions['thumb']['webp']),
+        'srcset': ', '.join(f"{url(entry['webp'])} {entry['width']}w" for entry in entries),
+        'srcset_jpeg': ', '.join(f"{url(entry['jpeg'])} {entry['width']}w" for entry in entries),
+    }
+
+
 class HallImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
 
@@ -26,11 +53,41 @@ class HallImageSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return obj.image.url
 
-class HallSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(image_renditions(instance, self.context.get('request')))
+        return data
+
+class SparseFieldsMixin:
+    """
+    fields=[...] u konstruktoru ostavlja samo tražena polja (?fields=id,name,price).
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, param):
+        # None za sva polja; ValueError za nepoznato polje
+        if not param:
+            return None
+        fields = [name for name in param.split(',') if name]
+        unknown = set(fields) - set(cls.Meta.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return fields
+
+
+class HallSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     images = HallImageSerializer(many=True, read_only=True)
     image = serializers.ImageField(required=False, allow_null=True)
     location = serializers.SerializerMethodField()  
+    rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     
 
     
@@ -38,18 +95,33 @@ class HallSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Hall
-        fields = ['id', 'name', 'address', 'price', 'description', 'owner', 'image', 'images', 'location']  
+        fields = [
+            'id', 'name', 'address', 'price', 'description', 'owner', 'image', 'images', 'location',
+            'rating', 'rating_count', 'rating_sum', 'rating_histogram',
+        ]
+        read_only_fields = ['rating_count', 'rating_sum']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         request = self.context.get('request')
+        if 'image' not in self.fields:
+            return data
         
         if instance.image:
             data['image'] = request.build_absolute_uri(instance.image.url) if request else instance.image.url
         else:
             data['image'] = None
+        for key, value in image_renditions(instance, request).items():
+            data[f'image_{key}'] = value
         return data
 
+    def get_rating(self, obj):
+        # Prosek iz sačuvanih brojača; None dok hala nema recenzija
+        return round(obj.rating_sum / obj.rating_count, 2) if obj.rating_count else None
+
+    def get_rating_histogram(self, obj):
+        return {str(value): getattr(obj, f'rating_{value}') for value in range(1, 6)}
+
     # DODAJ OVU METODU
     def get_location(self, obj):
         if obj.location:
@@ -62,6 +134,30 @@ class HallSerializer(serializers.ModelSerializer):
 
 
 
+class NearbyHallSerializer(HallSerializer):
+    # distance dolazi iz annotate(Distance(...)) u halls_nearby
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(HallSerializer.Meta):
+        fields = HallSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance', None)
+        return round(distance.km, 2) if distance is not None else None
+
+
+class HallSearchSerializer(NearbyHallSerializer):
+    # score iz search.search_halls (None kada se pretražuje bez q)
+    score = serializers.SerializerMethodField()
+
+    class Meta(NearbyHallSerializer.Meta):
+        fields = NearbyHallSerializer.Meta.fields + ['score']
+
+    def get_score(self, obj):
+        score = getattr(obj, 'score', None)
+        return round(score, 4) if score is not None else None
+
+
 class UserSerializer(serializers.ModelSerializer):
     role = serializers.CharField(source='profile.role', read_only=True)
 
@@ -89,6 +185,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data.pop('password2', None)
         password = validated_data.pop('password')
@@ -97,59 +194,12 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.is_active = False  # Korisnik neaktivan dok ne verifikuje email
         user.save()
         
-        verification_token = get_random_string(50)
-        
-        # Proveri da li profil već postoji (kreirao ga signal)
-        try:
-            profile = user.profile
-            # Ako postoji, ažuriraj ga
-            profile.verification_token = verification_token
-            profile.save()
-        except Profile.DoesNotExist:
-            # Ako ne postoji, kreiraj novi
-            Profile.objects.create(
-                user=user, 
-                role='player',
-                email_verified=False,
-                verification_token=verification_token
-            )
-        
-        # Pošalji verifikacioni email
-        self.send_verification_email(user, verification_token)
+        # Profil pravi signal; token ide u EmailVerificationToken (samo hash)
+        verification_token = create_verification_token(user)
+        send_verification_email(user, verification_token)
         
         return user
 
-    def send_verification_email(self, user, token):
-        verification_url = f"http://localhost:8000/verify-email/{token}/"
-
-       
-        
-        subject = "Verifikujte svoj email - Football Time"
-        message = f"""
-Poštovani/poštovana {user.first_name} {user.last_name},
-
-Hvala Vam što ste se registrovali na FootballTimeNs!
-
-Da biste aktivirali svoj nalog, molimo Vas da kliknete na link ispod:
-
-{verification_url}
-
-Link će vas odvesti na stranicu gde će vaš nalog biti aktiviran.
-
-Ako niste kreirali nalog, ignorišite ovaj email.
-
-Srdačan pozdrav,
-Football Time Team
-"""
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-
         
 class AvailabilitySerializer(serializers.ModelSerializer):
     hall_name = serializers.ReadOnlyField(source='hall.name')  
@@ -279,8 +329,8 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = ['id', 'user', 'user_full_name', 'hall', 'hall_name', 'appointment', 'rating', 'comment', 'created_at']
-        read_only_fields = ['user', 'created_at']
+        fields = ['id', 'user', 'user_full_name', 'hall', 'hall_name', 'appointment', 'rating', 'comment', 'created_at', 'owner_seen']
+        read_only_fields = ['user', 'created_at', 'owner_seen']
     
     def get_user_full_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}".strip() or obj.user.username
@@ -293,7 +343,7 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Request context is missing")
         
         # Proveri da li appointment pripada user-u
-        if appointment and appointment.user != request.user:
+        if appointment and appointment.user_id != request.user.id:
             raise serializers.ValidationError({"appointment": "Možete oceniti samo svoje rezervacije."})
         
         # Proveri da li je rezervacija odobrena
@@ -307,7 +357,22 @@ class ReviewSerializer(serializers.ModelSerializer):
             })
         
         # Proveri da li već postoji review za ovu rezervaciju
-        if Review.objects.filter(user=request.user, appointment=appointment).exists():
+        if Review.objects.filter(user_id=request.user.id, appointment=appointment).exists():
             raise serializers.ValidationError({"appointment": "Već ste ocenili ovu rezervaciju."})
         
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'kind', 'params', 'status', 'progress', 'error', 'created_at', 'finished_at', 'download_url']
+
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        url = reverse('owner_report_download', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
@@ -1,51 +1,265 @@
+import logging
+
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
-from .models import Profile,Appointment
-from django.core.mail import send_mail
-from django.conf import settings
+from .models import Profile,Appointment,Availability,Hall,HallImage,Review,snapshot
+from .free_slots import invalidate_free_slots
+from .events import publish
+from .outbox import enqueue_email
+from .ratings import apply_rating_change
+from .rollup import apply_change
+from .search import update_search_vector
+from .storage import release_blob
+from .tiles import bump_tiles_version
+
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance, role='player')
 
+# Polja profila koja se prate za save_user_profile
+PROFILE_FIELDS = ('role', 'email_verified')
+
+
+def profile_state(profile):
+    return {name: profile.__dict__.get(name) for name in PROFILE_FIELDS}
+
+
+@receiver(post_init, sender=Profile)
+@receiver(post_save, sender=Profile)
+def remember_profile_state(sender, instance, **kwargs):
+    instance._original_state = profile_state(instance)
+
+
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+def save_user_profile(sender, instance, created, **kwargs):
+    """
+    Čuva profil uz korisnika samo ako je već učitan na instanci i promenjen.
+    last_login (prijava) i set_password ne okidaju ni SELECT ni UPDATE profila.
+    """
+    if created or not User.profile.related.is_cached(instance):
+        return
+    profile = User.profile.related.get_cached_value(instance)
+    if profile is None:
+        return
+    changed = [
+        name for name, value in profile_state(profile).items()
+        if value != profile._original_state[name]
+    ]
+    if changed:
+        profile.save(update_fields=changed)
+
+
+@receiver(post_init, sender=Availability)
+@receiver(post_init, sender=Appointment)
+def remember_slot_hall(sender, instance, **kwargs):
+    # Hala pre izmene: premeštanje u drugu halu mora da poništi i njen keš
+    instance._original_hall_id = instance.__dict__.get('hall_id')
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_hall_free_slots(sender, instance, **kwargs):
+    # Keš slobodnih termina se poništava tek posle commit-a, da ga drugi zahtev
+    # ne bi ponovo napunio starim podacima pre nego što izmena postane vidljiva
+    hall_ids = {instance._original_hall_id, instance.hall_id} - {None}
+    instance._original_hall_id = instance.hall_id
+    for hall_id in hall_ids:
+        transaction.on_commit(lambda hall_id=hall_id: invalidate_free_slots(hall_id))
+
+
+def hall_tile_state(hall):
+    # Lokacija, ime i cena su u pločicama mape i klasterima; lokacija kao EWKT
+    # da izmena Point objekta na mestu ne promeni i zapamćeno stanje
+    values = hall.__dict__
+    location = values.get('location')
+    return (location.ewkt if location is not None else None, values.get('name'), values.get('price'))
+
+
+@receiver(post_init, sender=Hall)
+def remember_hall_tile_state(sender, instance, **kwargs):
+    instance._original_tile_state = hall_tile_state(instance)
+
+
+@receiver(post_save, sender=Hall)
+def invalidate_hall_tiles_on_save(sender, instance, created, **kwargs):
+    # Npr. izmena opisa ili ocene ne poništava keš pločica
+    old_state, instance._original_tile_state = instance._original_tile_state, hall_tile_state(instance)
+    if created or old_state != instance._original_tile_state:
+        transaction.on_commit(bump_tiles_version)
+
+
+@receiver(post_delete, sender=Hall)
+def invalidate_hall_tiles_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(bump_tiles_version)
+
+
+SEARCH_TEXT_FIELDS = {Hall: {'name', 'address', 'description'}, Review: {'comment'}}
+
+
+@receiver(post_save, sender=Hall)
+@receiver(post_save, sender=Review)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=...) bez tekstualnih polja ne menja vektor
+    if update_fields is not None and not SEARCH_TEXT_FIELDS[sender] & set(update_fields):
+        return
+    update_search_vector(instance)
+
+
+def image_name(instance):
+    # __dict__ da deferred polje ne okine upit; tamo je string ili FieldFile
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=Hall)
+def remember_hall_image(sender, instance, **kwargs):
+    instance._original_image = image_name(instance)
+
+
+@receiver(post_save, sender=Hall)
+def release_replaced_hall_image(sender, instance, **kwargs):
+    # Nova slika je već dobila referencu u storage-u; stara se otpušta posle commit-a
+    old_name, instance._original_image = instance._original_image, image_name(instance)
+    if old_name and old_name != instance._original_image:
+        transaction.on_commit(lambda: release_blob(old_name))
+
+
+@receiver(post_delete, sender=Hall)
+@receiver(post_delete, sender=HallImage)
+def release_deleted_image(sender, instance, **kwargs):
+    name = image_name(instance)
+    if name:
+        transaction.on_commit(lambda: release_blob(name))
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_status(sender, instance, **kwargs):
+    instance.remember_state()
+
+
+@receiver(post_save, sender=Appointment)
+def update_daily_stats_on_save(sender, instance, created, **kwargs):
+    old_state = None if created else instance._original_state
+    apply_change(old_state, snapshot(instance), owner_id=instance.hall.owner_id)
+
+
+@receiver(post_delete, sender=Appointment)
+def update_daily_stats_on_delete(sender, instance, **kwargs):
+    apply_change(instance._original_state, None)
+
+
+@receiver(post_save, sender=Appointment)
+def publish_appointment_event(sender, instance, created, **kwargs):
+    if not created and instance._original_status == instance.status:
+        return
+
+    data = {
+        'id': instance.id,
+        'hall': instance.hall_id,
+        'status': instance.status,
+        'start': instance.start.isoformat(),
+    }
+    notify_owner = created or instance.status == 'cancelled'
+    recipients = [] if created else [instance.user_id]
+    event = 'appointment_pending' if created else 'appointment_status'
+    # Vlasnik iz već učitane hale, inače samo owner_id posle commit-a - bez učitavanja Hall-a
+    hall = instance.hall if Appointment.hall.is_cached(instance) else None
+    hall_id = instance.hall_id
+
+    def send():
+        if notify_owner:
+            owner_id = hall.owner_id if hall is not None else (
+                Hall.objects.filter(pk=hall_id).values_list('owner_id', flat=True).first()
+            )
+            if owner_id is not None:
+                recipients.append(owner_id)
+        publish(recipients, event, data)
+
+    transaction.on_commit(send)
+
+
+def rating_state(review):
+    values = review.__dict__
+    if values.get('hall_id') is None or values.get('rating') is None:
+        return None
+    return values['hall_id'], values['rating']
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._original_rating = rating_state(instance)
+
+
+@receiver(post_save, sender=Review)
+def update_hall_rating_on_save(sender, instance, created, **kwargs):
+    old_state = None if created else instance._original_rating
+    new_state = instance._original_rating = rating_state(instance)
+    if old_state == new_state:
+        return
+    if old_state and new_state and old_state[0] == new_state[0]:
+        apply_rating_change(new_state[0], old_state[1], new_state[1])
+        return
+    if old_state:
+        apply_rating_change(old_state[0], old_rating=old_state[1])
+    if new_state:
+        apply_rating_change(new_state[0], new_rating=new_state[1])
+
+
+@receiver(post_delete, sender=Review)
+def update_hall_rating_on_delete(sender, instance, **kwargs):
+    if instance._original_rating:
+        apply_rating_change(instance._original_rating[0], old_rating=instance._original_rating[1])
+
+
+@receiver(post_save, sender=Review)
+def publish_review_event(sender, instance, created, **kwargs):
+    if not created:
+        return
+    owner_id = instance.hall.owner_id
+    data = {'id': instance.id, 'hall': instance.hall_id, 'rating': instance.rating}
+    transaction.on_commit(lambda: publish([owner_id], 'review_created', data))
 
 
 @receiver(post_save, sender=Appointment)
 def send_reservation_status_email(sender, instance, **kwargs):
     """
-    Šalje email korisniku kada se status rezervacije promeni na 'approved' ili 'rejected'
+    Stavlja u outbox email korisniku kada se status rezervacije promeni na 'approved' ili 'rejected'.
+    Poruka se upisuje u istoj transakciji, a šalje je send_outbox worker.
     """
     # Proveri da li je status promenjen
     if kwargs.get('created', False):
         return  # Ne šalji email za novu rezervaciju (samo pending)
+    if instance._original_status == instance.status:
+        return  # npr. check-in ne menja status
     
-    try:
-        # Proveri da li je status promenjen na approved ili rejected
-        if instance.status in ['approved', 'rejected']:
-            user = instance.user
-            hall = instance.hall
-            
-            
-            status_translation = {
-                'approved': 'ODOBRENA',
-                'rejected': 'ODBIJENA'
-            }
-            status_display = status_translation.get(instance.status, instance.status)
-            
-            # Email subject
-            if instance.status == 'approved':
-                subject = f"✅ Rezervacija odobrena - {hall.name}"
-            else:
-                subject = f"❌ Rezervacija odbijena - {hall.name}"
-            
-            # Email message na srpskom
-            message = f"""
+    # Bez try/except: upis u outbox uspeva ili pada zajedno sa promenom statusa
+    if instance.status in ['approved', 'rejected']:
+        user = instance.user
+        hall = instance.hall
+        
+        
+        status_translation = {
+            'approved': 'ODOBRENA',
+            'rejected': 'ODBIJENA'
+        }
+        status_display = status_translation.get(instance.status, instance.status)
+        
+        # Email subject
+        if instance.status == 'approved':
+            subject = f"✅ Rezervacija odobrena - {hall.name}"
+        else:
+            subject = f"❌ Rezervacija odbijena - {hall.name}"
+        
+        # Email message na srpskom
+        message = f"""
 Poštovani/poštovana {user.first_name} {user.last_name},
 
 Vaša rezervacija za halu "{hall.name}" je {status_display.lower()}.
@@ -61,17 +275,8 @@ Detalji rezervacije:
 Srdačan pozdrav,
 FootballTimeNS Team
 """
-            
-            
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-            
-            print(f"📧 Email sent to {user.email} for reservation {instance.id} - Status: {status_display}")
-            
-    except Exception as e:
-        print(f"❌ Error sending email for appointment {instance.id}: {e}")
\ No newline at end of file
+        
+        
+        enqueue_email(subject, message, user.email)
+        
+        logger.info("Email queued for %s for reservation %s - Status: %s", user.email, instance.id, status_display)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+BLOBS_DIR = 'blobs'
+# Ime je hash sadržaja, pa se fajl na istoj adresi nikad ne menja
+BLOB_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def blob_name(digest, extension):
+    # blobs/ab/cd/abcd...ef.jpg - dva nivoa direktorijuma da ne bude sve u jednom
+    return f"{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage koji fajl imenuje po SHA-256 sadržaja. Hash se računa
+    dok se upload upisuje u privremeni fajl, bez još jednog čitanja.
+    Isti sadržaj završava u istom fajlu; svaki save povećava MediaBlob.refcount,
+    a release_blob ga smanjuje i briše fajl kada više nema referenci.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Konačno ime određuje _save po sadržaju
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        extension = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(f"{BLOBS_DIR}/tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+
+            name = blob_name(digest.hexdigest(), extension)
+            # Zaključan red sprečava da release_blob obriše fajl dok ga novi upload koristi
+            with transaction.atomic():
+                blob, _ = MediaBlob.objects.select_for_update().get_or_create(name=name)
+                path = self.path(name)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, path)
+                MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def release_blob(name):
+    """
+    Smanjuje refcount za name. Na nuli briše red, fajl i njegove renditions.
+    Fajlovi bez MediaBlob reda (stari uploadi iz halls/) se ne diraju.
+    """
+    from .models import MediaBlob
+    from .renditions import RENDITIONS_DIR
+
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.refcount > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+            return
+        blob.delete()
+        image_storage.delete(name)
+        shutil.rmtree(os.path.join(settings.MEDIA_ROOT, RENDITIONS_DIR, name), ignore_errors=True)
@@ -1,3 +1,1195 @@
-from django.test import TestCase
+import errno
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import pytz
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    APPOINTMENT_NO_OVERLAP, Appointment, Availability, EmailOutbox, EmailVerificationToken, Hall, HallDailyStats,
+    HallImage, MediaBlob, Profile, ReportJob, Review, violates_constraint
+)
+from .free_slots import _compute_days, cache_key, hall_version, invalidate_free_slots
+from .outbox import BASE_BACKOFF, MAX_ATTEMPTS, enqueue_email, send_pending
+from .ratings import diff_hall_ratings, recompute_hall_ratings
+from .renditions import process_pending
+from .reports import ROWS_PER_PAGE, build_owner_pdf
+from .report_jobs import REPORT_RETENTION, enqueue_report, purge_old_reports, run_pending
+from .rollup import diff_daily_stats
+from .serializer import HallImageSerializer
+from .verification import RESEND_LIMIT
+from .views import EVENTS_TICKET_SALT
+
+
+BELGRADE_TZ = pytz.timezone("Europe/Belgrade")
+
+
+def local(*args):
+    return BELGRADE_TZ.localize(datetime(*args))
+
+
+class OwnerTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'lozinka123')
+        self.owner.profile.role = 'owner'
+        self.owner.profile.save()
+        self.player = User.objects.create_user('player', 'player@example.com', 'lozinka123')
+
+        self.arena = Hall.objects.create(name='Arena', address='Bulevar 1', price=Decimal('3000.00'), owner=self.owner)
+        self.sportski = Hall.objects.create(name='Sportski centar', address='Futoska 2', price=Decimal('2000.00'), owner=self.owner)
+
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        # Svež objekat iz baze, da profil nije već keširan na instanci
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+
+    def book(self, hall, start, status='approved', checked_in=False):
+        return Appointment.objects.create(
+            user=self.player, hall=hall, start=start, end=start + timedelta(hours=1),
+            status=status, checked_in=checked_in
+        )
+
+
+class OverlapConstraintTests(OwnerTestCase):
+
+    def test_overlapping_approved_appointments_rejected(self):
+        self.book(self.arena, local(2025, 3, 1, 18))
+        pending = self.book(self.arena, local(2025, 3, 1, 18, 30), status='pending')
+        # Drugoj hali ili kao pending preklapanje je dozvoljeno
+        self.book(self.sportski, local(2025, 3, 1, 18))
+
+        self.authenticate(self.owner)
+        response = self.client.post(f'/appointments/{pending.id}/owner-action/', {'action': 'approve'})
+        self.assertEqual(response.status_code, 400)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'pending')
+
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            self.book(self.arena, local(2025, 3, 1, 18, 45))
+        self.assertTrue(violates_constraint(raised.exception, APPOINTMENT_NO_OVERLAP))
+
+    def test_overlapping_availability_rejected(self):
+        Availability.objects.create(hall=self.arena, start=local(2025, 3, 1, 10), end=local(2025, 3, 1, 14))
+        self.authenticate(self.owner)
+        response = self.client.post('/availabilities/create/', {
+            'hall': self.arena.id,
+            'start': local(2025, 3, 1, 13).isoformat(),
+            'end': local(2025, 3, 1, 16).isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+        # Susedni interval ([) opseg) se ne preklapa
+        response = self.client.post('/availabilities/create/', {
+            'hall': self.arena.id,
+            'start': local(2025, 3, 1, 14).isoformat(),
+            'end': local(2025, 3, 1, 16).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_other_integrity_errors_not_reported_as_overlap(self):
+        pending = self.book(self.arena, local(2025, 3, 1, 18), status='pending')
+        self.authenticate(self.owner)
+        with mock.patch.object(Appointment, 'save', side_effect=IntegrityError('check constraint')):
+            with self.assertRaises(IntegrityError):
+                self.client.post(f'/appointments/{pending.id}/owner-action/', {'action': 'approve'})
+
+
+class FreeSlotsCacheTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day in (1, 2):
+            Availability.objects.create(hall=self.arena, start=local(2030, 5, day, 10), end=local(2030, 5, day, 12))
+
+    def free_intervals(self, day):
+        response = self.client.get(f'/halls/{self.arena.id}/free/', {'date': f'2030-05-0{day}'})
+        return response.data['free_intervals']
+
+    def test_moved_appointment_invalidates_old_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book(self.arena, local(2030, 5, 1, 10), status='pending')
+        self.assertEqual(len(self.free_intervals(1)), 1)
+        self.assertEqual(len(self.free_intervals(2)), 1)
+
+        # Iz keša, bez upita u bazu
+        with self.assertNumQueries(1):
+            self.free_intervals(1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.start, appointment.end = local(2030, 5, 2, 10), local(2030, 5, 2, 11)
+            appointment.save()
+        self.assertEqual(self.free_intervals(1), [(local(2030, 5, 1, 10).isoformat(), local(2030, 5, 1, 12).isoformat())])
+        self.assertEqual(self.free_intervals(2), [(local(2030, 5, 2, 11).isoformat(), local(2030, 5, 2, 12).isoformat())])
+
+    def test_stale_result_not_cached(self):
+        day = local(2030, 5, 1, 10).date()
+        version = hall_version(self.arena.id)
+        # Izmena stiže dok čitalac još računa sa starom verzijom
+        invalidate_free_slots(self.arena.id)
+        _compute_days(self.arena.id, version, day, day, 60)
+        self.assertIsNone(cache.get(cache_key(self.arena.id, version, day, 60)))
+        self.assertIsNone(cache.get(cache_key(self.arena.id, hall_version(self.arena.id), day, 60)))
+
+
+class ChangesFeedTests(OwnerTestCase):
+
+    def test_changes_paginated_with_stable_window(self):
+        earlier = timezone.now() - timedelta(minutes=10)
+        for day in range(1, 6):
+            self.book(self.arena, local(2030, 6, day, 18), status='pending')
+        Appointment.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        self.authenticate(self.owner)
+        response = self.client.get('/changes/', {'since': earlier.isoformat(), 'page_size': 2})
+        self.assertFalse(response.data['reset'])
+        ids = [a['id'] for a in response.data['appointments']]
+        pages = 1
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(a['id'] for a in response.data['appointments'])
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(ids), sorted(Appointment.objects.values_list('id', flat=True)))
+        self.assertEqual(response.data['reviews'], [])
+
+        # Sa poslednjim kursorom nema novih promena
+        response = self.client.get('/changes/', {'since': response.data['cursor']})
+        self.assertEqual(response.data['appointments'], [])
+        self.assertIsNone(response.data['next'])
+
+
+class EventsTicketTests(OwnerTestCase):
+
+    def ticket(self, user):
+        access = AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.post('/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials()
+        return access, response.data['ticket']
+
+    def stream(self, params):
+        # /events/ radi samo pod ASGI
+        return async_to_sync(self.async_client.get)('/events/', params)
+
+    def test_stream_requires_ticket_not_access_token(self):
+        access, ticket = self.ticket(self.player)
+        self.assertEqual(self.stream({'token': str(access)}).status_code, 401)
+        self.assertEqual(self.stream({'ticket': str(access)}).status_code, 401)
+        self.assertEqual(self.client.post('/events/ticket/').status_code, 401)
+
+        response = self.stream({'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_stream_refused_under_wsgi(self):
+        _, ticket = self.ticket(self.player)
+        self.assertEqual(self.client.get('/events/', {'ticket': ticket}).status_code, 503)
+
+    def test_appointment_events_reach_owner(self):
+        with mock.patch('football_time_ns.signals.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                appointment = self.book(self.arena, local(2030, 7, 1, 18), status='pending')
+            publish.assert_called_once_with([self.owner.id], 'appointment_pending', mock.ANY)
+
+            appointment = Appointment.objects.get(pk=appointment.pk)
+            appointment.status = 'cancelled'
+            with self.captureOnCommitCallbacks(execute=True):
+                appointment.save()
+            publish.assert_called_with([self.player.id, self.owner.id], 'appointment_status', mock.ANY)
+
+    def test_stream_closes_when_token_expires(self):
+        expired = signing.dumps({'user_id': self.player.id, 'exp': 0}, salt=EVENTS_TICKET_SALT)
+        response = self.stream({'ticket': expired})
+
+        async def read():
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        body = async_to_sync(read)()
+        self.assertIn('event: stream_expired', body)
+
+
+class EmailOutboxTests(OwnerTestCase):
+
+    def test_status_change_queues_email_in_same_transaction(self):
+        appointment = self.book(self.arena, local(2030, 7, 1, 18), status='pending')
+        appointment.status = 'approved'
+        appointment.save()
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.recipient, 'player@example.com')
+        self.assertIn('Arena', email.subject)
+
+        # Greška posle upisa poništava i status i poruku
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            appointment.status = 'rejected'
+            appointment.save()
+            raise RuntimeError
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_later_receiver_sees_status_change_once(self):
+        appointment = self.book(self.arena, local(2030, 7, 1, 18), status='pending')
+        seen = []
+
+        def receiver(sender, instance, **kwargs):
+            seen.append((instance._original_status, instance.status))
+
+        # Handler registrovan posle signals.py i dalje vidi staro stanje
+        post_save.connect(receiver, sender=Appointment)
+        self.addCleanup(post_save.disconnect, receiver, sender=Appointment)
+        appointment.status = 'approved'
+        appointment.save()
+        appointment.save()
+        self.assertEqual(seen, [('pending', 'approved'), ('approved', 'approved')])
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_send_in_batches(self):
+        for i in range(3):
+            enqueue_email(f'Poruka {i}', 'Tekst', f'user{i}@example.com')
+        self.assertEqual(send_pending(batch_size=2), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+        out = io.StringIO()
+        call_command('send_outbox', stdout=out)
+        self.assertIn('Obrađeno poruka: 1', out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(EmailOutbox.objects.exclude(status='sent').exists())
+
+    def test_backoff_then_dead_letter(self):
+        email = enqueue_email('Poruka', 'Tekst', 'user@example.com')
+        with mock.patch('football_time_ns.outbox.EmailMessage.send', side_effect=OSError('smtp down')):
+            before = timezone.now()
+            self.assertEqual(send_pending(), 1)
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertGreaterEqual(email.next_attempt_at, before + BASE_BACKOFF)
+            # Pre isteka backoff-a se ne pokušava ponovo
+            self.assertEqual(send_pending(), 0)
+
+            for _ in range(MAX_ATTEMPTS - 1):
+                EmailOutbox.objects.update(next_attempt_at=timezone.now())
+                send_pending()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('dead', MAX_ATTEMPTS))
+        self.assertIn('smtp down', email.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class OwnerMonthlyStatsTests(OwnerTestCase):
+
+    def get_stats(self, year=2025):
+        self.authenticate(self.owner)
+        return self.client.get('/owner/monthly-stats/', {'year': year})
+
+    def test_monthly_values(self):
+        self.book(self.arena, local(2025, 1, 10, 18), checked_in=True)
+        self.book(self.arena, local(2025, 1, 11, 18))
+        self.book(self.sportski, local(2025, 1, 12, 18), status='pending')
+        # 00:30 po Beogradu je još 31. januar u UTC-u, a računa se u februar
+        self.book(self.sportski, local(2025, 2, 1, 0, 30), status='rejected')
+
+        response = self.get_stats()
+        self.assertEqual(response.status_code, 200)
+        january, february, march = response.data['monthly_stats'][:3]
+
+        self.assertEqual(january['total_reservations'], 3)
+        self.assertEqual(january['approved_reservations'], 2)
+        self.assertEqual(january['pending_reservations'], 1)
+        self.assertEqual(january['checked_in_reservations'], 1)
+        self.assertEqual(january['revenue'], 6000.0)
+        self.assertEqual(january['realized_revenue'], 3000.0)
+        self.assertEqual(january['completion_rate'], 66.7)
+        self.assertEqual(january['realization_rate'], 50.0)
+        self.assertEqual(january['most_popular_hall'], 'Arena')
+
+        self.assertEqual(february['total_reservations'], 1)
+        self.assertEqual(february['revenue'], 0.0)
+        self.assertEqual(february['most_popular_hall'], 'Sportski centar')
+
+        self.assertEqual(march['total_reservations'], 0)
+        self.assertEqual(march['most_popular_hall'], 'Nema rezervacija')
+
+        totals = response.data['yearly_totals']
+        self.assertEqual(totals['total_reservations'], 4)
+        self.assertEqual(totals['total_revenue'], 6000.0)
+        self.assertEqual(totals['average_completion_rate'], 33.4)
+
+    def test_query_count_does_not_depend_on_bookings(self):
+        # profil (IsOwnerRole) + agregati po mesecima + najpopularnija hala
+        with self.assertNumQueries(3):
+            self.get_stats()
+
+        for day in range(1, 29):
+            self.book(self.arena, local(2025, day % 12 + 1, day, 10), checked_in=day % 2 == 0)
+            self.book(self.sportski, local(2025, day % 12 + 1, day, 12), status='pending')
+
+        with self.assertNumQueries(3):
+            self.get_stats()
+
+    def test_closed_months_are_cached_until_changed(self):
+        self.book(self.arena, local(2025, 3, 5, 18))
+        self.get_stats()
+
+        # 2025. je završena - svi meseci iz keša, ostaje samo upit za profil
+        with self.assertNumQueries(1):
+            response = self.get_stats()
+        self.assertEqual(response.data['monthly_stats'][2]['total_reservations'], 1)
+
+        self.book(self.arena, local(2025, 3, 6, 18))
+        response = self.get_stats()
+        self.assertEqual(response.data['monthly_stats'][2]['total_reservations'], 2)
+
+
+    def test_price_change_keeps_past_revenue(self):
+        self.book(self.arena, local(2025, 3, 5, 18), checked_in=True)
+        self.get_stats()
+
+        self.arena.price = Decimal('5000.00')
+        self.arena.save()
+        self.book(self.arena, local(2025, 4, 5, 18))
+
+        # Keširan mart i mart izračunat iz rollup-a se slažu; april ide po novoj ceni
+        march, april = self.get_stats().data['monthly_stats'][2:4]
+        cache.clear()
+        self.assertEqual(self.get_stats().data['monthly_stats'][2], march)
+        self.assertEqual((march['revenue'], march['realized_revenue']), (3000.0, 3000.0))
+        self.assertEqual(april['revenue'], 5000.0)
+        self.assertEqual(diff_daily_stats(), [])
+
+
+class HallDailyStatsTests(OwnerTestCase):
+
+    def test_rollup_follows_appointment_changes(self):
+        first = self.book(self.arena, local(2025, 5, 1, 18), status='pending')
+        second = self.book(self.arena, local(2025, 5, 1, 20))
+
+        first.status = 'approved'
+        first.checked_in = True
+        first.save()
+        # Premeštanje na drugi dan menja oba dnevna reda
+        second.start = local(2025, 5, 2, 20)
+        second.end = second.start + timedelta(hours=1)
+        second.save()
+
+        day = HallDailyStats.objects.get(hall=self.arena, date=local(2025, 5, 1).date())
+        self.assertEqual((day.total, day.pending, day.approved, day.checked_in, day.booked_minutes), (1, 0, 1, 1, 60))
+
+        second.delete()
+        self.assertEqual(diff_daily_stats(), [])
+
+    def test_migration_backfills_existing_appointments(self):
+        # Rezervacije iz vremena pre tabele HallDailyStats
+        pending = self.book(self.arena, local(2025, 5, 1, 18), status='pending')
+        self.book(self.arena, local(2025, 5, 1, 20))
+        HallDailyStats.objects.all().delete()
+
+        migration = importlib.import_module('football_time_ns.migrations.0031_backfill_daily_stats')
+        migration.backfill_daily_stats(django_apps, None)
+        self.assertEqual(diff_daily_stats(), [])
+
+        # Umanjenje postojećeg reda više ne krši CHECK >= 0
+        pending.status = 'rejected'
+        pending.save()
+        self.assertEqual(diff_daily_stats(), [])
+
+
+class OwnerExportAppointmentsTests(OwnerTestCase):
+
+    def export(self, export_format, **params):
+        self.authenticate(self.owner)
+        return self.client.get(f'/owner/export/{export_format}/', params)
+
+    def download(self, job_id):
+        response = self.client.get(f'/owner/reports/{job_id}/download/')
+        return response, b''.join(response.streaming_content).decode()
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def test_csv_with_filters(self):
+        self.book(self.arena, local(2025, 1, 10, 18))
+        self.book(self.arena, local(2025, 1, 11, 18), status='cancelled')
+        self.book(self.sportski, local(2025, 1, 12, 18))
+        self.book(self.arena, local(2025, 2, 1, 18))
+
+        response = self.export('csv', hall=self.arena.id, to='2025-01-31', status='approved,cancelled')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(run_pending(), 1)
+
+        response, content = self.download(response.data['id'])
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = content.strip().splitlines()
+        self.assertEqual(lines[0], 'id,hall_id,hall,user,start,end,status,checked_in,price')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('2025-01-10T18:00:00+01:00', lines[1])
+        self.assertTrue(lines[2].endswith('cancelled,False,3000.00'))
+
+    def test_ndjson(self):
+        self.book(self.sportski, local(2025, 1, 12, 18), checked_in=True)
+
+        job_id = self.export('ndjson').data['id']
+        run_pending()
+        _, content = self.download(job_id)
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['hall'], 'Sportski centar')
+        self.assertEqual(rows[0]['price'], '2000.00')
+        self.assertIs(rows[0]['checked_in'], True)
+
+    def test_same_request_reuses_artifact_until_data_changes(self):
+        appointment = self.book(self.arena, local(2025, 1, 10, 18))
+
+        first = self.export('csv', status='approved')
+        run_pending()
+        again = self.export('csv', status='approved')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data['id'], first.data['id'])
+        self.assertEqual(again.data['progress'], 100)
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        changed = self.export('csv', status='approved')
+        self.assertEqual(changed.status_code, 202)
+        self.assertNotEqual(changed.data['id'], first.data['id'])
+
+    def test_concurrent_requests_share_one_job(self):
+        first, created = enqueue_report(self.owner, 'csv', {})
+        self.assertTrue(created)
+
+        # Drugi zahtev u trci ne vidi prvi posao - constraint ga vraća na postojeći
+        real_first = QuerySet.first
+        calls = []
+
+        def first_missing_once(queryset):
+            calls.append(queryset)
+            return None if len(calls) == 1 else real_first(queryset)
+
+        with mock.patch.object(QuerySet, 'first', autospec=True, side_effect=first_missing_once):
+            second, created = enqueue_report(self.owner, 'csv', {})
+        self.assertFalse(created)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_new_artifact_replaces_superseded_one(self):
+        appointment = self.book(self.arena, local(2025, 1, 10, 18))
+        first = self.export('csv')
+        run_pending()
+        old = ReportJob.objects.get(pk=first.data['id'])
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.export('csv')
+        run_pending()
+        self.assertFalse(ReportJob.objects.filter(pk=old.pk).exists())
+        self.assertFalse(os.path.exists(old.file.path))
+
+        job = ReportJob.objects.get()
+        self.assertEqual(purge_old_reports(), 0)
+        self.assertEqual(purge_old_reports(now=job.finished_at + REPORT_RETENTION + timedelta(seconds=1)), 1)
+        self.assertFalse(os.path.exists(job.file.path))
+
+    def test_pdf_job(self):
+        self.book(self.arena, local(2025, 1, 10, 18))
+        self.authenticate(self.owner)
+
+        job_id = self.client.get('/owner/export-pdf/', {'from': '2025-01-01'}).data['id']
+        run_pending()
+        self.assertEqual(self.client.get(f'/owner/reports/{job_id}/').data['status'], 'done')
+        response = self.client.get(f'/owner/reports/{job_id}/download/')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_pdf_memory_does_not_grow_with_rows(self):
+        def seed(hall, count):
+            start = local(2025, 1, 1, 8)
+            Appointment.objects.bulk_create([
+                Appointment(
+                    user=self.player, hall=hall, start=start + timedelta(hours=i),
+                    end=start + timedelta(hours=i + 1), status='approved', price=hall.price
+                )
+                for i in range(count)
+            ])
+
+        def peak_memory(hall):
+            tracemalloc.start()
+            try:
+                with open(os.devnull, 'wb') as output:
+                    build_owner_pdf(self.owner, {'hall': hall.id}, output)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        seed(self.sportski, ROWS_PER_PAGE)
+        seed(self.arena, ROWS_PER_PAGE * 9)
+        peak_memory(self.sportski)
+        extra_rows = ROWS_PER_PAGE * 8
+        # Canvas čuva sadržaj strana (~300 B po redu); zadržane tabele bi bile ~3.5 KB po redu
+        self.assertLess(peak_memory(self.arena) - peak_memory(self.sportski), extra_rows * 1500)
+
+    def test_invalid_requests(self):
+        self.authenticate(self.owner)
+        self.assertEqual(self.client.get('/owner/export/xlsx/').status_code, 400)
+        self.assertEqual(self.client.get('/owner/export-pdf/', {'from': '2025-13-01'}).status_code, 400)
+
+
+class HallsNearbyTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.arena.location = Point(20.46, 44.81, srid=4326)
+        self.arena.save()
+        self.sportski.location = Point(20.50, 44.81, srid=4326)
+        self.sportski.save()
+        Hall.objects.create(name='Daleko', address='Novi Sad', price=Decimal('1500.00'), location=Point(19.84, 45.26, srid=4326))
+
+    def test_nearest_first_with_limit_in_two_queries(self):
+        # hale + owner u jednom upitu, slike kroz prefetch
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/halls/nearby/', {'lat': 44.81, 'lon': 20.45, 'radius': 20})
+        self.assertEqual([hall['name'] for hall in response.data], ['Arena', 'Sportski centar'])
+        self.assertLess(response.data[0]['distance_km'], response.data[1]['distance_km'])
+
+        response = self.client.get('/api/halls/nearby/', {'lat': 44.81, 'lon': 20.45, 'radius': 20, 'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+
+class HallMapTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.arena.location = Point(20.46, 44.81, srid=4326)
+        self.arena.save()
+        self.sportski.location = Point(20.4601, 44.8101, srid=4326)
+        self.sportski.save()
+
+    def test_clusters_per_zoom(self):
+        far = self.client.get('/api/halls/clusters/', {'zoom': 5}).json()['clusters']
+        self.assertEqual([cluster['count'] for cluster in far], [2])
+
+        near = self.client.get('/api/halls/clusters/', {'zoom': 18}).json()['clusters']
+        self.assertEqual(sorted(cluster['hall_id'] for cluster in near), [self.arena.id, self.sportski.id])
+
+    def test_geojson_mode(self):
+        Review.objects.create(
+            user=self.player, hall=self.arena, rating=4,
+            appointment=self.book(self.arena, local(2025, 1, 10, 18), checked_in=True)
+        )
+        response = self.client.get('/api/halls/within-bounds/', {
+            'sw_lat': 44.7, 'sw_lon': 20.3, 'ne_lat': 44.9, 'ne_lon': 20.6,
+            'format': 'geojson', 'fields': 'id,name,rating',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        data = response.json()
+        self.assertEqual(data['type'], 'FeatureCollection')
+        arena = next(f for f in data['features'] if f['properties']['id'] == self.arena.id)
+        self.assertEqual(arena['geometry'], {'type': 'Point', 'coordinates': [20.46, 44.81]})
+        self.assertEqual(arena['properties'], {'id': self.arena.id, 'name': 'Arena', 'rating': 4.0})
+
+        response = self.client.get('/api/halls/nearby/', {
+            'lat': 44.81, 'lon': 20.46, 'format': 'geojson', 'fields': 'name,distance_km', 'limit': 1,
+        })
+        self.assertEqual(response.json()['features'][0]['properties'], {'name': 'Arena', 'distance_km': 0.0})
+
+        response = self.client.get('/api/halls/nearby/', {'lat': 44.81, 'lon': 20.46, 'format': 'geojson', 'fields': 'owner'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tile_contains_halls(self):
+        # Beograd je na istočnoj polulopti: pločica 1/1/0, ne 1/0/0
+        for url, contains in (('/api/halls/tiles/0/0/0.mvt', True), ('/api/halls/tiles/1/1/0.mvt', True), ('/api/halls/tiles/1/0/0.mvt', False)):
+            content = self.client.get(url).content
+            self.assertEqual(b'Arena' in content, contains, url)
+            self.assertEqual(b'Sportski' in content, contains, url)
+
+    def test_tile_etag_changes_with_hall_location(self):
+        url = '/api/halls/tiles/0/0/0.mvt'
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertIn(b'Arena', response.content)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/halls/{self.arena.id}/set-location/', {'lat': 45.0, 'lng': 20.0}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tile_etag_kept_when_untiled_fields_change(self):
+        url = '/api/halls/tiles/0/0/0.mvt'
+        etag = self.client.get(url)['ETag']
+
+        # Opis nije u pločici; ista lokacija kao novi Point takođe nije izmena
+        arena = Hall.objects.get(pk=self.arena.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            arena.description = 'Nova podloga'
+            arena.location = Point(arena.location.x, arena.location.y, srid=4326)
+            arena.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            arena.price = Decimal('3500.00')
+            arena.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class HallImageRenditionsTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def upload(self, size, orientation=1):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        Image.new('RGB', size, (0, 128, 0)).save(buffer, 'JPEG', exif=exif)
+        return HallImage.objects.create(
+            hall=self.arena, image=SimpleUploadedFile('teren.jpg', buffer.getvalue(), content_type='image/jpeg')
+        )
+
+    def test_original_until_processed(self):
+        image = self.upload((400, 300))
+        data = HallImageSerializer(image).data
+        self.assertEqual(data['thumbnail'], data['image'])
+        self.assertEqual(data['srcset'], data['image'])
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(process_pending(executor), 1)
+            self.assertEqual(process_pending(executor), 0)
+
+        image.refresh_from_db()
+        data = HallImageSerializer(image).data
+        self.assertTrue(data['thumbnail'].endswith('/thumb.webp'))
+        # 400px slika: card i full su iste širine, pa se u srcset-u pojavljuje jednom
+        entries = data['srcset'].split(', ')
+        self.assertEqual([entry.rsplit(' ', 1)[1] for entry in entries], ['320w', '400w'])
+        self.assertTrue(all('.webp ' in entry for entry in entries))
+
+    def test_exif_orientation_applied_and_stripped(self):
+        image = self.upload((400, 200), orientation=6)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            process_pending(executor)
+
+        image.refresh_from_db()
+        self.assertEqual((image.renditions['full']['width'], image.renditions['full']['height']), (200, 400))
+        with Image.open(image.image.storage.path(image.renditions['full']['jpeg'])) as rendered:
+            self.assertNotIn(0x0112, rendered.getexif())
+
+    def test_only_undecodable_images_are_skipped_for_good(self):
+        image = self.upload((400, 300))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with mock.patch('football_time_ns.renditions.render_renditions', side_effect=OSError(errno.ENOSPC, 'No space left on device')):
+                self.assertEqual(process_pending(executor), 0)
+            image.refresh_from_db()
+            self.assertEqual(image.renditions_source, '')
+
+            broken = HallImage.objects.create(
+                hall=self.arena, image=SimpleUploadedFile('pokvarena.jpg', b'nije slika', content_type='image/jpeg')
+            )
+            self.assertEqual(process_pending(executor), 2)
+
+        broken.refresh_from_db()
+        self.assertEqual((broken.renditions, broken.renditions_source), ({}, broken.image.name))
+        image.refresh_from_db()
+        self.assertIn('full', image.renditions)
+
+
+class HallImageStorageTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (0, 0, 255)).save(buffer, 'PNG')
+        self.content = buffer.getvalue()
+
+    def upload(self, filename):
+        self.authenticate(self.owner)
+        response = self.client.post(
+            f'/halls/{self.arena.id}/images/',
+            {'images': SimpleUploadedFile(filename, self.content, content_type='image/png')},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        return HallImage.objects.get(pk=response.data['results'][0]['image']['id'])
+
+    def test_identical_uploads_share_blob(self):
+        first = self.upload('teren.png')
+        second = self.upload('Kopija.PNG')
+        self.assertEqual(first.image.name, second.image.name)
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(first.image.name, f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.png")
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).refcount, 2)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get(first.image.url)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/halls/images/{first.id}/')
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        self.assertEqual(MediaBlob.objects.get(name=second.image.name).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/halls/images/{second.id}/')
+        self.assertFalse(second.image.storage.exists(second.image.name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_blob_served_by_web_server_in_production(self):
+        name = self.upload('teren.png').image.name
+        url = f'/media/{name}'
+        with override_settings(DEBUG=False, MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{name}')
+            self.assertEqual(response['Content-Type'], 'image/png')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(response.content, b'')
+            self.assertEqual(self.client.get('/media/blobs/../../settings.py').status_code, 404)
+
+        with override_settings(DEBUG=False, MEDIA_ACCEL_REDIRECT=''):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_upload_results_per_file(self):
+        self.authenticate(self.owner)
+        files = [
+            SimpleUploadedFile('ok.png', self.content, content_type='image/png'),
+            SimpleUploadedFile('pokvarena.jpg', b'nije slika', content_type='image/jpeg'),
+            SimpleUploadedFile('velika.png', self.content + b'\0' * 2048, content_type='image/png'),
+        ]
+        with mock.patch('football_time_ns.uploads.MAX_IMAGE_BYTES', len(self.content) + 1024):
+            response = self.client.post(f'/halls/{self.arena.id}/images/', {'images': files}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(
+            [(r['file'], r['status']) for r in response.data['results']],
+            [('ok.png', 'created'), ('pokvarena.jpg', 'rejected'), ('velika.png', 'rejected')]
+        )
+        self.assertEqual(HallImage.objects.filter(hall=self.arena).count(), 1)
+
+
+class HallRatingTests(OwnerTestCase):
+
+    def review(self, hall, rating, day):
+        return Review.objects.create(
+            user=self.player, hall=hall, rating=rating,
+            appointment=self.book(hall, local(2025, 1, day, 18), checked_in=True)
+        )
+
+    def test_counters_follow_reviews(self):
+        first = self.review(self.arena, 5, 10)
+        self.review(self.arena, 3, 11)
+        self.review(self.sportski, 4, 12)
+
+        first.rating = 1
+        first.save()
+        self.arena.refresh_from_db()
+        self.assertEqual((self.arena.rating_count, self.arena.rating_sum), (2, 4))
+        self.assertEqual([self.arena.rating_1, self.arena.rating_3, self.arena.rating_5], [1, 1, 0])
+
+        first.delete()
+        self.arena.refresh_from_db()
+        self.assertEqual((self.arena.rating_count, self.arena.rating_sum, self.arena.rating_avg), (1, 3, 3.0))
+
+        # Izmena hale ne prepisuje ocene starim vrednostima
+        stale = Hall.objects.get(pk=self.sportski.pk)
+        self.review(self.sportski, 2, 13)
+        stale.price = Decimal('2500.00')
+        stale.save()
+        self.sportski.refresh_from_db()
+        self.assertEqual(self.sportski.rating_count, 2)
+        self.assertEqual(diff_hall_ratings(), [])
+
+    def test_ordering_and_min_rating(self):
+        self.review(self.arena, 3, 10)
+        self.review(self.sportski, 5, 11)
+        Hall.objects.create(name='Bez ocena', address='Novi Sad', price=Decimal('1500.00'))
+
+        response = self.client.get('/halls/', {'ordering': '-rating'})
+        self.assertEqual([hall['name'] for hall in response.data['results']], ['Sportski centar', 'Arena', 'Bez ocena'])
+        self.assertEqual(response.data['results'][0]['rating_histogram'], {'1': 0, '2': 0, '3': 0, '4': 0, '5': 1})
+
+        response = self.client.get('/halls/', {'min_rating': 4})
+        self.assertEqual([hall['name'] for hall in response.data['results']], ['Sportski centar'])
+        self.assertEqual(self.client.get('/halls/', {'min_rating': 'x'}).status_code, 400)
+
+        Hall.objects.filter(pk=self.arena.pk).update(rating_count=0, rating_sum=0, rating_3=0)
+        self.assertEqual(len(diff_hall_ratings()), 1)
+        self.assertEqual(recompute_hall_ratings(), 1)
+        self.assertEqual(diff_hall_ratings(), [])
+
+
+class ReviewListTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day, rating in enumerate([5, 4, 4, 2, 5], start=1):
+            Review.objects.create(
+                user=self.player, hall=self.arena if day % 2 else self.sportski, rating=rating,
+                appointment=self.book(self.arena, local(2025, 1, day, 18), checked_in=True)
+            )
+        Review.objects.filter(rating=2).update(owner_seen=True)
+
+    def test_hall_reviews_paginated_with_summary(self):
+        # strana + sažetak; hall_name i user dolaze iz istog upita (select_related)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/halls/{self.arena.id}/reviews/', {'page_size': 2})
+        self.assertEqual(response.data['summary'], {
+            'count': 3, 'average': 4.67, 'histogram': {'1': 0, '2': 0, '3': 0, '4': 1, '5': 2},
+        })
+        self.assertEqual(len(response.data['results']), 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        self.assertNotIn('summary', response.data)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_user_reviews(self):
+        self.authenticate(self.player)
+        with self.assertNumQueries(2):
+            response = self.client.get('/my-reviews/')
+        self.assertEqual(response.data['summary']['count'], 5)
+        self.assertEqual([review['rating'] for review in response.data['results']], [5, 2, 4, 4, 5])
+
+    def test_owner_reviews_unseen_count_in_summary(self):
+        self.authenticate(self.owner)
+        # profil (IsOwnerRole) + strana + jedan aggregate za ocene i nepročitane
+        with self.assertNumQueries(3):
+            response = self.client.get('/owner/reviews/')
+        self.assertEqual(response.data['unseen_count'], 4)
+        self.assertEqual(response.data['summary']['unseen_count'], 4)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class SearchTests(OwnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cair = Hall.objects.create(
+            name='Hala Čair', address='Zmaj Jovina 5', price=Decimal('2500.00'), owner=self.owner,
+            description='Parket i svlačionice'
+        )
+
+    def search(self, **params):
+        response = self.client.get('/halls/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [hall['name'] for hall in response.data['results']]
+
+    def test_full_text_without_diacritics_and_typos(self):
+        self.assertEqual(self.search(q='cair'), ['Hala Čair'])
+        self.assertEqual(self.search(q='svlacionice'), ['Hala Čair'])
+        self.assertEqual(self.search(q='Futoska'), ['Sportski centar'])
+        # pg_trgm: jedno slovo viška u imenu
+        self.assertEqual(self.search(q='Arenna'), ['Arena'])
+
+        self.cair.name = 'Spens'
+        self.cair.save()
+        self.assertEqual(self.search(q='cair'), [])
+
+    def test_filters_and_pagination(self):
+        # Bez q: po oceni, pa po id
+        self.assertEqual(self.search(min_price=2400, max_price=3000), ['Arena', 'Hala Čair'])
+        response = self.client.get('/halls/search/', {'min_price': 2400, 'page_size': 1})
+        self.assertEqual([hall['name'] for hall in response.data['results']], ['Arena'])
+        second = self.client.get(response.data['next'])
+        self.assertEqual([hall['name'] for hall in second.data['results']], ['Hala Čair'])
+        self.assertIsNone(second.data['next'])
+        self.assertEqual(self.client.get('/halls/search/', {'min_rating': 9}).status_code, 400)
+
+    def test_server_side_ordering(self):
+        response = self.client.get('/halls/search/', {'ordering': '-price', 'max_price': 2600, 'page_size': 1})
+        self.assertEqual([hall['name'] for hall in response.data['results']], ['Hala Čair'])
+        second = self.client.get(response.data['next'])
+        self.assertEqual([hall['name'] for hall in second.data['results']], ['Sportski centar'])
+
+        self.arena.location = Point(20.46, 44.81, srid=4326)
+        self.arena.save()
+        self.cair.location = Point(19.85, 45.25, srid=4326)
+        self.cair.save()
+        self.assertEqual(self.search(ordering='distance', lat=45.25, lon=19.84, radius=200), ['Hala Čair', 'Arena'])
+        self.assertEqual(self.client.get('/halls/search/', {'ordering': 'distance'}).status_code, 400)
+        self.assertEqual(self.client.get('/halls/search/', {'ordering': 'owner'}).status_code, 400)
+
+    def test_owner_review_comment_search(self):
+        for day, comment in enumerate(['Odlična podloga', 'Loše svetlo'], start=1):
+            Review.objects.create(
+                user=self.player, hall=self.arena, rating=4, comment=comment,
+                appointment=self.book(self.arena, local(2025, 1, day, 18), checked_in=True)
+            )
+        self.authenticate(self.owner)
+        response = self.client.get('/owner/reviews/', {'q': 'odlicna'})
+        self.assertEqual([review['comment'] for review in response.data['results']], ['Odlična podloga'])
+        self.assertEqual(response.data['summary']['count'], 1)
+
+
+class HallListTests(OwnerTestCase):
+
+    def add_halls(self, count):
+        for i in range(count):
+            hall = Hall.objects.create(name=f'Hala {i}', address='Novi Sad', price=Decimal('1000.00'), owner=self.owner)
+            HallImage.objects.create(hall=hall, image=f'halls/hala{i}.jpg')
+
+    def test_query_count_does_not_grow_with_halls(self):
+        self.add_halls(3)
+        # hale + owner (JOIN), pa slike jednim prefetch upitom
+        with self.assertNumQueries(2):
+            response = self.client.get('/halls/')
+        self.assertEqual(len(response.data['results']), 5)
+
+        self.add_halls(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/halls/', {'page_size': 10})
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+
+        self.authenticate(self.owner)
+        with self.assertNumQueries(2):
+            response = self.client.get('/my-halls/')
+        self.assertEqual(len(response.data['results']), 25)
+
+    def test_sparse_fields(self):
+        self.add_halls(2)
+        # bez images nema ni prefetch upita
+        with self.assertNumQueries(1):
+            response = self.client.get('/halls/', {'fields': 'id,name,price'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price'})
+        self.assertEqual(self.client.get('/halls/', {'fields': 'id,secret'}).status_code, 400)
+
+
+class TokenAuthenticationTests(OwnerTestCase):
+
+    def login(self, user):
+        Profile.objects.filter(user=user).update(email_verified=True)
+        response = self.client.post('/api/token/', {'username': user.username, 'password': 'lozinka123'})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return AccessToken(response.data['access'])
+
+    def test_token_contains_role_claims(self):
+        token = self.login(self.owner)
+        self.assertEqual(token['role'], 'owner')
+        self.assertTrue(token['email_verified'])
+        self.assertEqual(self.login(self.player)['role'], 'player')
+
+    def test_owner_endpoint_without_user_queries(self):
+        self.login(self.owner)
+        # exists() + strana + aggregate: korisnik i profil se ne učitavaju
+        with self.assertNumQueries(3):
+            response = self.client.get('/owner/reviews/')
+        self.assertEqual(response.status_code, 200)
+
+        self.login(self.player)
+        with self.assertNumQueries(1):
+            response = self.client.get('/owner/reviews/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_ownership_checks_with_token_user(self):
+        self.login(self.owner)
+        appointment = self.book(self.arena, local(2025, 1, 10, 18), status='pending')
+        response = self.client.post(f'/appointments/{appointment.id}/owner-action/', {'action': 'approve'})
+        self.assertEqual(response.status_code, 200)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (16, 16), (0, 128, 0)).save(buffer, 'PNG')
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            response = self.client.post(
+                f'/halls/{self.arena.id}/images/',
+                {'images': SimpleUploadedFile('teren.png', buffer.getvalue(), content_type='image/png')},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 201)
+
+        appointment.checked_in = True
+        appointment.save()
+        self.login(self.player)
+        response = self.client.post('/reviews/create/', {'hall': self.arena.id, 'appointment': appointment.id, 'rating': 5})
+        self.assertEqual(response.status_code, 201)
+
+    def test_inactive_or_deleted_user_rejected(self):
+        self.login(self.player)
+        User.objects.filter(pk=self.player.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/my-appointments/').status_code, 401)
+
+        self.login(self.owner)
+        self.owner.delete()
+        self.assertEqual(self.client.get('/owner/reviews/').status_code, 401)
+
+    def test_refresh_reads_current_role(self):
+        Profile.objects.filter(user=self.player).update(email_verified=True)
+        refresh = self.client.post('/api/token/', {'username': 'player', 'password': 'lozinka123'}).data['refresh']
+        Profile.objects.filter(user=self.player).update(role='owner')
+
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh})
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'owner')
+
+        User.objects.filter(pk=self.player.pk).update(is_active=False)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+    def test_token_without_role_falls_back_to_profile(self):
+        Profile.objects.filter(user=self.owner).update(email_verified=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}')
+        # exists() + korisnik sa profilom (jedan JOIN) + strana + aggregate
+        with self.assertNumQueries(4):
+            response = self.client.get('/owner/reviews/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_owner_availabilities_filtered_by_token_role(self):
+        Availability.objects.create(hall=self.arena, start=local(2025, 1, 1, 10), end=local(2025, 1, 1, 12))
+        other = User.objects.create_user('drugi', 'drugi@example.com', 'lozinka123')
+        other.profile.role = 'owner'
+        other.profile.save()
+        self.login(other)
+        self.assertEqual(self.client.get('/availabilities/').data, [])
+        self.login(self.player)
+        self.assertEqual(len(self.client.get('/availabilities/').data), 1)
+
+
+class EmailVerificationTests(OwnerTestCase):
+
+    def register(self, username='novi', email='novi@example.com'):
+        response = self.client.post('/api/register/', {
+            'username': username, 'password': 'lozinka123', 'password2': 'lozinka123',
+            'email': email, 'first_name': 'Novi', 'last_name': 'Igrac',
+        })
+        self.assertEqual(response.status_code, 201)
+        return self.sent_token(email)
+
+    def sent_token(self, email):
+        body = EmailOutbox.objects.filter(recipient=email).latest('id').body
+        return re.search(r'/verify-email/(\w+)/', body).group(1)
+
+    def test_token_stored_as_hash_and_single_use(self):
+        token = self.register()
+        verification = EmailVerificationToken.objects.get(user__username='novi')
+        self.assertEqual(verification.token_hash, hashlib.sha256(token.encode()).hexdigest())
+
+        response = self.client.get(f'/verify-email/{token}/')
+        self.assertTrue(response.context['success'])
+        user = User.objects.get(username='novi')
+        self.assertTrue(user.is_active)
+        self.assertTrue(user.profile.email_verified)
+        self.assertFalse(EmailVerificationToken.objects.exists())
+        self.assertFalse(self.client.get(f'/verify-email/{token}/').context['success'])
+
+    def test_expired_token_and_resend(self):
+        old_token = self.register()
+        EmailVerificationToken.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertIn('istekao', self.client.get(f'/verify-email/{old_token}/').context['error_message'])
+
+        response = self.client.post('/api/resend-verification/', {'email': 'novi@example.com'})
+        self.assertEqual(response.status_code, 200)
+        new_token = self.sent_token('novi@example.com')
+        self.assertNotEqual(new_token, old_token)
+        # Nov link zamenjuje stari
+        self.assertEqual(EmailVerificationToken.objects.count(), 1)
+        self.assertTrue(self.client.get(f'/verify-email/{new_token}/').context['success'])
+
+    def test_resend_rate_limited(self):
+        self.register()
+        self.assertEqual(self.client.post('/api/resend-verification/', {'email': 'novi@example.com'}).status_code, 200)
+        self.assertEqual(self.client.post('/api/resend-verification/', {'email': 'novi@example.com'}).status_code, 429)
+        # Nepostojeća adresa dobija isti odgovor, bez emaila
+        response = self.client.post('/api/resend-verification/', {'email': 'nema@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(EmailOutbox.objects.filter(recipient='nema@example.com').exists())
+
+    def resend_from(self, index, **extra):
+        return self.client.post('/api/resend-verification/', {'email': f'adresa{index}@example.com'}, **extra)
+
+    def test_resend_ip_limit_ignores_forwarded_header_without_proxy(self):
+        for i in range(RESEND_LIMIT):
+            self.assertEqual(self.resend_from(i, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code, 200)
+        self.assertEqual(self.resend_from(RESEND_LIMIT, HTTP_X_FORWARDED_FOR='10.0.1.1').status_code, 429)
+
+    def test_resend_ip_limit_behind_proxy(self):
+        # Iza nginx-a su svi zahtevi sa iste REMOTE_ADDR; broji se adresa koju je dodao proksi
+        with mock.patch('rest_framework.throttling.api_settings.NUM_PROXIES', 1):
+            for i in range(RESEND_LIMIT):
+                self.assertEqual(self.resend_from(i, HTTP_X_FORWARDED_FOR='1.2.3.4, 5.6.7.8').status_code, 200)
+            self.assertEqual(self.resend_from(RESEND_LIMIT, HTTP_X_FORWARDED_FOR='5.6.7.8').status_code, 429)
+            self.assertEqual(self.resend_from(RESEND_LIMIT + 1, HTTP_X_FORWARDED_FOR='5.6.7.9').status_code, 200)
+
+    def test_resend_survives_counter_expiring_before_incr(self):
+        with mock.patch('football_time_ns.views.cache.incr', side_effect=ValueError):
+            self.assertEqual(self.resend_from(0).status_code, 200)
+
+    def test_purge_expired_tokens(self):
+        self.register('prvi', 'prvi@example.com')
+        self.register('drugi', 'drugi@example.com')
+        EmailVerificationToken.objects.filter(user__username='prvi').update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        out = io.StringIO()
+        call_command('purge_verification_tokens', stdout=out)
+        self.assertIn('Obrisano isteklih tokena: 1', out.getvalue())
+        self.assertEqual(
+            list(EmailVerificationToken.objects.values_list('user__username', flat=True)), ['drugi']
+        )
+
+
+class ProfileSaveTests(OwnerTestCase):
+
+    def test_token_endpoint_query_count(self):
+        Profile.objects.filter(user=self.player).update(email_verified=True)
+        # korisnik (authenticate) + profil (role/email_verified claim-ovi), bez upisa
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/token/', {'username': 'player', 'password': 'lozinka123'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_save_skips_unchanged_profile(self):
+        user = User.objects.select_related('profile').get(pk=self.player.pk)
+        # samo UPDATE korisnika (npr. last_login), profil se ne dira
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+        user.profile.role = 'owner'
+        with self.assertNumQueries(2):
+            user.save()
+        self.assertEqual(Profile.objects.get(user=self.player).role, 'owner')
+        with self.assertNumQueries(1):
+            user.save()
@@ -0,0 +1,108 @@
+import math
+import time
+
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Hall
+
+
+TILES_VERSION_KEY = 'hall_tiles_version'
+TILE_CACHE_TIMEOUT = 60 * 60 * 24
+MAX_ZOOM = 22
+MVT_EXTENT = 4096
+# Ćelija klastera je 1/4 pločice: na zumu z mreža ima 4 * 2^z ćelija po širini sveta
+CLUSTER_CELLS_PER_TILE = 4
+
+# Pravougaonik se poredi kao geometry (lon/lat): kao geography bi ivice bile
+# lukovi velikog kruga, a okvir celog sveta degenerisan. Koristi indeks
+# hall_location_geometry_idx na location::geometry (migracija 0032).
+
+TILE_SQL = f"""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(%s, %s, %s) AS geom
+    ),
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(h.location::geometry, 3857), bounds.geom, {MVT_EXTENT}) AS geom,
+            h.id, h.name, h.price::float AS price
+        FROM {Hall._meta.db_table} h, bounds
+        WHERE h.location IS NOT NULL
+          AND h.location::geometry && ST_Transform(bounds.geom, 4326)
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'halls', {MVT_EXTENT}, 'geom') FROM mvtgeom
+"""
+
+CLUSTER_SQL = f"""
+    SELECT COUNT(*), ST_Y(ST_Centroid(ST_Collect(g))), ST_X(ST_Centroid(ST_Collect(g))), MIN(id)
+    FROM (
+        SELECT id, location::geometry AS g
+        FROM {Hall._meta.db_table}
+        WHERE location IS NOT NULL
+          AND location::geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+    ) points
+    GROUP BY ST_SnapToGrid(g, %s)
+"""
+
+
+def tiles_version():
+    # Početna vrednost je vreme, da posle praznog keša ETag-ovi ne bi ponovo bili isti
+    cache.add(TILES_VERSION_KEY, int(time.time() * 1000), timeout=None)
+    return cache.get(TILES_VERSION_KEY)
+
+
+def bump_tiles_version():
+    """
+    Poziva se kada se hala doda, obriše ili promeni (lokacija, ime, cena):
+    svi ETag-ovi pločica i klastera postaju nevažeći.
+    """
+    try:
+        cache.incr(TILES_VERSION_KEY)
+    except ValueError:
+        tiles_version()
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_tile(z, x, y):
+    """
+    Mapbox Vector Tile (sloj 'halls': id, name, price) za pločicu z/x/y.
+    Keširano po verziji, pa promena hale ne ostavlja staru pločicu.
+    """
+    key = f"hall_tile:{tiles_version()}:{z}:{x}:{y}"
+    tile = cache.get(key)
+    if tile is None:
+        with connection.cursor() as cursor:
+            cursor.execute(TILE_SQL, [z, x, y])
+            tile = bytes(cursor.fetchone()[0] or b'')
+        cache.set(key, tile, TILE_CACHE_TIMEOUT)
+    return tile
+
+
+def cluster_halls(zoom, bbox):
+    """
+    Hale grupisane po mreži za dati zum: [{lat, lng, count, hall_id}].
+    hall_id je popunjen samo za ćelije sa jednom halom.
+    bbox = (min_lon, min_lat, max_lon, max_lat)
+    """
+    grid = 360 / (2 ** zoom * CLUSTER_CELLS_PER_TILE)
+    # bbox se širi na celu mrežu, da bi susedni pomeraji mape delili isti keš
+    bbox = (
+        max(-180.0, math.floor(bbox[0] / grid) * grid),
+        max(-90.0, math.floor(bbox[1] / grid) * grid),
+        min(180.0, math.ceil(bbox[2] / grid) * grid),
+        min(90.0, math.ceil(bbox[3] / grid) * grid),
+    )
+    key = f"hall_clusters:{tiles_version()}:{zoom}:{':'.join(str(v) for v in bbox)}"
+    clusters = cache.get(key)
+    if clusters is None:
+        with connection.cursor() as cursor:
+            cursor.execute(CLUSTER_SQL, [*bbox, grid])
+            clusters = [
+                {'lat': lat, 'lng': lng, 'count': count, 'hall_id': hall_id if count == 1 else None}
+                for count, lat, lng, hall_id in cursor.fetchall()
+            ]
+        cache.set(key, clusters, TILE_CACHE_TIMEOUT)
+    return clusters
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, TemporaryFileUploadHandler
+from PIL import Image
+
+
+IMAGE_FIELDS = ('images', 'image')
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_IMAGES_PER_UPLOAD = 30
+MAX_IMAGE_SIDE = 8000
+MAX_IMAGE_PIXELS = 40_000_000
+ALLOWED_IMAGE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+VALIDATION_WORKERS = 4
+
+
+class ImageLimitUploadHandler(FileUploadHandler):
+    """
+    Prvi handler u lancu: preskače (SkipFile) sliku čim pređe MAX_IMAGE_BYTES,
+    pre nego što se ostatak upiše na disk. files čuva redosled slika
+    ({'field', 'file', 'error'}), pa se odbijene mogu vratiti u rezultatu.
+    SkipFile se diže samo iz receive_data_chunk - iz new_file bi Django
+    zatvorio (i obrisao) privremeni fajl prethodne slike.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.files = []
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.received = 0
+        if field_name in IMAGE_FIELDS:
+            self.files.append({'field': field_name, 'file': file_name, 'error': None})
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_IMAGE_BYTES and self.field_name in IMAGE_FIELDS:
+            self.files[-1]['error'] = f'Slika je veća od {MAX_IMAGE_BYTES // (1024 * 1024)} MB.'
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def image_upload_handlers(request):
+    # Bez MemoryFileUploadHandler-a: svaki fajl ide u privremeni fajl na disku
+    return [ImageLimitUploadHandler(request), TemporaryFileUploadHandler(request)]
+
+
+def validate_image(upload):
+    """
+    Vraća poruku greške ili None. Čita samo zaglavlje i strukturu fajla
+    (Image.verify), bez dekodiranja piksela.
+    """
+    try:
+        with Image.open(upload.temporary_file_path()) as image:
+            if image.format not in ALLOWED_IMAGE_FORMATS:
+                return f"Dozvoljeni formati: {', '.join(ALLOWED_IMAGE_FORMATS)}."
+            width, height = image.size
+            if max(width, height) > MAX_IMAGE_SIDE or width * height > MAX_IMAGE_PIXELS:
+                return f'Slika je prevelika ({width}x{height}).'
+            image.verify()
+    except Exception:
+        return 'Fajl nije ispravna slika.'
+    return None
+
+
+def validate_images(uploads):
+    # Pillow oslobađa GIL dok čita fajl, pa se provera radi paralelno u threadovima
+    if not uploads:
+        return []
+    with ThreadPoolExecutor(max_workers=min(VALIDATION_WORKERS, len(uploads))) as executor:
+        return list(executor.map(validate_image, uploads))
+
+
+def uploaded_images(handler, files):
+    """
+    [(ime fajla, upload ili None, greška)] u redosledu slanja.
+    Slike preko MAX_IMAGES_PER_UPLOAD se odbijaju bez provere.
+    """
+    remaining = {field: iter(files.getlist(field)) for field in IMAGE_FIELDS}
+    result = []
+    for entry in handler.files:
+        upload = None if entry['error'] else next(remaining[entry['field']], None)
+        error = entry['error']
+        if upload is not None and len(result) >= MAX_IMAGES_PER_UPLOAD:
+            upload, error = None, f'Najviše {MAX_IMAGES_PER_UPLOAD} slika odjednom.'
+        result.append((entry['file'], upload, error))
+    return result
@@ -1,16 +1,16 @@
 from django.urls import path
 from .views import (
-    AvailabilityBulkCreate, AvailabilityDelete, ChangePasswordView, CustomTokenObtainPairView,HallImageDelete, HallImagesCreate, HallList, HallCreate, HallDetail, HallReviewsView, OwnerAllAppointments, OwnerExportPDF, OwnerMonthlyStats, OwnerReviewsView, RegisterView, MeView,
+    AvailabilityBulkCreate, AvailabilityDelete, ChangePasswordView, CustomTokenObtainPairView, CustomTokenRefreshView,HallImageDelete, HallImagesCreate, HallList, HallSearchView, HallCreate, HallDetail, HallReviewsView, OwnerAllAppointments, OwnerExportAppointments, OwnerExportPDF, OwnerReportJobDetail, OwnerReportJobDownload, OwnerMonthlyStats, OwnerReviewsView, RegisterView, MeView,
     AvailabilityCreate, AvailabilityList, HallFreeSlots,
-    AppointmentCreateView, AppointmentList, OwnerPendingAppointments,
-    OwnerApproveAppointment, AppointmentCheckIn, AppointmentDelete,MyHallsView, ReviewCreateView, UserReviewableAppointmentsView, UserReviewsView, VerifyEmailView, halls_nearby, halls_within_bounds, set_hall_location
+    AppointmentCreateView, AppointmentList, ChangesView, MyAppointmentsView, MyHallsAppointmentsView, OwnerPendingAppointments,
+    OwnerApproveAppointment, AppointmentCheckIn, AppointmentDelete,MyHallsView, ReviewCreateView, UserReviewableAppointmentsView, UserReviewsView, ResendVerificationEmailView, VerifyEmailView, EventsTicketView, events_stream, hall_tile, halls_clusters, halls_nearby, halls_within_bounds, set_hall_location
 )
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
     #halls
     path('halls/', HallList.as_view(), name='hall_list'),
     path('halls/create/', HallCreate.as_view(), name='hall_create'),
+    path('halls/search/', HallSearchView.as_view(), name='hall_search'),
     path('halls/<int:pk>/', HallDetail.as_view(), name='hall_detail'),
     path("my-halls/", MyHallsView.as_view(), name="my-halls"),
     path('halls/<int:hall_id>/images/', HallImagesCreate.as_view(), name='hall_images_create'),
@@ -18,6 +18,8 @@ urlpatterns = [
     path('api/halls/<int:hall_id>/set-location/', set_hall_location, name='set-hall-location'),
     path('api/halls/nearby/', halls_nearby, name='halls-nearby'),
     path('api/halls/within-bounds/', halls_within_bounds, name='halls-within-bounds'),
+    path('api/halls/tiles/<int:z>/<int:x>/<int:y>.mvt', hall_tile, name='halls-tile'),
+    path('api/halls/clusters/', halls_clusters, name='halls-clusters'),
 
 
     # availability
@@ -31,12 +33,18 @@ urlpatterns = [
     path('api/register/', RegisterView.as_view(), name='register'),
     path('api/me/', MeView.as_view(), name='me'),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),  
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('verify-email/<str:token>/', VerifyEmailView.as_view(), name='verify-email'),
+    path('api/resend-verification/', ResendVerificationEmailView.as_view(), name='resend-verification'),
 
     # appointments
     path('appointments/', AppointmentList.as_view(), name='appointment_list'),
+    path('my-appointments/', MyAppointmentsView.as_view(), name='my_appointments'),
+    path('my-halls/appointments/', MyHallsAppointmentsView.as_view(), name='my_halls_appointments'),
+    path('changes/', ChangesView.as_view(), name='changes'),
+    path('events/', events_stream, name='events'),
+    path('events/ticket/', EventsTicketView.as_view(), name='events_ticket'),
     path('appointments/create/', AppointmentCreateView.as_view(), name='appointment_create'),
     path('appointments/<int:pk>/owner-action/', OwnerApproveAppointment.as_view(), name='owner_action'),
     path('halls/<int:hall_id>/pending/', OwnerPendingAppointments.as_view(), name='owner_pending'),
@@ -44,6 +52,9 @@ urlpatterns = [
     path('appointments/<int:pk>/delete/', AppointmentDelete.as_view(), name='appointment_delete'),
     path('owner/appointments/', OwnerAllAppointments.as_view(), name='owner_all_appointments'),
     path('owner/export-pdf/', OwnerExportPDF.as_view(), name='owner_export_pdf'),
+    path('owner/export/<str:export_format>/', OwnerExportAppointments.as_view(), name='owner_export_appointments'),
+    path('owner/reports/<int:pk>/', OwnerReportJobDetail.as_view(), name='owner_report_detail'),
+    path('owner/reports/<int:pk>/download/', OwnerReportJobDownload.as_view(), name='owner_report_download'),
     path('owner/monthly-stats/', OwnerMonthlyStats.as_view(), name='owner_monthly_stats'),
 
 
@@ -0,0 +1,82 @@
+import hashlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .models import EmailVerificationToken
+from .outbox import enqueue_email
+
+
+VERIFICATION_TOKEN_LIFETIME = timedelta(days=1)
+# Ponovno slanje: najviše jednom u RESEND_COOLDOWN po email adresi
+# i RESEND_LIMIT puta na sat sa jedne IP adrese
+RESEND_COOLDOWN = 60
+RESEND_LIMIT = 5
+PURGE_BATCH_SIZE = 1000
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_verification_token(user):
+    """
+    Nov token za korisnika; prethodni linkovi tog korisnika prestaju da važe.
+    Vraća sirov token (ide samo u email).
+    """
+    token = get_random_string(50)
+    with transaction.atomic():
+        EmailVerificationToken.objects.filter(user=user).delete()
+        EmailVerificationToken.objects.create(
+            user=user,
+            token_hash=hash_token(token),
+            expires_at=timezone.now() + VERIFICATION_TOKEN_LIFETIME,
+        )
+    return token
+
+
+def find_verification_token(token):
+    # Pretraga po unique indeksu token_hash; None ako link ne postoji
+    return EmailVerificationToken.objects.select_related('user__profile').filter(
+        token_hash=hash_token(token)
+    ).first()
+
+
+def send_verification_email(user, token):
+    verification_url = f"http://localhost:8000/verify-email/{token}/"
+
+    subject = "Verifikujte svoj email - Football Time"
+    message = f"""
+Poštovani/poštovana {user.first_name} {user.last_name},
+
+Hvala Vam što ste se registrovali na FootballTimeNs!
+
+Da biste aktivirali svoj nalog, molimo Vas da kliknete na link ispod:
+
+{verification_url}
+
+Link će vas odvesti na stranicu gde će vaš nalog biti aktiviran.
+Link važi {VERIFICATION_TOKEN_LIFETIME.days * 24} sata.
+
+Ako niste kreirali nalog, ignorišite ovaj email.
+
+Srdačan pozdrav,
+Football Time Team
+"""
+
+    enqueue_email(subject, message, user.email)
+
+
+def purge_expired_tokens(batch_size=PURGE_BATCH_SIZE):
+    """
+    Briše jednu seriju isteklih tokena (indeks na expires_at).
+    Serije drže DELETE kratkim, bez dugog zaključavanja tabele.
+    Vraća broj obrisanih redova.
+    """
+    expired = EmailVerificationToken.objects.filter(
+        expires_at__lte=timezone.now()
+    ).order_by('expires_at').values_list('id', flat=True)[:batch_size]
+    deleted, _ = EmailVerificationToken.objects.filter(id__in=list(expired)).delete()
+    return deleted
@@ -5,43 +5,168 @@ from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly,AllowAny
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, render
-from django.db import transaction
-from datetime import timedelta, datetime,time, timezone
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
+from django.db import transaction, IntegrityError
+from django.conf import settings
+from django.core.cache import cache
+from datetime import date, timedelta, datetime,time, timezone
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_GET
+from django.views.static import serve
 from django.utils import timezone 
-
-import io
-from .models import Hall, Appointment, Availability, HallImage,Profile, Review
+from django.utils.dateparse import parse_datetime
+
+import json
+import asyncio
+import mimetypes
+import posixpath
+import time as time_module
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from .models import (
+    APPOINTMENT_NO_OVERLAP, AVAILABILITY_NO_OVERLAP, Hall, Appointment, Availability, HallDailyStats, HallImage,
+    EmailVerificationToken, ReportJob, Review, violates_constraint
+)
 from .serializer import (
-    AvailabilityBulkSerializer, ChangePasswordSerializer, HallImageSerializer, HallSerializer, RegisterSerializer, ReviewSerializer, UserSerializer,
-    AvailabilitySerializer, AppointmentSerializer, AppointmentCreateSerializer
+    AvailabilityBulkSerializer, ChangePasswordSerializer, HallImageSerializer, HallSearchSerializer, HallSerializer, RegisterSerializer, ReviewSerializer, UserSerializer,
+    AvailabilitySerializer, AppointmentSerializer, AppointmentCreateSerializer, NearbyHallSerializer, ReportJobSerializer
 )
+from .authentication import user_role
 from .permissions import IsOwnerRole
+from .free_slots import (
+    BELGRADE_TZ, DEFAULT_SLOT_LENGTH, MAX_RANGE_DAYS, SLOT_LENGTHS,
+    cached_free_slots, mark_slots
+)
+from .filters import filter_appointments
+from .pagination import KeysetPagination
+from .reports import EXPORT_FORMATS
+from .report_jobs import enqueue_report
+from .geojson import GEOJSON_FIELDS, GeoJSONRenderer, hall_feature_collection, parse_fields
+from .tiles import MAX_ZOOM, cluster_halls, render_tile, tiles_version, valid_tile
+from .rollup import owner_stats_cache_key
+from .search import parse_search_params, search_halls, search_reviews
+from .storage import BLOB_CACHE_CONTROL, BLOBS_DIR
+from .uploads import image_upload_handlers, uploaded_images, validate_images
+from .verification import (
+    RESEND_COOLDOWN, RESEND_LIMIT, create_verification_token, find_verification_token, hash_token,
+    send_verification_email
+)
+from .events import get_broker
 from django.contrib.auth import update_session_auth_hash
-from django.db.models import Count 
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Sum 
+from django.db.models.functions import TruncMonth
 from django.shortcuts import redirect
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework import serializers
 from django.contrib.gis.geos import Point
-from django.contrib.gis.db.models.functions import Distance
-from rest_framework.decorators import api_view, permission_classes
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.contrib.gis.measure import D
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.throttling import BaseThrottle
+from rest_framework.utils.urls import replace_query_param
 
 
 
 
 # Hall list - read only
+# ?ordering= za listu hala -> order_by (prati indeks hall_rating_idx)
+HALL_ORDERINGS = {
+    '-rating': ('-rating_avg', '-rating_count', 'id'),
+    'rating': ('rating_avg', 'rating_count', '-id'),
+}
+
+# /halls/search/ sortira na serveru, pa klijent ne mora da učita sve hale
+HALL_SEARCH_ORDERINGS = {
+    **HALL_ORDERINGS,
+    'name': ('name', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', 'id'),
+    # Samo uz lat/lon (distance_m iz search_halls)
+    'distance': ('distance_m', 'id'),
+}
+
+
+def hall_list_response(view, request, halls, ordering=('id',)):
+    """
+    Keyset paginacija + ?fields= za liste hala. owner dolazi kroz JOIN, a slike
+    jednim prefetch upitom (samo ako su tražene), pa je broj upita isti za svaku stranu.
+    """
+    try:
+        fields = HallSerializer.parse_fields(request.query_params.get('fields'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    halls = halls.select_related('owner')
+    if fields is None or 'images' in fields:
+        halls = halls.prefetch_related('images')
+
+    paginator = KeysetPagination(ordering=ordering)
+    page = paginator.paginate_queryset(halls, request, view=view)
+    serializer = HallSerializer(page, many=True, fields=fields, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
 class HallList(APIView):
+    """
+    GET /halls/?ordering=-rating&min_rating=4&fields=id,name,price
+    ordering: rating ili -rating (podrazumevano po id); min_rating: prosečna ocena 1-5
+    fields: samo navedena polja (npr. bez description i images); paginacija kroz next
+    """
     permission_classes = [AllowAny]
 
     def get(self, request):
         halls = Hall.objects.all()
-        serializer = HallSerializer(halls, many=True, context={'request': request})  # <-- context dodan
-        return Response(serializer.data)
+
+        ordering = request.GET.get('ordering')
+        if ordering and ordering not in HALL_ORDERINGS:
+            return Response({'error': f"ordering must be one of {', '.join(HALL_ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.GET.get('min_rating'):
+            try:
+                min_rating = float(request.GET['min_rating'])
+            except ValueError:
+                min_rating = None
+            if min_rating is None or not 1 <= min_rating <= 5:
+                return Response({'error': 'min_rating must be a number between 1 and 5'}, status=status.HTTP_400_BAD_REQUEST)
+            halls = halls.filter(rating_avg__gte=min_rating)
+
+        return hall_list_response(self, request, halls, HALL_ORDERINGS.get(ordering, ('id',)))
+
+class HallSearchView(APIView):
+    """
+    GET /halls/search/?q=arena&min_price=&max_price=&min_rating=&lat=&lon=&radius=&ordering=
+    Full-text (ime, adresa, opis, bez dijakritika) + trigram sličnost imena za greške u kucanju.
+    Sa q: sortirano po score; bez q: po oceni. ordering (name, price, -price, rating,
+    -rating, distance uz lat/lon) menja redosled. Keyset paginacija (next).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            params = parse_search_params(request.query_params)
+        except (KeyError, ValueError) as e:
+            return Response({'error': f'Nevalidni parametri pretrage: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ordering = request.GET.get('ordering')
+        if ordering and ordering not in HALL_SEARCH_ORDERINGS:
+            return Response({'error': f"ordering must be one of {', '.join(HALL_SEARCH_ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if ordering == 'distance' and 'point' not in params:
+            return Response({'error': 'ordering=distance requires lat and lon'}, status=status.HTTP_400_BAD_REQUEST)
+
+        halls = search_halls(params).select_related('owner').prefetch_related('images')
+        if ordering:
+            ordering = HALL_SEARCH_ORDERINGS[ordering]
+        else:
+            ordering = ('-score', 'id') if params['q'] else HALL_ORDERINGS['-rating']
+        paginator = KeysetPagination(ordering=ordering, page_size=20)
+        page = paginator.paginate_queryset(halls, request, view=self)
+        serializer = HallSearchSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
 
 # Hall create - only owners
 class HallCreate(APIView):
@@ -102,10 +227,9 @@ class MyHallsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Vrati hale koje pripadaju samo  owneru
-        halls = Hall.objects.filter(owner=request.user)
-        serializer = HallSerializer(halls, many=True)
-        return Response(serializer.data)
+        # Vrati hale koje pripadaju samo  owneru (paginirano, ?fields= kao i /halls/)
+        halls = Hall.objects.filter(owner_id=request.user.id)
+        return hall_list_response(self, request, halls)
 
 
 
@@ -136,7 +260,7 @@ class AvailabilityCreate(APIView):
             end = serializer.validated_data['end']
             
             # Provera vlasništva
-            if hall.owner != request.user:
+            if hall.owner_id != request.user.id:
                 return Response({'error':'Not owner of this hall'}, status=status.HTTP_403_FORBIDDEN)
             
            
@@ -149,26 +273,22 @@ class AvailabilityCreate(APIView):
                 end = tz.localize(end)
         
             
-            # Provera preklapanja
-            overlapping = Availability.objects.filter(
-                hall=hall,
-                start__lt=end,
-                end__gt=start
-            ).exists()
-            
-            if overlapping:
+            # Sačuvaj sa ispravnim vremenom - preklapanje odbija exclusion constraint u bazi
+            try:
+                with transaction.atomic():
+                    availability = Availability.objects.create(
+                        hall=hall,
+                        start=start,
+                        end=end
+                    )
+            except IntegrityError as e:
+                if not violates_constraint(e, AVAILABILITY_NO_OVERLAP):
+                    raise
                 return Response(
                     {'error': 'Već postoji availability za ovu halu u izabranom vremenskom periodu.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Sačuvaj sa ispravnim vremenom
-            availability = Availability.objects.create(
-                hall=hall,
-                start=start,
-                end=end
-            )
-            
             return Response(AvailabilitySerializer(availability).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -184,9 +304,9 @@ class AvailabilityList(APIView):
         
        
         if request.user.is_authenticated:
-            # Ako je owner, prikaži samo availability-je za njegove hale
-            if hasattr(request.user, 'profile') and request.user.profile.role == 'owner':
-                qs = qs.filter(hall__owner=request.user)
+            # Ako je owner, prikaži samo availability-je za njegove hale (uloga iz tokena)
+            if user_role(request.user) == 'owner':
+                qs = qs.filter(hall__owner_id=request.user.id)
         
         # Postojeći filter po hali
         hall_id = request.query_params.get('hall_id')
@@ -197,102 +317,66 @@ class AvailabilityList(APIView):
         return Response(serializer.data)
 
 
-def intervals_overlap(a_start, a_end, b_start, b_end):
-    return a_start < b_end and b_start < a_end
-
-def compute_free_intervals(availabilities, busy_intervals):
-    free = []
-    for a_start, a_end in availabilities:
-        parts = [(a_start, a_end)]
-        for b_start, b_end in busy_intervals:
-            new_parts = []
-            for p_start, p_end in parts:
-                if intervals_overlap(p_start,p_end,b_start,b_end):
-                    if p_start < b_start:
-                        new_parts.append((p_start, min(p_end, b_start)))
-                    if b_end < p_end:
-                        new_parts.append((max(p_start, b_end), p_end))
-                else:
-                    new_parts.append((p_start,p_end))
-            parts = new_parts
-        free.extend(parts)
-    return [(s,e) for s,e in free if s < e]
-
-
-
 # Hall free slots for a date or range
 class HallFreeSlots(APIView):
     permission_classes = []
 
     def get(self, request, hall_id):
         hall = get_object_or_404(Hall, pk=hall_id)
-        tz = pytz.timezone("Europe/Belgrade")
         date_str = request.query_params.get('date')
-        
-        if not date_str:
-            return Response({'error':'Provide date=YYYY-MM-DD'}, status=400)
+        from_str = request.query_params.get('from')
+        to_str = request.query_params.get('to')
+
+        if not date_str and not (from_str and to_str):
+            return Response({'error':'Provide date=YYYY-MM-DD or from=YYYY-MM-DD&to=YYYY-MM-DD'}, status=400)
 
         try:
-            
-            naive_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            
-            # Kreiraj datetime objekte za ceo dan u Belgrade timezone
-            local_start = tz.localize(datetime.combine(naive_date, time(0, 0)))
-            local_end = tz.localize(datetime.combine(naive_date, time(23, 59, 59)))
-            
-            # Konvertuj u UTC za bazu
-            day_start_utc = local_start.astimezone(pytz.UTC)
-            day_end_utc = local_end.astimezone(pytz.UTC)
-            
-        except Exception as e:
+            if date_str:
+                first_day = last_day = datetime.strptime(date_str, "%Y-%m-%d").date()
+            else:
+                first_day = datetime.strptime(from_str, "%Y-%m-%d").date()
+                last_day = datetime.strptime(to_str, "%Y-%m-%d").date()
+        except ValueError as e:
             print(f"Date parsing error: {e}")
             return Response({'error':'date must be YYYY-MM-DD'}, status=400)
 
-        # sve availabilities i busy appointments za taj datum
-        avails_qs = Availability.objects.filter(
-            hall=hall, start__lt=day_end_utc, end__gt=day_start_utc
-        )
-        avail_list = [(a.start.astimezone(tz), a.end.astimezone(tz)) for a in avails_qs]
+        if first_day > last_day:
+            return Response({'error':'from must be before to'}, status=400)
+        if (last_day - first_day).days + 1 > MAX_RANGE_DAYS:
+            return Response({'error':f'Range can not be longer than {MAX_RANGE_DAYS} days'}, status=400)
 
-        busy_qs = Appointment.objects.filter(
-            hall=hall, status__in=['approved','pending'],
-            start__lt=day_end_utc, end__gt=day_start_utc
-        )
-        busy_list = [(b.start.astimezone(tz), b.end.astimezone(tz)) for b in busy_qs]
-
-        free = compute_free_intervals(avail_list, busy_list)
+        try:
+            slot_minutes = int(request.query_params.get('slot', DEFAULT_SLOT_LENGTH))
+        except ValueError:
+            slot_minutes = None
+        if slot_minutes not in SLOT_LENGTHS:
+            return Response({'error':f'slot must be one of {list(SLOT_LENGTHS)}'}, status=400)
+
+        free_by_day = cached_free_slots(hall.pk, first_day, last_day, slot_minutes)
+        current_time = timezone.now().astimezone(BELGRADE_TZ)
+
+        days = []
+        for day, cached in free_by_day.items():
+            days.append({
+                'date': day.isoformat(),
+                'free_intervals': [(s.isoformat(), e.isoformat()) for s,e in cached['free_intervals']],
+                'hour_slots': mark_slots(cached['slots'], current_time),
+            })
 
-        # slotovi po 1h 
-        slots = []
-        current_time = timezone.now().astimezone(tz)  
-        
-        for s,e in free:
-            cur = s
-            while cur + timedelta(hours=1) <= e:
-                slot_end = cur + timedelta(hours=1)
-                
-                # PROVERI DA LI JE SLOT U BUDUĆNOSTI
-                if slot_end > current_time:
-                    slots.append({
-                        'start': cur.isoformat(), 
-                        'end': slot_end.isoformat(),
-                        'available': True
-                    })
-                else:
-                    # Slot je u prošlosti - označi kao nedostupan
-                    slots.append({
-                        'start': cur.isoformat(), 
-                        'end': slot_end.isoformat(),
-                        'available': False,
-                        'reason': 'Termin je u prošlosti'
-                    })
-                
-                cur += timedelta(hours=1)
+        # Jedan dan - isti oblik odgovora kao ranije
+        if date_str:
+            return Response({
+                'free_intervals': days[0]['free_intervals'],
+                'hour_slots': days[0]['hour_slots'],
+                'current_time': current_time.isoformat()
+            })
 
         return Response({
-            'free_intervals': [(s.isoformat(), e.isoformat()) for s,e in free],
-            'hour_slots': slots,
-            'current_time': current_time.isoformat()  
+            'from': first_day.isoformat(),
+            'to': last_day.isoformat(),
+            'slot_minutes': slot_minutes,
+            'days': days,
+            'current_time': current_time.isoformat()
         })
 
 # Create appointment (user) -> pending
@@ -309,19 +393,23 @@ class AppointmentCreateView(APIView):
         start = serializer.validated_data['start']
         end = serializer.validated_data['end']
 
-        # 1) Mora biti unutar dostupnosti
-        avail_exists = Availability.objects.filter(hall=hall, start__lte=start, end__gte=end).exists()
-        if not avail_exists:
-            return Response({'error':'Requested time is outside hall availability'}, status=400)
+        # Obe provere u jednom upitu
+        checks = Hall.objects.filter(pk=hall.pk).annotate(
+            # 1) Mora biti unutar dostupnosti
+            inside_availability=Exists(
+                Availability.objects.filter(hall=OuterRef('pk'), start__lte=start, end__gte=end)
+            ),
+            # 2) Ne sme da se preklapa sa odobrenim terminima
+            approved_overlap=Exists(
+                Appointment.objects.filter(
+                    hall=OuterRef('pk'), status='approved', start__lt=end, end__gt=start
+                )
+            ),
+        ).values('inside_availability', 'approved_overlap').get()
 
-        # 2) Ne sme da se preklapa sa odobrenim terminima
-        overlap = Appointment.objects.filter(
-            hall=hall,
-            status='approved',
-            start__lt=end,
-            end__gt=start
-        ).exists()
-        if overlap:
+        if not checks['inside_availability']:
+            return Response({'error':'Requested time is outside hall availability'}, status=400)
+        if checks['approved_overlap']:
             return Response({'error':'Requested time conflicts with an approved appointment'}, status=400)
 
         
@@ -336,7 +424,7 @@ class OwnerPendingAppointments(APIView):
 
     def get(self, request, hall_id):
         hall = get_object_or_404(Hall, pk=hall_id)
-        if hall.owner != request.user:
+        if hall.owner_id != request.user.id:
             return Response({'error':'Not your hall'}, status=403)
         pendings = Appointment.objects.filter(hall=hall, status='pending')
         serializer = AppointmentSerializer(pendings, many=True)
@@ -350,18 +438,20 @@ class OwnerApproveAppointment(APIView):
     def post(self, request, pk):
         action = request.data.get('action')
         appointment = get_object_or_404(Appointment, pk=pk)
-        if appointment.hall.owner != request.user:
+        if appointment.hall.owner_id != request.user.id:
             return Response({'error':'Not your hall'}, status=403)
 
         if action == 'approve':
-            # dupla provera za preklapanje
-            if Appointment.objects.filter(
-                hall=appointment.hall, status='approved',
-                start__lt=appointment.end, end__gt=appointment.start
-            ).exclude(pk=appointment.pk).exists():
-                return Response({'error':'Conflicts with existing approved appointment'}, status=400)
+            # Preklapanje sa odobrenim terminom odbija exclusion constraint u bazi,
+            # pa je odobravanje bezbedno i kada radi više gunicorn workera
             appointment.status = 'approved'
-            appointment.save()
+            try:
+                with transaction.atomic():
+                    appointment.save()
+            except IntegrityError as e:
+                if not violates_constraint(e, APPOINTMENT_NO_OVERLAP):
+                    raise
+                return Response({'error':'Conflicts with existing approved appointment'}, status=400)
             return Response({'message':'Approved'})
         elif action == 'reject':
             appointment.status = 'rejected'
@@ -411,7 +501,7 @@ class AppointmentCheckIn(APIView):
                 }, status=400)
             
             # PROVERA DOZVOLE
-            if appointment.user != request.user and appointment.hall.owner != request.user:
+            if appointment.user_id != request.user.id and appointment.hall.owner_id != request.user.id:
                 return Response({'error':'Nemate dozvolu za check-in'}, status=403)
                 
             # PROVERA STATUSA
@@ -438,22 +528,24 @@ class AppointmentDelete(APIView):
 
     def delete(self, request, pk):
         appointment = get_object_or_404(Appointment, pk=pk)
-        if appointment.user != request.user and appointment.hall.owner != request.user:
+        if appointment.user_id != request.user.id and appointment.hall.owner_id != request.user.id:
             return Response({'error':'No permission to delete'}, status=403)
         appointment.status = 'cancelled'
         appointment.save()
         return Response({'message':'Appointment cancelled'}, status=status.HTTP_204_NO_CONTENT)
 
-# Admin / Public listings as needed
+# Rezervacije pozivaoca i rezervacije za njegove hale
 class AppointmentList(APIView):
-    permission_classes = []  
+    permission_classes = [IsAuthenticated]
 
     def get(self, request):
         hall_q = request.query_params.get('hall', None)
         date_q = request.query_params.get('date', None)
         tz = pytz.timezone("Europe/Belgrade")
 
-        qs = Appointment.objects.all()
+        qs = Appointment.objects.filter(
+            Q(user_id=request.user.id) | Q(hall__owner_id=request.user.id)
+        ).select_related('hall', 'user')
         if hall_q:
             qs = qs.filter(hall__id=hall_q)
         if date_q:
@@ -468,26 +560,172 @@ class AppointmentList(APIView):
         return Response(serializer.data)
 
 
+class MyAppointmentsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        qs = Appointment.objects.filter(user_id=request.user.id).select_related('hall', 'user')
+        try:
+            qs = filter_appointments(qs, request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        paginator = KeysetPagination(ordering=('-start', '-id'))
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = AppointmentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class MyHallsAppointmentsView(APIView):
+    permission_classes = [IsAuthenticated, IsOwnerRole]
+
+    def get(self, request):
+        qs = Appointment.objects.filter(hall__owner_id=request.user.id).select_related('hall', 'user')
+
+        hall_q = request.query_params.get('hall')
+        if hall_q:
+            if not hall_q.isdigit():
+                return Response({'error': 'hall must be an id'}, status=400)
+            qs = qs.filter(hall_id=hall_q)
+        try:
+            qs = filter_appointments(qs, request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        paginator = KeysetPagination(ordering=('-start', '-id'))
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = AppointmentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+# Delta-sync: samo rezervacije i recenzije promenjene posle kursora
+CHANGES_SAFETY_LAG = timedelta(seconds=5)
+CHANGES_MAX_AGE = timedelta(days=7)
+CHANGES_PAGE_SIZE = 200
+CHANGES_ORDERING = ('updated_at', 'id')
+
+
+def changes_cursor(moment):
+    # UTC sa 'Z' da kursor ne sadrži '+' koji se gubi u query string-u
+    return moment.astimezone(pytz.UTC).isoformat().replace('+00:00', 'Z')
+
+
+class ChangesView(APIView):
+    """
+    GET /changes/?since=<cursor>
+    Vraća rezervacije i recenzije pozivaoca (kao igrača ili vlasnika hale) čiji se
+    updated_at promenio u (since, cursor]. Gornja granica kasni CHANGES_SAFETY_LAG
+    za trenutnim vremenom, da izmena iz transakcije koja se kasnije commit-uje ne
+    bi bila preskočena. Bez since, ili sa prestarim kursorom, vraća se samo novi
+    kursor i reset=True - klijent tada jednom učitava pune liste.
+    Obe liste su keyset paginirane po (updated_at, id), najviše CHANGES_PAGE_SIZE
+    po strani; dok next nije null klijent prati next (ista gornja granica, until),
+    a cursor čuva tek sa poslednje strane.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        upper = timezone.now() - CHANGES_SAFETY_LAG
+        since_q = request.query_params.get('since')
+        until_q = request.query_params.get('until')
+
+        since = None
+        if since_q:
+            since = parse_datetime(since_q)
+            if since is None or since.tzinfo is None:
+                return Response({'error': 'Invalid cursor'}, status=400)
+        if until_q:
+            until = parse_datetime(until_q)
+            if until is None or until.tzinfo is None:
+                return Response({'error': 'Invalid cursor'}, status=400)
+            upper = min(upper, until)
+
+        if since is None or since < upper - CHANGES_MAX_AGE:
+            return Response({
+                'appointments': [],
+                'reviews': [],
+                'next': None,
+                'cursor': changes_cursor(upper),
+                'reset': True,
+            })
+
+        if since >= upper:
+            appointments = Appointment.objects.none()
+            reviews = Review.objects.none()
+        else:
+            window = Q(updated_at__gt=since, updated_at__lte=upper)
+            mine = Q(user_id=request.user.id) | Q(hall__owner_id=request.user.id)
+            appointments = Appointment.objects.filter(window, mine).select_related('hall', 'user')
+            reviews = Review.objects.filter(window, mine).select_related('hall', 'user')
+
+        data = {}
+        has_next = False
+        url = request.build_absolute_uri()
+        streams = (
+            ('appointments', appointments, AppointmentSerializer),
+            ('reviews', reviews, ReviewSerializer),
+        )
+        for name, queryset, serializer_class in streams:
+            # Svaka lista ima svoj kursor, pa iscrpljena lista ne vraća iste redove
+            paginator = KeysetPagination(ordering=CHANGES_ORDERING, page_size=CHANGES_PAGE_SIZE)
+            paginator.cursor_query_param = f'{name}_cursor'
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            data[name] = serializer_class(page, many=True).data
+            if page:
+                url = replace_query_param(url, paginator.cursor_query_param, paginator.encode_cursor(page[-1]))
+            has_next = has_next or paginator.has_next
+
+        return Response({
+            **data,
+            'next': replace_query_param(url, 'until', changes_cursor(upper)) if has_next else None,
+            'cursor': changes_cursor(max(since, upper)),
+            'reset': False,
+        })
+
+
 class HallImagesCreate(APIView):
+    """
+    POST /halls/<hall_id>/images/ (multipart, 'images' ili 'image')
+    Fajlovi idu direktno u privremene fajlove na disku (najviše MAX_IMAGE_BYTES po slici),
+    proveravaju se paralelno, a ispravne se upisuju jednim bulk_create.
+    Odgovor je rezultat po fajlu, u redosledu slanja.
+    """
     permission_classes = [IsAuthenticated, IsOwnerRole]
 
+    def initial(self, request, *args, **kwargs):
+        # Pre nego što DRF pročita telo zahteva
+        self.limit_handler, temporary_handler = image_upload_handlers(request._request)
+        request.upload_handlers = [self.limit_handler, temporary_handler]
+        super().initial(request, *args, **kwargs)
+
     def post(self, request, hall_id):
         hall = get_object_or_404(Hall, pk=hall_id)
-        if hall.owner != request.user:
+        if hall.owner_id != request.user.id:
             return Response({'error': 'Not owner of this hall'}, status=status.HTTP_403_FORBIDDEN)
 
-        files = request.FILES.getlist('images') or []
-        created = []
-        for f in files:
-            hi = HallImage.objects.create(hall=hall, image=f)
-            created.append(hi)
-        # Ako si poslao samo 'image' umesto 'images'
-        if not files and request.FILES.get('image'):
-            hi = HallImage.objects.create(hall=hall, image=request.FILES.get('image'))
-            created.append(hi)
+        uploads = uploaded_images(self.limit_handler, request.FILES)
+        if not uploads:
+            return Response({'error': 'Pošaljite bar jednu sliku (images).'}, status=status.HTTP_400_BAD_REQUEST)
+
+        to_validate = [upload for _, upload, _ in uploads if upload is not None]
+        errors = dict(zip(to_validate, validate_images(to_validate)))
+
+        results = []
+        new_images = []
+        for file_name, upload, error in uploads:
+            error = error or errors.get(upload)
+            results.append({'file': file_name, 'status': 'rejected' if error else 'created', 'error': error})
+            if not error:
+                new_images.append(HallImage(hall=hall, image=upload))
 
-        serializer = HallImageSerializer(created, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        created = HallImage.objects.bulk_create(new_images)
+        data = iter(HallImageSerializer(created, many=True, context={'request': request}).data)
+        for result in results:
+            if result['status'] == 'created':
+                result['image'] = next(data)
+
+        code = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(created), 'results': results}, status=code)
 
 
 class HallImageDelete(APIView):
@@ -495,7 +733,7 @@ class HallImageDelete(APIView):
 
     def delete(self, request, pk):
         hi = get_object_or_404(HallImage, pk=pk)
-        if hi.hall.owner != request.user:
+        if hi.hall.owner_id != request.user.id:
             return Response({'error':'Not owner'}, status=status.HTTP_403_FORBIDDEN)
         hi.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -507,7 +745,7 @@ class AvailabilityDelete(APIView):
 
     def delete(self, request, pk):
         availability = get_object_or_404(Availability, pk=pk)
-        if availability.hall.owner != request.user:
+        if availability.hall.owner_id != request.user.id:
             return Response({'error': 'Not owner of this hall'}, status=status.HTTP_403_FORBIDDEN)
         availability.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -519,7 +757,7 @@ class OwnerAllAppointments(APIView):
 
     def get(self, request):
         # Vrati sve rezervacije za sve hale ovog ownera
-        halls = Hall.objects.filter(owner=request.user)
+        halls = Hall.objects.filter(owner_id=request.user.id)
         appointments = Appointment.objects.filter(hall__in=halls).order_by('-start')
         
         serializer = AppointmentSerializer(appointments, many=True)
@@ -531,178 +769,135 @@ class OwnerAllAppointments(APIView):
 from django.utils import timezone
 import pytz
 
+def report_job_response(request, job):
+    # 202 dok se izveštaj pravi, 200 kada je (već) gotov
+    serializer = ReportJobSerializer(job, context={'request': request})
+    return Response(serializer.data, status=200 if job.status == 'done' else 202)
+
+
 class OwnerExportPDF(APIView):
     permission_classes = [IsAuthenticated, IsOwnerRole]
 
     def get(self, request):
-        
-        halls = Hall.objects.filter(owner=request.user)
-        appointments = Appointment.objects.filter(
-            hall__in=halls
-        ).select_related('hall', 'user').order_by('-start')
-        
-        
-        cancellation_stats = {}
-        for appointment in appointments:
-            if appointment.status == 'cancelled':
-                username = appointment.user.username
-                if username not in cancellation_stats:
-                    cancellation_stats[username] = {
-                        'count': 0,
-                        'last_cancellation': appointment.start
-                    }
-                cancellation_stats[username]['count'] += 1
-                if appointment.start > cancellation_stats[username]['last_cancellation']:
-                    cancellation_stats[username]['last_cancellation'] = appointment.start
-        
-        # Sortiraj po broju otkazivanja (opadajuće)
-        top_cancellers = sorted(
-            [(username, data) for username, data in cancellation_stats.items()],
-            key=lambda x: x[1]['count'],
-            reverse=True
-        )[:5]  # Top 5 korisnika
-        
-        # Create PDF
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        
-        
-        
-        belgrade_tz = pytz.timezone('Europe/Belgrade')
-        current_time = timezone.now().astimezone(belgrade_tz)
-        
-        # Header
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, height - 50, "Izveštaj o rezervacijama")
-        p.setFont("Helvetica", 12)
-        p.drawString(50, height - 70, f"Datum izveštaja: {current_time.strftime('%d.%m.%Y. %H:%M')}")
-        p.drawString(50, height - 85, f"Vlasnik: {request.user.username}")
-        p.drawString(50, height - 100, f"Ukupno hala: {halls.count()}")
-        
-        y_position = height - 200
-        
-        # Table data 
-        data = [['Hala', 'Korisnik', 'Datum', 'Vreme', 'Status', 'Check-in', 'Cena']]
-        
-        total_price = 0
-        status_counts = {'approved': 0, 'pending': 0, 'rejected': 0, 'cancelled': 0}
-        checked_in_count = 0
-        
-        for appointment in appointments:
-            
-            start_local = appointment.start.astimezone(belgrade_tz)
-            end_local = appointment.end.astimezone(belgrade_tz)
-            
-            date_str = start_local.strftime('%d.%m.%Y.')
-            time_str = f"{start_local.strftime('%H:%M')} - {end_local.strftime('%H:%M')}"
-            price = appointment.hall.price
-            
-            checkin_status = "✓" if appointment.checked_in else "x"
-            
-            data.append([
-                appointment.hall.name,
-                appointment.user.username,
-                date_str,
-                time_str,
-                appointment.status,
-                checkin_status,  
-                f"{price} RSD"
-            ])
-            
-            if appointment.status == 'approved':
-                total_price += price
-                if appointment.checked_in:
-                    checked_in_count += 1
-                    
-            status_counts[appointment.status] += 1
-        
-        # Draw main table
-        table = Table(data, colWidths=[100, 65, 55, 75, 45, 40, 50])  
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6'))
-        ]))
-        
-        
-        table.wrapOn(p, width - 100, height)
-        table.drawOn(p, 50, y_position - len(appointments) * 15 - 50)
-        
-        # Osnovna statistika
-        y_stats = y_position - len(appointments) * 15 - 80
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(50, y_stats, "Statistika:")
-        p.setFont("Helvetica", 9)
-        
-        stats = [
-            f"Odobrene: {status_counts['approved']}",
-            f"Check-in: {checked_in_count}/{status_counts['approved']}",
-            f"Na cekanju: {status_counts['pending']}",
-            f"Odbijene: {status_counts['rejected']}",
-            f"Otkazane: {status_counts['cancelled']}",
-            f"Ukupna vrednost (odobrene): {total_price} RSD"
-        ]
-        
-        for i, stat in enumerate(stats):
-            p.drawString(50, y_stats - 20 - (i * 15), stat)
-        
-        
-        if top_cancellers:
-            y_cancellation = y_stats - 20 - (len(stats) * 15) - 30
-            
-            p.setFont("Helvetica-Bold", 10)
-            p.drawString(50, y_cancellation, "Korisnici sa najviše otkazivanja:")
-            p.setFont("Helvetica", 9)
-            
-            # Header za tabelu otkazivanja
-            p.drawString(50, y_cancellation - 20, "Korisnik")
-            p.drawString(150, y_cancellation - 20, "Broj otkazivanja")
-            p.drawString(250, y_cancellation - 20, "Poslednje otkazivanje")
-            
-            
-            p.line(50, y_cancellation - 22, 350, y_cancellation - 22)
-            
-            # Podaci o otkazivanjima
-            for i, (username, data) in enumerate(top_cancellers):
-                y_row = y_cancellation - 35 - (i * 15)
-                p.drawString(50, y_row, username)
-                p.drawString(150, y_row, str(data['count']))
-                
-                
-                last_cancel_local = data['last_cancellation'].astimezone(belgrade_tz)
-                p.drawString(250, y_row, last_cancel_local.strftime('%d.%m.%Y.'))
-                
-                
-                if data['count'] >= 3:
-                    p.setFont("Helvetica-Bold", 8)
-                    p.drawString(320, y_row, "Cesto otkazuje")
-                    p.setFont("Helvetica", 9)
-            
-            # Savet za vlasnike
-            y_advice = y_cancellation - 35 - (len(top_cancellers) * 15) - 15
-            p.setFont("Helvetica-Oblique", 8)
-            p.drawString(50, y_advice, "Savet: Korisnici sa 3+ otkazivanja mogu biti neozbiljni.")
-            p.setFont("Helvetica", 9)
-        
-        p.showPage()
-        p.save()
-        
-        buffer.seek(0)
-        
-        filename = f"rezervacije_{request.user.username}_{current_time.strftime('%Y%m%d_%H%M')}.pdf"
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        # Filteri: from=YYYY-MM-DD  to=YYYY-MM-DD  hall=<id>
+        # PDF pravi run_report_jobs worker; klijent prati posao na /owner/reports/<id>/
+        try:
+            job, _ = enqueue_report(request.user, 'pdf', request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return report_job_response(request, job)
        
 
+class OwnerExportAppointments(APIView):
+    permission_classes = [IsAuthenticated, IsOwnerRole]
+
+    def get(self, request, export_format):
+        # /owner/export/csv/ ili /owner/export/ndjson/
+        # Filteri: from=YYYY-MM-DD  to=YYYY-MM-DD  hall=<id>  status=approved,cancelled
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'format must be one of {sorted(EXPORT_FORMATS)}'}, status=400)
+        try:
+            job, _ = enqueue_report(request.user, export_format, request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return report_job_response(request, job)
+
+
+class OwnerReportJobDetail(APIView):
+    permission_classes = [IsAuthenticated, IsOwnerRole]
+
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk, owner_id=request.user.id)
+        return report_job_response(request, job)
+
+
+class OwnerReportJobDownload(APIView):
+    permission_classes = [IsAuthenticated, IsOwnerRole]
+
+    def get(self, request, pk):
+        # Fajlovi izveštaja se ne služe preko /media/, samo vlasniku posla
+        job = get_object_or_404(ReportJob, pk=pk, owner_id=request.user.id)
+        if job.status != 'done' or not job.file:
+            return Response({'error': 'Report is not ready'}, status=409)
+
+        created = job.created_at.astimezone(BELGRADE_TZ)
+        filename = f"rezervacije_{request.user.username}_{created.strftime('%Y%m%d_%H%M')}.{job.kind}"
+        content_type = 'application/pdf' if job.kind == 'pdf' else EXPORT_FORMATS[job.kind]
+        try:
+            return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename, content_type=content_type)
+        except FileNotFoundError:
+            return Response({'error': 'Report file is missing, export again'}, status=410)
+
+
+MONTH_NAMES = ['Januar', 'Februar', 'Mart', 'April', 'Maj', 'Jun', 'Jul', 'Avgust', 'Septembar', 'Oktobar', 'Novembar', 'Decembar']
+
+
+def monthly_stats_from_rollup(owner, year, first_month, last_month):
+    """
+    Statistika po mesecima (first_month..last_month) iz HallDailyStats:
+    dva upita bez obzira na broj rezervacija.
+    """
+    last = date(year + 1, 1, 1) if last_month == 12 else date(year, last_month + 1, 1)
+    days = HallDailyStats.objects.filter(
+        hall__owner=owner,
+        date__gte=date(year, first_month, 1),
+        date__lt=last
+    ).annotate(month=TruncMonth('date'))
+    
+    # Prihod je sačuvan po ceni iz rezervacije (promena cene ne menja prošle mesece)
+    per_month = {
+        row['month'].month: row
+        for row in days.values('month').annotate(
+            total=Sum('total'),
+            approved=Sum('approved'),
+            pending=Sum('pending'),
+            checked_in=Sum('checked_in'),
+            revenue=Sum('revenue'),
+            realized_revenue=Sum('realized_revenue'),
+        ).order_by('month')
+    }
+    
+    # Najpopularnija hala - prvi red svakog meseca je pobednik
+    most_popular = {}
+    for row in days.values('month', 'hall__name').annotate(
+        count=Sum('total')
+    ).filter(count__gt=0).order_by('month', '-count', 'hall__name'):
+        most_popular.setdefault(row['month'].month, row['hall__name'])
+    
+    return {
+        month: month_stats_entry(month, per_month.get(month, {}), most_popular.get(month, "Nema rezervacija"))
+        for month in range(first_month, last_month + 1)
+    }
+
+
+def month_stats_entry(month, row, most_popular_hall):
+    total_reservations = row.get('total') or 0
+    approved_reservations = row.get('approved') or 0
+    pending_reservations = row.get('pending') or 0
+    checked_in_reservations = row.get('checked_in') or 0
+    
+    # Ukupna vrednost
+    revenue = float(row.get('revenue') or 0)
+    realized_revenue = float(row.get('realized_revenue') or 0)
+    
+    completion_rate = round((approved_reservations / total_reservations * 100) if total_reservations > 0 else 0, 1)
+    realization_rate = round((checked_in_reservations / approved_reservations * 100) if approved_reservations > 0 else 0, 1)
+    
+    return {
+        'month': MONTH_NAMES[month - 1],
+        'month_number': month,
+        'total_reservations': total_reservations,
+        'approved_reservations': approved_reservations,
+        'pending_reservations': pending_reservations,
+        'checked_in_reservations': checked_in_reservations,
+        'revenue': revenue,
+        'realized_revenue': realized_revenue,
+        'completion_rate': completion_rate,
+        'realization_rate': realization_rate,
+        'most_popular_hall': most_popular_hall,
+    }
+
+
 class OwnerMonthlyStats(APIView):
     permission_classes = [IsAuthenticated, IsOwnerRole]
 
@@ -714,59 +909,29 @@ class OwnerMonthlyStats(APIView):
         except ValueError:
             return Response({'error': 'Invalid year'}, status=400)
 
-        halls = Hall.objects.filter(owner=request.user)
+        owner_id = request.user.id
+        stats_by_month = {}
         
-        months = ['Januar', 'Februar', 'Mart', 'April', 'Maj', 'Jun', 'Jul', 'Avgust', 'Septembar', 'Oktobar', 'Novembar', 'Decembar']
-        
-        monthly_stats = []
+        # Meseci koji su završeni se više ne menjaju (osim preko signala koji
+        # brišu njihov keš), pa se čuvaju bez isteka
+        current_month = timezone.now().astimezone(BELGRADE_TZ).date().replace(day=1)
+        closed_keys = {
+            owner_stats_cache_key(owner_id, year, month): month
+            for month in range(1, 13) if date(year, month, 1) < current_month
+        }
+        for key, value in cache.get_many(list(closed_keys)).items():
+            stats_by_month[closed_keys[key]] = value
         
-        for month in range(1, 13):
-            month_start = datetime(year, month, 1)
-            if month == 12:
-                month_end = datetime(year + 1, 1, 1)
-            else:
-                month_end = datetime(year, month + 1, 1)
-            
-            tz = pytz.timezone("Europe/Belgrade")
-            month_start = tz.localize(month_start)
-            month_end = tz.localize(month_end)
-            
-            appointments = Appointment.objects.filter(
-                hall__in=halls,
-                start__gte=month_start,
-                start__lt=month_end
-            )
-            
-            total_reservations = appointments.count()
-            approved_reservations = appointments.filter(status='approved').count()
-            pending_reservations = appointments.filter(status='pending').count()
-            checked_in_reservations = appointments.filter(status='approved', checked_in=True).count()
-            
-            # Ukupna vrednost
-            revenue = sum(float(app.hall.price) for app in appointments.filter(status='approved'))
-            realized_revenue = sum(float(app.hall.price) for app in appointments.filter(status='approved', checked_in=True))
-            
-            
-            completion_rate = round((approved_reservations / total_reservations * 100) if total_reservations > 0 else 0, 1)
-            realization_rate = round((checked_in_reservations / approved_reservations * 100) if approved_reservations > 0 else 0, 1)
-            
-            hall_stats = appointments.values('hall__name').annotate(count=Count('id')).order_by('-count')
-            most_popular_hall = hall_stats[0]['hall__name'] if hall_stats else "Nema rezervacija"
-            
-            monthly_stats.append({
-                'month': months[month - 1],
-                'month_number': month,
-                'total_reservations': total_reservations,
-                'approved_reservations': approved_reservations,
-                'pending_reservations': pending_reservations,
-                'checked_in_reservations': checked_in_reservations,
-                'revenue': revenue,
-                'realized_revenue': realized_revenue,
-                'completion_rate': completion_rate,
-                'realization_rate': realization_rate,
-                'most_popular_hall': most_popular_hall,
-            })
+        missing = [month for month in range(1, 13) if month not in stats_by_month]
+        if missing:
+            computed = monthly_stats_from_rollup(owner_id, year, missing[0], missing[-1])
+            for month in missing:
+                stats_by_month[month] = computed[month]
+            cache.set_many({
+                key: computed[month] for key, month in closed_keys.items() if month in missing
+            }, timeout=None)
         
+        monthly_stats = [stats_by_month[month] for month in range(1, 13)]
         
         yearly_totals = {
             'total_reservations': sum(stat['total_reservations'] for stat in monthly_stats),
@@ -827,45 +992,91 @@ class ChangePasswordView(APIView):
 class VerifyEmailView(APIView):
     def get(self, request, token):
         try:
+            # Pretraga po hash-u tokena (unique indeks), rok iz expires_at
+            verification = find_verification_token(token)
+            if verification is None:
+                return render(request, 'email_verification.html', {
+                    'success': False,
+                    'error_message': 'Nevažeći verifikacioni link.'
+                })
             
-            profile = Profile.objects.get(verification_token=token)
-            
-            
-            token_age = timezone.now() - profile.user.date_joined
-            if token_age.days > 1:  
+            if verification.expires_at <= timezone.now():
                 return render(request, 'email_verification.html', {
                     'success': False,
                     'error_message': 'Verifikacioni link je istekao. Molimo vas da zatražite novi.'
                 })
             
-            
-            user = profile.user
-            user.is_active = True
-            user.save()
-            
-            
-            profile.email_verified = True
-            profile.verification_token = None  
-            profile.save()
+            user = verification.user
+            with transaction.atomic():
+                user.is_active = True
+                user.save(update_fields=['is_active'])
+                
+                user.profile.email_verified = True
+                user.profile.save(update_fields=['email_verified'])
+                
+                # Link je jednokratan
+                EmailVerificationToken.objects.filter(user=user).delete()
             
             return render(request, 'email_verification.html', {
                 'success': True,
                 'user_first_name': user.first_name
             })
             
-        except Profile.DoesNotExist:
-            return render(request, 'email_verification.html', {
-                'success': False,
-                'error_message': 'Nevažeći verifikacioni link.'
-            })
         except Exception as e:
             return render(request, 'email_verification.html', {
                 'success': False,
                 'error_message': 'Došlo je do greške prilikom verifikacije.'
             })
+
+
+class ResendVerificationEmailView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        email = (request.data.get('email') or '').strip().lower()
+        if not email:
+            return Response({'error': 'email is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Ograničenje kroz keš: cache.add je atomski, pa dva paralelna zahteva ne prolaze oba.
+        # IP klijenta iza nginx-a daje DRF get_ident (X-Forwarded-For uz NUM_PROXIES)
+        email_key = f"verification_resend:{hash_token(email)}"
+        ip_key = f"verification_resend_ip:{BaseThrottle().get_ident(request)}"
+        cache.add(ip_key, 0, 60 * 60)
+        try:
+            attempts = cache.incr(ip_key)
+        except ValueError:
+            # Ključ je istekao ili izbačen između add i incr - počinje novi prozor
+            cache.add(ip_key, 1, 60 * 60)
+            attempts = 1
+        if attempts > RESEND_LIMIT or not cache.add(email_key, 1, RESEND_COOLDOWN):
+            return Response(
+                {'error': 'Previše zahteva. Pokušajte ponovo za minut.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        # Isti odgovor bez obzira da li nalog postoji - ne otkriva registrovane adrese
+        user = User.objects.filter(email__iexact=email, profile__email_verified=False).first()
+        if user is not None:
+            with transaction.atomic():
+                send_verification_email(user, create_verification_token(user))
+
+        return Response({'message': 'Ako nalog postoji i nije verifikovan, poslat je nov verifikacioni link.'})
         
 
+def set_profile_claims(token, user):
+    # role i email_verified u tokenu - LazyJWTAuthentication ih čita bez upita
+    profile = getattr(user, 'profile', None)
+    token['role'] = profile.role if profile else None
+    token['email_verified'] = profile.email_verified if profile else False
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_profile_claims(token, user)
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         
@@ -881,6 +1092,31 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Nov access token nosi trenutnu ulogu iz baze, a ne onu iz refresh tokena:
+    inače bi promena uloge kasnila ceo REFRESH_TOKEN_LIFETIME.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.select_related('profile').filter(
+            pk=refresh.payload.get(jwt_settings.USER_ID_CLAIM), is_active=True
+        ).first()
+        if user is None:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        set_profile_claims(access, user)
+        data['access'] = str(access)
+        return data
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
 
 
 
@@ -895,30 +1131,68 @@ class ReviewCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# Recenzije: najnovije prve, keyset paginacija po (created_at, id)
+REVIEW_ORDERING = ('-created_at', '-id')
+
+
+def review_summary(reviews, unseen=False):
+    """
+    Broj, prosek i histogram ocena (i broj nepročitanih za vlasnika)
+    za ceo skup recenzija, jednim aggregate upitom.
+    """
+    aggregates = {
+        'count': Count('id'),
+        'average': Avg('rating'),
+        **{f'rating_{value}': Count('id', filter=Q(rating=value)) for value in range(1, 6)},
+    }
+    if unseen:
+        aggregates['unseen_count'] = Count('id', filter=Q(owner_seen=False))
+    totals = reviews.aggregate(**aggregates)
+
+    summary = {
+        'count': totals['count'],
+        'average': round(totals['average'], 2) if totals['average'] is not None else None,
+        'histogram': {str(value): totals[f'rating_{value}'] for value in range(1, 6)},
+    }
+    if unseen:
+        summary['unseen_count'] = totals['unseen_count']
+    return summary
+
+
+def paginated_reviews(view, request, reviews, unseen=False):
+    # Sažetak ide samo uz prvu stranu; sledeće strane su jedan upit
+    paginator = KeysetPagination(ordering=REVIEW_ORDERING)
+    page = paginator.paginate_queryset(reviews.select_related('user', 'hall'), request, view=view)
+    extra = {}
+    if not request.query_params.get(paginator.cursor_query_param):
+        extra['summary'] = review_summary(reviews, unseen=unseen)
+        if unseen:
+            extra['unseen_count'] = extra['summary']['unseen_count']
+    return paginator.get_paginated_response(ReviewSerializer(page, many=True).data, **extra)
+
+
 class HallReviewsView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request, hall_id):
-        reviews = Review.objects.filter(hall_id=hall_id).select_related('user')
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.filter(hall_id=hall_id)
+        return paginated_reviews(self, request, reviews)
 
 class UserReviewsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        reviews = Review.objects.filter(user=request.user).select_related('hall', 'appointment')
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.filter(user_id=request.user.id)
+        return paginated_reviews(self, request, reviews)
 
 class UserReviewableAppointmentsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         # Vrati odobrene rezervacije gde je user CHECK-IN-OVAO i nije ocenio
-        reviewed_appointments = Review.objects.filter(user=request.user).values_list('appointment_id', flat=True)
+        reviewed_appointments = Review.objects.filter(user_id=request.user.id).values_list('appointment_id', flat=True)
         appointments = Appointment.objects.filter(
-            user=request.user,
+            user_id=request.user.id,
             status='approved',
             checked_in=True  
         ).exclude(id__in=reviewed_appointments).select_related('hall')
@@ -933,23 +1207,17 @@ class OwnerReviewsView(APIView):
     permission_classes = [IsAuthenticated, IsOwnerRole]
     
     def get(self, request):
-        owner_halls = Hall.objects.filter(owner=request.user)
-        reviews = Review.objects.filter(hall__in=owner_halls).select_related('user', 'hall').order_by('-created_at')
-        
-        # Vrati broj nepročitanih recenzija
-        unseen_count = reviews.filter(owner_seen=False).count()
-        
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response({
-            'reviews': serializer.data,
-            'unseen_count': unseen_count
-        })
+        # ?q= pretražuje komentare; unseen_count je u istom aggregate upitu kao i sažetak ocena
+        reviews = Review.objects.filter(hall__owner_id=request.user.id)
+        if request.query_params.get('q', '').strip():
+            reviews = search_reviews(reviews, request.query_params['q'])
+        return paginated_reviews(self, request, reviews, unseen=True)
     
     
     def post(self, request):
         
-        owner_halls = Hall.objects.filter(owner=request.user)
-        Review.objects.filter(hall__in=owner_halls, owner_seen=False).update(owner_seen=True)
+        owner_halls = Hall.objects.filter(owner_id=request.user.id)
+        Review.objects.filter(hall__in=owner_halls, owner_seen=False).update(owner_seen=True, updated_at=timezone.now())
         
         return Response({'message': 'Recenzije označene kao pročitane'})
     
@@ -971,7 +1239,7 @@ class AvailabilityBulkCreate(APIView):
             days_of_week = serializer.validated_data.get('days_of_week', [0,1,2,3,4,5,6])
             
             
-            if hall.owner != request.user:
+            if hall.owner_id != request.user.id:
                 return Response({'error':'Not owner of this hall'}, status=status.HTTP_403_FORBIDDEN)
             
             created_availabilities = []
@@ -999,29 +1267,25 @@ class AvailabilityBulkCreate(APIView):
                     
                     print(f"✅ Kreiram {current_date} - {start_dt} to {end_dt}")
                     
-                    # Provera preklapanja
-                    overlapping = Availability.objects.filter(
-                        hall=hall,
-                        start__lt=end_dt,
-                        end__gt=start_dt
-                    ).exists()
-                    
-                    if not overlapping:
-                        try:
+                    # Preklapanje odbija exclusion constraint u bazi
+                    try:
+                        with transaction.atomic():
                             availability = Availability.objects.create(
                                 hall=hall,
                                 start=start_dt,
                                 end=end_dt
                             )
-                            created_availabilities.append(availability)
-                            created_count += 1
-                            print(f"USPEO: Kreiran za {current_date}")
-                        except Exception as e:
-                            errors.append(f"Greška za {current_date.strftime('%d.%m.%Y.')}: {str(e)}")
-                            print(f"❌ GREŠKA: {current_date} - {e}")
-                    else:
+                        created_availabilities.append(availability)
+                        created_count += 1
+                        print(f"USPEO: Kreiran za {current_date}")
+                    except IntegrityError as e:
+                        if not violates_constraint(e, AVAILABILITY_NO_OVERLAP):
+                            raise
                         errors.append(f"Preklapanje za {current_date.strftime('%d.%m.%Y.')}")
                         print(f" PRESKOČEN: Preklapanje za {current_date}")
+                    except Exception as e:
+                        errors.append(f"Greška za {current_date.strftime('%d.%m.%Y.')}: {str(e)}")
+                        print(f"❌ GREŠKA: {current_date} - {e}")
                 else:
                     print(f"⏭ PRESKOČEN: {current_date} (weekday {weekday} nije u {days_of_week})")
                 
@@ -1054,7 +1318,7 @@ class AvailabilityBulkCreate(APIView):
 # @permission_classes([IsAuthenticated])
 def set_hall_location(request, hall_id):
     try:
-        hall = Hall.objects.get(id=hall_id, owner=request.user)
+        hall = Hall.objects.get(id=hall_id, owner_id=request.user.id)
         lat = request.data.get('lat')
         lng = request.data.get('lng')
         
@@ -1089,43 +1353,66 @@ def set_hall_location(request, hall_id):
         print(f"❌ Greška: {str(e)}")  # Debug
         return Response({'error': 'Interna greška servera.'}, status=500)
 
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 200
+
+
+def nearby_halls_queryset(user_location, radius_km):
+    """
+    Hale u krugu od radius_km, sortirane od najbliže, sa distance anotacijom.
+    ST_DWithin koristi GiST indeks na location, a ORDER BY location <-> tačka
+    (KNN) čita indeks već sortiran po udaljenosti i staje posle LIMIT redova.
+    """
+    return Hall.objects.filter(
+        location__dwithin=(user_location, D(km=radius_km))
+    ).annotate(
+        distance=Distance('location', user_location)
+    ).order_by(GeometryDistance('location', user_location))
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, BrowsableAPIRenderer, GeoJSONRenderer])
 def halls_nearby(request):
     """
     Pronađi hale u blizini određene lokacije
+    ?format=geojson&fields=id,name,price,thumbnail,rating,distance_km - lagani FeatureCollection za mapu
     """
     try:
         lat = float(request.GET.get('lat', 0))
         lon = float(request.GET.get('lon', 0))
         radius = float(request.GET.get('radius', 10))  # km (default 10km)
+        limit = int(request.GET.get('limit', NEARBY_DEFAULT_LIMIT))
     except (TypeError, ValueError):
-        return Response({'error': 'Nevalidne koordinate ili radius.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'Nevalidne koordinate, radius ili limit.'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, NEARBY_MAX_LIMIT))
 
     # Kreiraj Point (longitude, latitude)
     user_location = Point(lon, lat, srid=4326)
 
-    # Pronađi hale unutar radiusa (konvertuj km u metri)
-    nearby_halls = Hall.objects.filter(
-        location__distance_lte=(user_location, radius * 1000)
-    ).annotate(
-        distance=Distance('location', user_location)
-    ).order_by('distance')
+    if request.GET.get('format') == 'geojson':
+        try:
+            fields = parse_fields(request.GET.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(hall_feature_collection(
+            nearby_halls_queryset(user_location, radius), fields, request, limit=limit
+        ))
 
-    serializer = HallSerializer(nearby_halls, many=True, context={'request': request})
-    
-    # Dodaj distance u response
-    response_data = serializer.data
-    for i, hall_data in enumerate(response_data):
-        hall_data['distance_km'] = round(nearby_halls[i].distance.km, 2) if nearby_halls[i].distance else None
+    nearby_halls = list(
+        nearby_halls_queryset(user_location, radius).select_related('owner').prefetch_related('images')[:limit]
+    )
 
-    return Response(response_data)
+    serializer = NearbyHallSerializer(nearby_halls, many=True, context={'request': request})
+    return Response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, BrowsableAPIRenderer, GeoJSONRenderer])
 def halls_within_bounds(request):
     """
     Pronađi hale unutar bounding box-a (za mape)
+    ?format=geojson&fields=... - lagani FeatureCollection (vidi halls_nearby)
     """
     try:
         sw_lat = float(request.GET.get('sw_lat'))
@@ -1140,13 +1427,156 @@ def halls_within_bounds(request):
     bbox = Polygon.from_bbox((sw_lon, sw_lat, ne_lon, ne_lat))
     bbox.srid = 4326
 
-    # Pronađi hale unutar bounding box-a
-    halls_in_bounds = Hall.objects.filter(location__within=bbox)
+    # Pronađi hale unutar bounding box-a (geography podržava coveredby, ne within)
+    halls_in_bounds = Hall.objects.filter(location__coveredby=bbox)
+
+    if request.GET.get('format') == 'geojson':
+        try:
+            fields = parse_fields(request.GET.get('fields'), allowed=[f for f in GEOJSON_FIELDS if f != 'distance_km'])
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(hall_feature_collection(halls_in_bounds.order_by('id'), fields, request))
     
     serializer = HallSerializer(halls_in_bounds, many=True, context={'request': request})
     return Response(serializer.data)
-    
 
 
+def tile_etag(request, z, x, y):
+    return f"{tiles_version()}-{z}-{x}-{y}"
+
+
+@require_GET
+@condition(etag_func=tile_etag)
+def hall_tile(request, z, x, y):
+    """
+    GET /api/halls/tiles/<z>/<x>/<y>.mvt - Mapbox Vector Tile sa slojem 'halls'
+    ETag se menja kada se promeni bilo koja hala (tiles.bump_tiles_version)
+    """
+    if not valid_tile(z, x, y):
+        raise Http404("Tile out of range")
+    response = HttpResponse(render_tile(z, x, y), content_type='application/vnd.mapbox-vector-tile')
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+def clusters_etag(request):
+    return f"{tiles_version()}-{request.GET.urlencode()}"
+
+
+@require_GET
+@condition(etag_func=clusters_etag)
+def halls_clusters(request):
+    """
+    GET /api/halls/clusters/?zoom=8&sw_lat=..&sw_lon=..&ne_lat=..&ne_lon=..
+    Hale grupisane po mreži (ST_SnapToGrid) za zum mape; bez bbox-a ceo svet.
+    """
+    try:
+        zoom = int(request.GET.get('zoom', 0))
+        if 'sw_lat' in request.GET:
+            bbox = (
+                float(request.GET['sw_lon']), float(request.GET['sw_lat']),
+                float(request.GET['ne_lon']), float(request.GET['ne_lat']),
+            )
+        else:
+            bbox = (-180.0, -90.0, 180.0, 90.0)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Nevalidan zoom ili bounding box.'}, status=400)
+    if not 0 <= zoom <= MAX_ZOOM:
+        return JsonResponse({'error': f'zoom must be between 0 and {MAX_ZOOM}'}, status=400)
 
+    response = JsonResponse({'zoom': zoom, 'clusters': cluster_halls(zoom, bbox)})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+@require_GET
+def media_blob(request, path):
+    """
+    GET /media/blobs/<path> - slike iz ContentAddressedStorage.
+    Adresa se menja čim se promeni sadržaj, pa keš može da ih čuva zauvek.
+    U produkciji fajl šalje web server (X-Accel-Redirect na MEDIA_ACCEL_REDIRECT),
+    Django ga čita sa diska samo u DEBUG režimu.
+    """
+    if settings.DEBUG:
+        response = serve(request, f"{BLOBS_DIR}/{path}", document_root=settings.MEDIA_ROOT)
+    elif settings.MEDIA_ACCEL_REDIRECT:
+        path = posixpath.normpath(path).lstrip('/')
+        if path.startswith('..'):
+            raise Http404
+        response = HttpResponse(content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_REDIRECT.rstrip('/')}/{BLOBS_DIR}/{path}"
+    else:
+        # Bez X-Accel-Redirect web server treba sam da služi MEDIA_URL
+        raise Http404
+    response['Cache-Control'] = BLOB_CACHE_CONTROL
+    return response
+
+
+# Server-Sent Events - push obaveštenja (pokreće se kroz football/asgi.py)
+EVENTS_HEARTBEAT = 15
+# Tiket za /events/ važi kratko i služi samo za otvaranje stream-a
+EVENTS_TICKET_MAX_AGE = 30
+EVENTS_TICKET_SALT = 'football_time_ns.events-ticket'
+
+
+class EventsTicketView(APIView):
+    """
+    POST /events/ticket/ (Authorization: Bearer)
+    EventSource ne može da pošalje Authorization header, pa umesto access tokena
+    u URL ide potpisan tiket: važi EVENTS_TICKET_MAX_AGE sekundi, ne prolazi kao
+    JWT ni na jednom drugom endpointu i nosi exp access tokena.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ticket = signing.dumps(
+            {'user_id': request.user.id, 'exp': request.auth['exp']},
+            salt=EVENTS_TICKET_SALT
+        )
+        return Response({'ticket': ticket, 'expires_in': EVENTS_TICKET_MAX_AGE})
+
+
+async def events_stream(request):
+    """
+    GET /events/?ticket=<tiket sa /events/ticket/>
+    Šalje appointment_pending, appointment_status i review_created događaje
+    samo za pozivaoca; klijent posle događaja povlači detalje preko /changes/.
+    Kada istekne access token iz koga je tiket izdat, šalje stream_expired i
+    zatvara vezu - klijent uzima nov tiket.
+    Radi samo pod ASGI (events servis): pod WSGI bi Django sinhrono praznio
+    beskonačan stream, pa bi svaki otvoren tab zauzeo worker bez ijednog flush-a.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Events stream is served by the ASGI events service'}, status=503)
+    try:
+        ticket = signing.loads(request.GET.get('ticket', ''), salt=EVENTS_TICKET_SALT, max_age=EVENTS_TICKET_MAX_AGE)
+        user_id, expires_at = ticket['user_id'], ticket['exp']
+    except (signing.BadSignature, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid ticket'}, status=401)
+
+    broker = get_broker()
+
+    async def stream():
+        subscriber = broker.subscribe(user_id)
+        _, queue = subscriber
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                remaining = expires_at - time_module.time()
+                if remaining <= 0:
+                    yield "event: stream_expired\ndata: {}\n\n"
+                    return
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=min(EVENTS_HEARTBEAT, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            broker.unsubscribe(user_id, subscriber)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
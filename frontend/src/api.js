@@ -20,4 +20,15 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// Prati `next` kroz sve strane keyset paginacije i vraća sve rezultate
+export const fetchAllPages = async (url, params = {}) => {
+  let res = await api.get(url, { params });
+  const results = [...res.data.results];
+  while (res.data.next) {
+    res = await api.get(res.data.next);
+    results.push(...res.data.results);
+  }
+  return results;
+};
+
 export default api;
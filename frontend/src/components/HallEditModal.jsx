@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { Modal, Button, Form, Image, Row, Col } from "react-bootstrap";
 import api from "../api";
-import { showConfirm, showSuccess, showApiError } from "../utils/sweetAlert";
+import { showConfirm, showSuccess, showError, showApiError } from "../utils/sweetAlert";
 import MapModal from "./MapModal";
 
 export default function HallEditModal({ show, onHide, hall, onSaved }) {
@@ -65,12 +65,19 @@ export default function HallEditModal({ show, onHide, hall, onSaved }) {
   const uploadNewFiles = async (hallId) => {
     if (!newFiles.length) return;
 
-    for (const file of newFiles) {
-      const fd = new FormData();
-      fd.append("image", file);
-      await api.post(`/halls/${hallId}/images/`, fd, {
-        headers: { "Content-Type": "multipart/form-data" },
-      });
+    // Sve slike u jednom zahtevu; backend vraća rezultat po fajlu
+    const fd = new FormData();
+    newFiles.forEach((file) => fd.append("images", file));
+    const res = await api.post(`/halls/${hallId}/images/`, fd, {
+      headers: { "Content-Type": "multipart/form-data" },
+      validateStatus: (status) => status === 201 || status === 400,
+    });
+
+    const rejected = (res.data.results || []).filter(
+      (r) => r.status === "rejected"
+    );
+    if (rejected.length) {
+      await showError(rejected.map((r) => `${r.file}: ${r.error}`).join("\n"));
     }
   };
 
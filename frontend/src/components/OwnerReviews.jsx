@@ -4,6 +4,8 @@ import api from "../api";
 
 export default function OwnerReviews({ myHalls, onReviewsSeen }) {
   const [reviews, setReviews] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -11,7 +13,8 @@ export default function OwnerReviews({ myHalls, onReviewsSeen }) {
     try {
       setLoading(true);
       const res = await api.get("/owner/reviews/");
-      setReviews(res.data.reviews || []);
+      setReviews(res.data.results || []);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error("Greška pri učitavanju recenzija:", err);
       setError("Greška pri učitavanju recenzija");
@@ -20,6 +23,20 @@ export default function OwnerReviews({ myHalls, onReviewsSeen }) {
     }
   };
 
+  const fetchMoreReviews = async () => {
+    if (!nextPage) return;
+    try {
+      setLoadingMore(true);
+      const res = await api.get(nextPage);
+      setReviews((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error("Error fetching reviews:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Pozovi onReviewsSeen kada se komponenta mount-uje
   useEffect(() => {
     if (onReviewsSeen) {
@@ -98,6 +115,18 @@ export default function OwnerReviews({ myHalls, onReviewsSeen }) {
           ))}
         </Row>
       )}
+
+      {nextPage && (
+        <div className="text-center mt-3">
+          <Button
+            variant="outline-primary"
+            onClick={fetchMoreReviews}
+            disabled={loadingMore}
+          >
+            {loadingMore ? "Učitavanje..." : "Učitaj još"}
+          </Button>
+        </div>
+      )}
     </div>
   );
 }
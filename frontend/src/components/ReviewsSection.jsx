@@ -9,7 +9,6 @@ import {
   Button,
   Form,
 } from "react-bootstrap";
-import { Link } from "react-router-dom";
 import api from "../api";
 import { useAuth } from "../contexts/AuthContext";
 import { showSuccess, showApiError } from "../utils/sweetAlert";
@@ -17,6 +16,9 @@ import { showSuccess, showApiError } from "../utils/sweetAlert";
 const ReviewsSection = ({ hallId, hallName }) => {
   const { user } = useAuth();
   const [reviews, setReviews] = useState([]);
+  const [summary, setSummary] = useState(null);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
   const [rating, setRating] = useState(5);
@@ -35,7 +37,9 @@ const ReviewsSection = ({ hallId, hallName }) => {
     try {
       setLoading(true);
       const res = await api.get(`/halls/${hallId}/reviews/`);
-      setReviews(res.data);
+      setReviews(res.data.results);
+      setSummary(res.data.summary);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error("Error fetching reviews:", err);
       setError("Greška pri učitavanju ocena");
@@ -44,6 +48,20 @@ const ReviewsSection = ({ hallId, hallName }) => {
     }
   };
 
+  const fetchMoreReviews = async () => {
+    if (!nextPage) return;
+    try {
+      setLoadingMore(true);
+      const res = await api.get(nextPage);
+      setReviews((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error("Error fetching reviews:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchReviewableAppointments = async () => {
     try {
       const res = await api.get("/reviewable-appointments/");
@@ -86,11 +104,9 @@ const ReviewsSection = ({ hallId, hallName }) => {
     }
   };
 
-  // Izračunaj prosečnu ocenu
-  const averageRating =
-    reviews.length > 0
-      ? reviews.reduce((sum, review) => sum + review.rating, 0) / reviews.length
-      : 0;
+  // Broj i prosek za sve ocene hale (ne samo učitanu stranu)
+  const totalReviews = summary ? summary.count : reviews.length;
+  const averageRating = summary && summary.average ? summary.average : 0;
 
   const renderStars = (rating) => {
     return "⭐".repeat(rating) + "☆".repeat(5 - rating);
@@ -115,7 +131,7 @@ const ReviewsSection = ({ hallId, hallName }) => {
         <div>
           <h6 className="mb-0">⭐ {hallName}</h6>
           <small className="text-muted">
-            Ocene i utisci ({reviews.length})
+            Ocene i utisci ({totalReviews})
           </small>
         </div>
         {reviews.length > 0 && (
@@ -243,16 +259,15 @@ const ReviewsSection = ({ hallId, hallName }) => {
           </div>
         )}
 
-        {/* Link ka svim ocenama ako ih ima puno */}
-        {reviews.length > 5 && (
+{nextPage && (
           <div className="text-center mt-3">
             <Button
-              as={Link}
-              to={`/halls/${hallId}#reviews`}
               variant="outline-primary"
               size="sm"
+              onClick={fetchMoreReviews}
+              disabled={loadingMore}
             >
-              Pogledaj sve ocene ({reviews.length})
+              {loadingMore ? "Učitavanje..." : "Učitaj još"}
             </Button>
           </div>
         )}
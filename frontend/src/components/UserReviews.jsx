@@ -7,6 +7,9 @@ import api from '../api';
 const UserReviews = () => {
   const { user } = useAuth();
   const [myReviews, setMyReviews] = useState([]);
+  const [totalReviews, setTotalReviews] = useState(0);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -18,7 +21,9 @@ const UserReviews = () => {
     try {
       setLoading(true);
       const res = await api.get('/my-reviews/');
-      setMyReviews(res.data);
+      setMyReviews(res.data.results);
+      setTotalReviews(res.data.summary.count);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error('Error fetching reviews:', err);
       setError('Greška pri učitavanju ocena');
@@ -27,6 +32,20 @@ const UserReviews = () => {
     }
   };
 
+  const fetchMoreReviews = async () => {
+    if (!nextPage) return;
+    try {
+      setLoadingMore(true);
+      const res = await api.get(nextPage);
+      setMyReviews((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error('Error fetching reviews:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const renderStars = (rating) => {
     return '⭐'.repeat(rating) + '☆'.repeat(5 - rating);
   };
@@ -46,7 +65,7 @@ const UserReviews = () => {
         <h1 className="fw-bold h4">📝 Moje Ocene</h1>
         <p className="text-muted small">Pregledajte ocene koje ste ostavili</p>
         <Badge bg="primary" className="total-badge">
-          Ukupno: {myReviews.length}
+          Ukupno: {totalReviews}
         </Badge>
       </div>
 
@@ -118,6 +137,19 @@ const UserReviews = () => {
           ))}
         </Row>
       )}
+
+      {nextPage && (
+        <div className="text-center mt-3">
+          <Button
+            variant="outline-primary"
+            size="sm"
+            onClick={fetchMoreReviews}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Učitavanje...' : 'Učitaj još'}
+          </Button>
+        </div>
+      )}
     </Container>
   );
 };
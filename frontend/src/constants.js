@@ -3,3 +3,7 @@ export const ACCESS_TOKEN = "access";
 export const REFRESH_TOKEN = "refresh";
 
 export const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
+
+// SSE stream (/events/) ide samo kroz ASGI servis (docker-compose: events, port 8001) -
+// gunicorn backend ga odbija sa 503
+export const EVENTS_BASE = import.meta.env.VITE_EVENTS_URL || "http://localhost:8001";
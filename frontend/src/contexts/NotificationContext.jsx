@@ -1,13 +1,33 @@
-import React, { createContext, useContext, useEffect, useRef } from "react";
+import React, {
+  createContext,
+  useCallback,
+  useContext,
+  useEffect,
+  useRef,
+} from "react";
 import { useAuth } from "./AuthContext";
 import api from "../api";
 import Swal from "sweetalert2";
+import { EVENTS_BASE } from "../constants";
+
+const SERVER_EVENTS = [
+  "appointment_pending",
+  "appointment_status",
+  "review_created",
+];
 
 const NotificationContext = createContext();
 
 export function NotificationProvider({ children }) {
   const { user } = useAuth();
   const seenNotificationsRef = useRef(new Set());
+  const listenersRef = useRef(new Set());
+
+  // Komponente (npr. OwnerDashboard) se prijavljuju na server događaje
+  const onServerEvent = useCallback((handler) => {
+    listenersRef.current.add(handler);
+    return () => listenersRef.current.delete(handler);
+  }, []);
 
   useEffect(() => {
     if (!user) return;
@@ -24,11 +44,37 @@ export function NotificationProvider({ children }) {
           seenNotificationsRef.current = new Set(JSON.parse(storedSeen));
         }
 
+        // Preuzmi samo promene od poslednjeg kursora
+        const cursorKey = `changes_cursor_${user.username}`;
+        const since = localStorage.getItem(cursorKey);
+        let changesRes = await api.get("/changes/", {
+          params: since ? { since } : {},
+        });
+        let changedAppointments = [...changesRes.data.appointments];
+        // Promene dolaze po stranama - kursor važi tek posle poslednje
+        while (changesRes.data.next) {
+          changesRes = await api.get(changesRes.data.next);
+          changedAppointments.push(...changesRes.data.appointments);
+        }
+
+        // Nema kursora ili je istekao - jednom učitaj liste kao ranije
+        if (changesRes.data.reset) {
+          const res =
+            user.role === "owner"
+              ? await api.get("/my-halls/appointments/", {
+                  params: { status: "pending" },
+                })
+              : await api.get("/my-appointments/", {
+                  params: { status: "approved,rejected" },
+                });
+          changedAppointments = res.data.results;
+        }
+        localStorage.setItem(cursorKey, changesRes.data.cursor);
+
         // Za ownere - prikaži samo NOVE pending rezervacije
         if (user.role === "owner") {
-          const res = await api.get("/owner/appointments/");
-          const pendingAppointments = res.data.filter(
-            (app) => app.status === "pending"
+          const pendingAppointments = changedAppointments.filter(
+            (app) => app.status === "pending" && app.user !== user.username
           );
 
           const newPending = pendingAppointments.filter(
@@ -61,8 +107,7 @@ export function NotificationProvider({ children }) {
 
         // Za usere - prikaži samo NOVE odobrene/odbijene rezervacije
         if (user.role === "player") {
-          const res = await api.get("/appointments/");
-          const myAppointments = res.data.filter(
+          const myAppointments = changedAppointments.filter(
             (app) => app.user === user.username
           );
 
@@ -145,11 +190,55 @@ export function NotificationProvider({ children }) {
     };
 
     // Pokreni notifikacije nakon 1 sekunde
-    setTimeout(showNewNotifications, 1000);
+    const timeout = setTimeout(showNewNotifications, 1000);
+
+    // Server javlja promene preko SSE - tek tada povuci /changes/.
+    // U URL ide kratkotrajan tiket, ne access token
+    let source = null;
+    let reconnect = null;
+    let closed = false;
+
+    const connect = async () => {
+      try {
+        const res = await api.post("/events/ticket/");
+        if (closed) return;
+        source = new EventSource(
+          `${EVENTS_BASE}/events/?ticket=${encodeURIComponent(res.data.ticket)}`
+        );
+      } catch (error) {
+        console.error("Events ticket error:", error);
+        reconnect = setTimeout(connect, 5000);
+        return;
+      }
+      SERVER_EVENTS.forEach((eventName) => {
+        source.addEventListener(eventName, (e) => {
+          showNewNotifications();
+          const data = JSON.parse(e.data);
+          listenersRef.current.forEach((handler) => handler(eventName, data));
+        });
+      });
+      // Access token je istekao ili je tiket odbijen - novi tiket (api osvežava token)
+      const restart = () => {
+        source.close();
+        reconnect = setTimeout(connect, 1000);
+      };
+      source.addEventListener("stream_expired", restart);
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) restart();
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(timeout);
+      clearTimeout(reconnect);
+      if (source) source.close();
+    };
   }, [user]);
 
   return (
-    <NotificationContext.Provider value={{}}>
+    <NotificationContext.Provider value={{ onServerEvent }}>
       {children}
     </NotificationContext.Provider>
   );
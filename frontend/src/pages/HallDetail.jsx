@@ -169,6 +169,13 @@ function HallDetail() {
     .map(getFullUrl)
     .filter(Boolean);
 
+  // Sličice ispod karusela: thumb verzija ako postoji, inače original
+  const thumbnails = rawImages.map(
+    (i, idx) =>
+      (typeof i === "string" ? null : getFullUrl(i.thumbnail)) ||
+      fullImages[idx]
+  );
+
   return (
     <div className="hall-detail-container">
       <div className="hall-header">
@@ -239,7 +246,7 @@ function HallDetail() {
                 {fullImages.map((url, idx) => (
                   <Image
                     key={idx}
-                    src={url}
+                    src={thumbnails[idx] || url}
                     thumbnail
                     onClick={() => setCurrentImageIdx(idx)}
                     className={`thumbnail-image ${
@@ -20,20 +20,6 @@ const getFullUrl = (path) => {
   if (path.startsWith("http")) return path;
   return `${import.meta.env.VITE_API_URL || "http://localhost:8000"}${path}`;
 };
-const calculateDistance = (lat1, lon1, lat2, lon2) => {
-  const R = 6371; // Radius Zemlje u km
-  const dLat = ((lat2 - lat1) * Math.PI) / 180;
-  const dLon = ((lon2 - lon1) * Math.PI) / 180;
-  const a =
-    Math.sin(dLat / 2) * Math.sin(dLat / 2) +
-    Math.cos((lat1 * Math.PI) / 180) *
-      Math.cos((lat2 * Math.PI) / 180) *
-      Math.sin(dLon / 2) *
-      Math.sin(dLon / 2);
-  const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
-  return R * c; // Udaljenost u km
-};
-
 // Funkcija za dobijanje korisnikove lokacije
 const getUserLocation = () => {
   return new Promise((resolve, reject) => {
@@ -55,12 +41,31 @@ const getUserLocation = () => {
   });
 };
 
+// Hale se učitavaju stranu po stranu sa /halls/search/ - filter cene i
+// sortiranje radi backend, pa se nikad ne preuzimaju sve hale
+const PAGE_SIZE = 24;
+// Slider na maksimumu znači "bez gornje granice"
+const PRICE_SLIDER_MAX = 10000;
+// Sortiranje po udaljenosti pretražuje hale u ovom krugu (MAX_SEARCH_RADIUS_KM)
+const DISTANCE_RADIUS_KM = 200;
+
+const SORT_ORDERINGS = {
+  name: "name",
+  price: "price",
+  price_desc: "-price",
+  rating: "-rating",
+  distance: "distance",
+};
+
 export default function Halls() {
   const [halls, setHalls] = useState([]);
+  const [next, setNext] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
-  const [priceRange, setPriceRange] = useState([0, 5000]);
+  const [maxPrice, setMaxPrice] = useState(PRICE_SLIDER_MAX);
   const [sortBy, setSortBy] = useState("name");
+  const [query, setQuery] = useState("");
   const [userLocation, setUserLocation] = useState(null);
   const [locationLoading, setLocationLoading] = useState(false);
 
@@ -77,55 +82,55 @@ export default function Halls() {
       .finally(() => setLocationLoading(false));
   }, []);
 
-  useEffect(() => {
-    api
-      .get("/halls/")
-      .then((res) => setHalls(res.data))
-      .catch((err) => {
-        console.error("Error fetching halls:", err);
-        setError("Greška pri učitavanju hala");
-        showApiError(err);
-      })
-      .finally(() => setLoading(false));
-  }, []);
-
-  // Filter hala po ceni
-  const filteredHalls = halls.filter(
-    (hall) => hall.price >= priceRange[0] && hall.price <= priceRange[1]
-  );
+  // Lokacija menja upit samo kada se sortira po udaljenosti
+  const distanceFrom = sortBy === "distance" ? userLocation : null;
 
-  // Sortiranje hala
-  const sortedHalls = [...filteredHalls].sort((a, b) => {
-    switch (sortBy) {
-      case "price":
-        return a.price - b.price;
-      case "price_desc":
-        return b.price - a.price;
-      case "name":
-        return a.name.localeCompare(b.name);
-      case "distance":
-        if (!userLocation || !a.location || !b.location) return 0;
-        const distA = calculateDistance(
-          userLocation.lat,
-          userLocation.lng,
-          a.location.lat,
-          a.location.lng
-        );
-        const distB = calculateDistance(
-          userLocation.lat,
-          userLocation.lng,
-          b.location.lat,
-          b.location.lng
-        );
-        return distA - distB;
-      default:
-        return 0;
+  // Prva strana za trenutni upit, cenu i sortiranje; ostale preko "Učitaj još"
+  useEffect(() => {
+    let cancelled = false;
+    const params = { page_size: PAGE_SIZE };
+    if (query.trim()) params.q = query.trim();
+    if (maxPrice < PRICE_SLIDER_MAX) params.max_price = maxPrice;
+    if (SORT_ORDERINGS[sortBy]) params.ordering = SORT_ORDERINGS[sortBy];
+    if (distanceFrom) {
+      params.lat = distanceFrom.lat;
+      params.lon = distanceFrom.lng;
+      params.radius = DISTANCE_RADIUS_KM;
     }
-  });
 
-  // Pronađi max cenu za slider
-  const maxPrice =
-    halls.length > 0 ? Math.max(...halls.map((hall) => hall.price)) : 5000;
+    const timer = setTimeout(() => {
+      api
+        .get("/halls/search/", { params })
+        .then((res) => {
+          if (cancelled) return;
+          setHalls(res.data.results);
+          setNext(res.data.next);
+        })
+        .catch((err) => {
+          if (cancelled) return;
+          console.error("Error fetching halls:", err);
+          setError("Greška pri učitavanju hala");
+          showApiError(err);
+        })
+        .finally(() => !cancelled && setLoading(false));
+    }, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query, maxPrice, sortBy, distanceFrom]);
+
+  const loadMore = () => {
+    setLoadingMore(true);
+    api
+      .get(next)
+      .then((res) => {
+        setHalls((current) => [...current, ...res.data.results]);
+        setNext(res.data.next);
+      })
+      .catch(showApiError)
+      .finally(() => setLoadingMore(false));
+  };
 
   if (loading) {
     return (
@@ -155,27 +160,38 @@ export default function Halls() {
           Pronađite savršenu halu za vašu sledeću utakmicu
         </p>
         <Badge bg="secondary" className="total-badge">
-          Ukupno hala: {sortedHalls.length}
+          Učitano hala: {halls.length}
         </Badge>
       </div>
 
       {/* FILTERI I SORTIRANJE */}
       <Card className="mb-4 filter-card">
         <Card.Body>
+          <Form.Control
+            type="search"
+            className="mb-3"
+            placeholder="🔍 Pretraži hale po imenu, adresi ili opisu..."
+            value={query}
+            onChange={(e) => {
+              setQuery(e.target.value);
+              setSortBy(e.target.value.trim() ? "relevance" : "name");
+            }}
+          />
           <Row className="align-items-center">
             <Col md={4}>
               <Form.Group>
                 <Form.Label>
                   <strong>
-                    💰 Cena: {priceRange[0]} - {priceRange[1]} RSD
+                    💰 Cena do:{" "}
+                    {maxPrice < PRICE_SLIDER_MAX ? `${maxPrice} RSD` : "bez ograničenja"}
                   </strong>
                 </Form.Label>
                 <Form.Range
                   min={0}
-                  max={maxPrice}
+                  max={PRICE_SLIDER_MAX}
                   step={100}
-                  value={priceRange[1]}
-                  onChange={(e) => setPriceRange([0, parseInt(e.target.value)])}
+                  value={maxPrice}
+                  onChange={(e) => setMaxPrice(parseInt(e.target.value))}
                 />
               </Form.Group>
             </Col>
@@ -189,9 +205,13 @@ export default function Halls() {
                   value={sortBy}
                   onChange={(e) => setSortBy(e.target.value)}
                 >
+                  {query.trim() && (
+                    <option value="relevance">Relevantnosti</option>
+                  )}
                   <option value="name">Nazivu (A-Ž)</option>
                   <option value="price">Ceni (niža → viša)</option>
                   <option value="price_desc">Ceni (viša → niža)</option>
+                  <option value="rating">Oceni (bolja → lošija)</option>
                   {userLocation && (
                     <option value="distance">
                       Udaljenosti (bliža → dalja)
@@ -204,16 +224,16 @@ export default function Halls() {
             <Col md={4}>
               <div className="filter-info">
                 <small className="text-muted">
-                  Prikazano: <strong>{sortedHalls.length}</strong> od{" "}
-                  <strong>{halls.length}</strong> hala
+                  Prikazano: <strong>{halls.length}</strong> hala
+                  {next && " (ima još)"}
                 </small>
                 <br />
                 <Button
                   variant="outline-secondary"
                   size="sm"
                   onClick={() => {
-                    setPriceRange([0, maxPrice]);
-                    setSortBy("name");
+                    setMaxPrice(PRICE_SLIDER_MAX);
+                    setSortBy(query.trim() ? "relevance" : "name");
                   }}
                 >
                   🔄 Resetuj filtere
@@ -224,7 +244,7 @@ export default function Halls() {
         </Card.Body>
       </Card>
 
-      {sortedHalls.length === 0 ? (
+      {halls.length === 0 ? (
         <Card className="text-center py-5 empty-state">
           <Card.Body>
             <h4 className="text-muted">
@@ -233,7 +253,7 @@ export default function Halls() {
             <p className="text-muted">Pokušajte da promenite opseg cene.</p>
             <Button
               variant="primary"
-              onClick={() => setPriceRange([0, maxPrice])}
+              onClick={() => setMaxPrice(PRICE_SLIDER_MAX)}
             >
               Poništi filtere
             </Button>
@@ -241,12 +261,17 @@ export default function Halls() {
         </Card>
       ) : (
         <Row xs={1} md={2} lg={3} className="g-4">
-          {sortedHalls.map((hall) => {
+          {halls.map((hall) => {
             const imgUrl =
               hall.images && hall.images.length > 0
                 ? hall.images[0].image || hall.images[0]
                 : hall.image;
             const src = getFullUrl(imgUrl);
+            // WebP verzije (thumb/card/full) kada ih backend napravi
+            const srcSet =
+              hall.images && hall.images.length > 0
+                ? hall.images[0].srcset
+                : hall.image_srcset;
 
             return (
               <Col key={hall.id}>
@@ -254,7 +279,14 @@ export default function Halls() {
                   {/* Slika */}
                   <div className="hall-image-container">
                     {src ? (
-                      <Image src={src} alt={hall.name} className="hall-image" />
+                      <Image
+                        src={src}
+                        srcSet={srcSet || undefined}
+                        sizes="(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw"
+                        loading="lazy"
+                        alt={hall.name}
+                        className="hall-image"
+                      />
                     ) : (
                       <div className="hall-placeholder">
                         <div className="text-center">
@@ -288,6 +320,11 @@ export default function Halls() {
                         <Badge className="price-badge">
                           💰 {hall.price} RSD/sat
                         </Badge>
+                        {hall.rating && (
+                          <Badge bg="warning" text="dark" className="ms-2">
+                            ★ {hall.rating} ({hall.rating_count})
+                          </Badge>
+                        )}
                       </div>
 
                       <div className="d-grid">
@@ -307,6 +344,14 @@ export default function Halls() {
           })}
         </Row>
       )}
+
+      {next && (
+        <div className="text-center mt-4">
+          <Button variant="outline-primary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? <Spinner animation="border" size="sm" /> : "Učitaj još"}
+          </Button>
+        </div>
+      )}
     </Container>
   );
 }
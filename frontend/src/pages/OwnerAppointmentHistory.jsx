@@ -19,6 +19,7 @@ function OwnerAppointmentHistory() {
   const [filter, setFilter] = useState("all");
   const [dateFilter, setDateFilter] = useState("");
   const [exporting, setExporting] = useState(false);
+  const [exportProgress, setExportProgress] = useState(0);
   const [showCancellationStats, setShowCancellationStats] = useState(false);
 
   useEffect(() => {
@@ -79,10 +80,28 @@ function OwnerAppointmentHistory() {
 
   const cancellationStats = getCancellationStats();
 
+  // Izveštaj pravi worker na serveru - pratimo posao dok ne bude gotov
+  const waitForReport = async (job) => {
+    while (job.status === "pending" || job.status === "running") {
+      setExportProgress(job.progress);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const res = await api.get(`/owner/reports/${job.id}/`);
+      job = res.data;
+    }
+    return job;
+  };
+
   const handleExportPDF = async () => {
     setExporting(true);
+    setExportProgress(0);
     try {
-      const response = await api.get("/owner/export-pdf/", {
+      const started = await api.get("/owner/export-pdf/");
+      const job = await waitForReport(started.data);
+      if (job.status !== "done") {
+        throw new Error(job.error || "Report failed");
+      }
+
+      const response = await api.get(`/owner/reports/${job.id}/download/`, {
         responseType: "blob",
       });
 
@@ -193,7 +212,7 @@ function OwnerAppointmentHistory() {
             {exporting ? (
               <>
                 <Spinner animation="border" size="sm" className="me-2" />
-                Izvoz...
+                Izvoz... {exportProgress}%
               </>
             ) : (
               <>📄 Izvezi PDF</>
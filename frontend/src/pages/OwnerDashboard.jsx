@@ -1,7 +1,8 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import api from "../api";
+import api, { fetchAllPages } from "../api";
 import { useAuth } from "../contexts/AuthContext";
+import { useNotifications } from "../contexts/NotificationContext";
 import OwnerHalls from "./OwnerHalls";
 import OwnerAvailability from "./OwnerAvailability";
 import OwnerAppointments from "./OwnerAppointments";
@@ -14,6 +15,7 @@ import OwnerReviews from "../components/OwnerReviews";
 
 export default function OwnerDashboard() {
   const { user, loading: authLoading } = useAuth();
+  const { onServerEvent } = useNotifications();
   const navigate = useNavigate();
 
   const [activeTab, setActiveTab] = useState("halls");
@@ -38,8 +40,7 @@ export default function OwnerDashboard() {
     setError(null);
     try {
       setLoadingHalls(true);
-      const res = await api.get("/my-halls/");
-      setMyHalls(res.data || []);
+      setMyHalls(await fetchAllPages("/my-halls/", { page_size: 200 }));
     } catch (err) {
       console.error("Greška prilikom dohvatanja mojih hala:", err);
       setError("Greška prilikom dohvatanja hala.");
@@ -51,7 +52,8 @@ export default function OwnerDashboard() {
 
   const checkNewReviews = async () => {
     try {
-      const res = await api.get("/owner/reviews/");
+      // Treba samo unseen_count iz sažetka prve strane
+      const res = await api.get("/owner/reviews/", { params: { page_size: 1 } });
       setNewReviewsCount(res.data.unseen_count || 0);
     } catch (err) {
       console.error("Greška pri proveri novih recenzija:", err);
@@ -86,11 +88,12 @@ export default function OwnerDashboard() {
   useEffect(() => {
     if (user && user.role === "owner") {
       checkNewReviews();
-      // Proveri na svakih 5 minuta
-      const interval = setInterval(checkNewReviews, 5 * 60 * 1000);
-      return () => clearInterval(interval);
+      // Nova recenzija stiže kao server događaj umesto periodične provere
+      return onServerEvent((eventName) => {
+        if (eventName === "review_created") checkNewReviews();
+      });
     }
-  }, [user]);
+  }, [user, onServerEvent]);
 
   // Resetuj hasMarkedAsSeen kada se promeni broj novih recenzija
   useEffect(() => {
@@ -9,14 +9,14 @@ import {
   Spinner,
   Alert,
 } from "react-bootstrap";
-import { useAuth } from "../contexts/AuthContext";
 import api from "../api";
 import { showConfirm, showSuccess, showApiError } from "../utils/sweetAlert";
 import ReviewSection from "../components/ReviewSection";
 
 function UserDashboard() {
-  const { user } = useAuth();
   const [appointments, setAppointments] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [reviews, setReviews] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
@@ -41,11 +41,9 @@ function UserDashboard() {
   const fetchMyAppointments = async () => {
     try {
       setLoading(true);
-      const res = await api.get("/appointments/");
-      const myAppointments = res.data.filter(
-        (app) => app.user === user.username
-      );
-      setAppointments(myAppointments);
+      const res = await api.get("/my-appointments/");
+      setAppointments(res.data.results);
+      setNextPage(res.data.next);
     } catch (err) {
       console.error("Error fetching appointments:", err);
       setError("Greška pri učitavanju rezervacija");
@@ -55,10 +53,26 @@ function UserDashboard() {
     }
   };
 
+  const fetchMoreAppointments = async () => {
+    if (!nextPage) return;
+    try {
+      setLoadingMore(true);
+      const res = await api.get(nextPage);
+      setAppointments((prev) => [...prev, ...res.data.results]);
+      setNextPage(res.data.next);
+    } catch (err) {
+      console.error("Error fetching appointments:", err);
+      showApiError(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchMyReviews = async () => {
     try {
-      const res = await api.get("/my-reviews/");
-      setReviews(res.data);
+      // Samo za proveru koje rezervacije su već ocenjene - najveća strana
+      const res = await api.get("/my-reviews/", { params: { page_size: 200 } });
+      setReviews(res.data.results);
     } catch (err) {
       console.error("Error fetching reviews:", err);
     }
@@ -291,6 +305,18 @@ function UserDashboard() {
             ))}
           </Row>
 
+          {nextPage && (
+            <div className="text-center mt-4">
+              <Button
+                variant="outline-primary"
+                onClick={fetchMoreAppointments}
+                disabled={loadingMore}
+              >
+                {loadingMore ? "Učitavanje..." : "Učitaj još"}
+              </Button>
+            </div>
+          )}
+
           <ReviewSection
             reviewableAppointments={getReviewableAppointments()}
             onReviewAdded={fetchMyReviews}